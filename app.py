@@ -1,69 +1,509 @@
-from flask import Flask, request, render_template, redirect, url_for, flash
-import pickle
-import pandas as pd
+from flask import Flask, Response, request, render_template, redirect, url_for, flash, jsonify, g, session
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
 import os
 import secrets
-import joblib
+import json
+import threading
+import time
+from datetime import datetime, timezone
+
+from client_bundle import ClientBundle, encode_bundle
+from encoding import ANIMAL_OPTIONS, DISEASE_OPTIONS, FIELD_OPTIONS, FORM_ENCODER, FORM_FIELDS, FeatureEncoder
+from explanation import ForestExplainer, explain_batch
+from inference import check_feature_names, input_row, predict_batch, predict_one
+from inference_pool import InferencePool
+from metrics import RequestMetrics, SlowRequestLog, StageTimer
+from micro_batching import MicroBatcher
+from model_loader import load_feature_encoder, load_model
+from model_registry import DEFAULT_REGISTRY_DIR, ModelWatcher, active_version, content_hash, load_bundle
+from prediction_log import DEFAULT_LOG_DIR, PredictionLog
+from prediction_stats import DAILY_BUCKETS, DEFAULT_STATS_DIR, HOURLY_BUCKETS, PredictionStats
+from prediction_table import PredictionTable, model_file_stamp
+from prerender import PageCache, write_pages
+from response_cache import ResponseCache
+from static_assets import accepted_encodings, load_manifest, send_static_asset
 
 
 app = Flask(__name__)
 app.secret_key = secrets.token_hex(16)  # Change this to a random secret key
-try:
-    model = joblib.load('models/animal_health_model.pkl')
-    label_encoders = joblib.load('models/label_encoders.pkl')
-    print("Model loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    model = None
-    label_encoders = None
-
-
-# Load the trained model
-#try:
-#    model = pickle.load(open('models/rfc.pkl', 'rb'))
-#    print("Model loaded successfully!")
-#except Exception as e:
-#    print(f"Error loading model: {e}")
-#    model = None
-
-# Define animal categories and disease options
-ANIMAL_OPTIONS = ['Birds', 'Cats', 'Dogs', 'Horses', 'Cows', 'Sheep', 'Goats', 'Pigs']
-DISEASE_OPTIONS = {
-    'blood_brain': ['normal', 'anemia', 'leukemia', 'brain_tumor', 'encephalitis'],
-    'appearance': ['normal', 'skin_lesions', 'hair_loss', 'emaciation', 'swelling'],
-    'general': ['normal', 'fever', 'lethargy', 'coughing', 'vomiting'],
-    'lung': ['normal', 'pneumonia', 'asthma', 'difficulty_breathing', 'lung_infection'],
-    'abdominal': ['normal', 'bloating', 'diarrhea', 'abdominal_pain', 'constipation']
+
+# The prediction form sends the six categorical fields the Random Forest in
+# rfc.pkl was trained on; animal_health_model.pkl is the vitals-based model
+# produced by model_training.py and expects different features.
+MODEL_PATH = 'models/rfc.pkl'
+
+# Columns MODEL_PATH was trained on; the feature encoder is validated against it
+FEATURE_COLUMNS_PATH = 'models/feature_columns.pkl'
+
+# 'pickle' unpickles the estimator; 'mmap' maps its compiled node arrays
+# read-only so all workers share one copy (see model_loader.py)
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'pickle')
+
+# The model is loaded on first use unless PRELOAD_MODEL=1
+PRELOAD_MODEL = os.environ.get('PRELOAD_MODEL', '0') == '1'
+
+# Versioned models published with model_registry.py; when the registry has an
+# active version it is served instead of MODEL_PATH
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', DEFAULT_REGISTRY_DIR)
+
+# How often a background thread checks for a newly published model (0 disables)
+MODEL_POLL_SECONDS = float(os.environ.get('MODEL_POLL_SECONDS', '2'))
+
+# Upper bound on records accepted by one /api/predict/batch request
+BATCH_MAX_RECORDS = 50000
+
+# 'thread' scores in the web worker's own threads; 'process' sends scoring to
+# INFERENCE_WORKERS long-lived processes per web worker (default: one per core,
+# or the cores divided among the workers under run.py --production) that share a
+# memory-mapped copy of the model, so scoring is not serialized by the GIL
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'thread')
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '0'))
+INFERENCE_POOL_DIR = 'models/inference_pool'
+
+# Score every form input up front; PREDICTION_TABLE=0 serves all requests
+# with live inference instead
+PREDICTION_TABLE = os.environ.get('PREDICTION_TABLE', '1') == '1'
+
+# Live single-row predictions from concurrent requests are scored together:
+# each batch waits up to MICRO_BATCH_WINDOW_MS for more rows, up to
+# MICRO_BATCH_MAX_SIZE of them. MICRO_BATCHING=0 scores each request alone.
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '1') == '1'
+MICRO_BATCH_WINDOW_MS = float(os.environ.get('MICRO_BATCH_WINDOW_MS', '2'))
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', '64'))
+
+# Rendered /submit responses kept for the most recently used inputs (0 disables)
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '1024'))
+
+# Per-field contributions to each prediction, shown on the result page and
+# served at /api/explain (EXPLANATIONS=0 disables them); explanations of the
+# EXPLANATION_CACHE_SIZE most recently used inputs are kept
+EXPLANATIONS = os.environ.get('EXPLANATIONS', '1') == '1'
+EXPLANATION_CACHE_SIZE = int(os.environ.get('EXPLANATION_CACHE_SIZE', '4096'))
+
+# The prediction table is offered to the form at /api/model/bundle so browsers
+# can predict as the user types (needs PREDICTION_TABLE; CLIENT_BUNDLE=0 disables it)
+CLIENT_BUNDLE = os.environ.get('CLIENT_BUNDLE', '1') == '1'
+
+# Pages that only depend on constants are rendered once per process and
+# served with strong ETags; PRERENDER_PAGES=0 renders them on every hit
+PRERENDER_PAGES = os.environ.get('PRERENDER_PAGES', '1') == '1'
+
+# When set, prerender_pages() also writes the pages here for nginx to serve
+PRERENDER_DIR = os.environ.get('PRERENDER_DIR')
+
+# Every /submit result is appended to an audit log under PREDICTION_LOG_DIR by
+# a background writer (PREDICTION_LOG=0 disables it). When its queue is full a
+# request waits up to PREDICTION_LOG_BLOCK_MS for room before the record is dropped
+PREDICTION_LOG = os.environ.get('PREDICTION_LOG', '1') == '1'
+PREDICTION_LOG_DIR = os.environ.get('PREDICTION_LOG_DIR', DEFAULT_LOG_DIR)
+PREDICTION_LOG_BLOCK_MS = int(os.environ.get('PREDICTION_LOG_BLOCK_MS', '0'))
+
+# Critical/normal counts per animal and symptom served at /api/stats, kept in a
+# file under PREDICTION_STATS_DIR shared by all workers (PREDICTION_STATS=0 disables them)
+PREDICTION_STATS = os.environ.get('PREDICTION_STATS', '1') == '1'
+PREDICTION_STATS_DIR = os.environ.get('PREDICTION_STATS_DIR', DEFAULT_STATS_DIR)
+
+# Per-stage latency histograms and request counters served at /metrics
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+
+# Requests slower than SLOW_REQUEST_MS are written as JSON lines to
+# SLOW_REQUEST_LOG (stderr if unset), keeping SLOW_REQUEST_SAMPLE_RATE of them
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '0'))
+SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get('SLOW_REQUEST_SAMPLE_RATE', '1'))
+SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG')
+
+
+class ServingModel:
+    """A loaded model with its encoder, version and derived caches, swapped as one unit"""
+
+    def __init__(self, model, encoder, version, source_key):
+        if encoder.input_fields != FORM_FIELDS:
+            raise ValueError(f"Model version {version} expects inputs {encoder.input_fields}, "
+                             f"not the prediction form's fields")
+        check_feature_names(model, encoder.feature_names)
+
+        self.model = model
+        self.encoder = encoder
+        self.version = version
+        self.source_key = source_key
+
+        # What live requests are scored with: the model itself or a process pool
+        if INFERENCE_BACKEND == 'process':
+            pool_path = os.path.join(INFERENCE_POOL_DIR, version.replace(os.sep, '_') + '.pkl')
+            self.scorer = InferencePool(model, pool_path, INFERENCE_WORKERS or None)
+        elif INFERENCE_BACKEND == 'thread':
+            self.scorer = model
+        else:
+            raise ValueError(f"Unknown inference backend '{INFERENCE_BACKEND}', expected 'thread' or 'process'")
+
+        # Every form input scored up front for this model
+        self.prediction_table = PredictionTable(encoder, FIELD_OPTIONS)
+        if PREDICTION_TABLE:
+            try:
+                self.prediction_table.build(model)
+                print(f"Prediction table built for {self.prediction_table.size} inputs")
+            except Exception as e:
+                # Requests fall back to live inference
+                print(f"Error building prediction table: {e}")
+
+        # Live inference for requests the table cannot answer
+        self.batcher = None
+        if MICRO_BATCHING:
+            self.batcher = MicroBatcher(
+                self.scorer, len(encoder.feature_names), MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_SIZE,
+                on_batch=request_metrics.record_micro_batch if request_metrics is not None else None)
+
+        # Built on first request to /api/model/bundle
+        self.client_bundle = None
+
+        # Feature contributions, computed from the same trees in-process; with
+        # the prediction table, every form input is explained up front as well
+        self.explainer = None
+        self.explanation_table = None
+        self.explain_batcher = None
+        if EXPLANATIONS:
+            try:
+                self.explainer = ForestExplainer(model)
+                if self.prediction_table.is_built:
+                    _, self.explanation_table = self.explainer.explain(self.prediction_table.domain)
+            except Exception as e:
+                print(f"Error preparing explanations: {e}")
+        if self.explainer is not None and MICRO_BATCHING:
+            self.explain_batcher = MicroBatcher(
+                self.explainer, len(encoder.feature_names), MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_SIZE,
+                score=explain_batch)
+
+    def close(self):
+        """Release inference workers once this model is no longer served"""
+        if isinstance(self.scorer, InferencePool):
+            self.scorer.close()
+
+
+serving = None
+model_status = {'state': 'cold', 'error': None, 'load_seconds': None}
+request_metrics = None
+if METRICS_ENABLED:
+    request_metrics = RequestMetrics(
+        SlowRequestLog(SLOW_REQUEST_MS, SLOW_REQUEST_SAMPLE_RATE, SLOW_REQUEST_LOG)
+        if SLOW_REQUEST_MS > 0 else None
+    )
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE) if RESPONSE_CACHE_SIZE > 0 else None
+if request_metrics is not None and response_cache is not None:
+    request_metrics.registry.register(response_cache.events)
+explanation_cache = None
+if EXPLANATIONS and EXPLANATION_CACHE_SIZE > 0:
+    explanation_cache = ResponseCache(EXPLANATION_CACHE_SIZE, 'explanation',
+                                      'Feature contribution cache hits, misses and evictions')
+    if request_metrics is not None:
+        request_metrics.registry.register(explanation_cache.events)
+prediction_log = (PredictionLog(PREDICTION_LOG_DIR, block_seconds=PREDICTION_LOG_BLOCK_MS / 1000)
+                  if PREDICTION_LOG else None)
+if request_metrics is not None and prediction_log is not None:
+    request_metrics.registry.register(prediction_log.records)
+# Opened on first use by get_prediction_stats(), so importing the app does not
+# need a writable PREDICTION_STATS_DIR
+prediction_stats = None
+_prediction_stats_failed = False
+_prediction_stats_lock = threading.Lock()
+_model_lock = threading.Lock()
+_watcher = None
+
+
+def model_source_key():
+    """Identify the model that should be served: the active registry version, else MODEL_PATH"""
+    version = active_version(MODEL_REGISTRY_DIR)
+    if version is not None:
+        return ('registry', version)
+    return ('file', model_file_stamp(MODEL_PATH))
+
+
+def load_serving_model(source_key):
+    """Load the model identified by source_key and build its caches"""
+    kind, identity = source_key
+    if kind == 'registry':
+        bundle = load_bundle(identity,
+                             lambda path: load_model(path, mode=MODEL_LOAD_MODE),
+                             MODEL_REGISTRY_DIR, members=('feature_encoder', 'feature_columns'))
+        encoder = (FeatureEncoder.from_dict(bundle.feature_encoder)
+                   if bundle.feature_encoder is not None else FORM_ENCODER)
+        if bundle.feature_columns is not None:
+            encoder.validate(bundle.feature_columns)
+        return ServingModel(bundle.model, encoder, bundle.version, source_key)
+
+    encoder = load_feature_encoder(MODEL_PATH, FEATURE_COLUMNS_PATH, default=FORM_ENCODER)
+    loaded = load_model(MODEL_PATH, encoder.feature_names, MODEL_LOAD_MODE)
+    model_dir, model_file = os.path.split(MODEL_PATH)
+    version = f"{model_file}@{content_hash(model_dir, [model_file])[:8]}"
+    return ServingModel(loaded, encoder, version, source_key)
+
+
+def swap_serving_model(source_key):
+    """Load a new model in the background and atomically start serving it"""
+    global serving
+    start = time.perf_counter()
+    new_serving = load_serving_model(source_key)
+    with _model_lock:
+        old_serving, serving = serving, new_serving
+        model_status.update(state='warm', error=None,
+                            load_seconds=round(time.perf_counter() - start, 3))
+        if request_metrics is not None:
+            request_metrics.set_model_version(new_serving.version)
+        if response_cache is not None:
+            response_cache.clear()
+        if explanation_cache is not None:
+            explanation_cache.clear()
+    print(f"Now serving model version {new_serving.version}")
+    if old_serving is not None:
+        old_serving.close()
+
+
+def start_model_watcher(initial_key):
+    """Start this process's model watcher unless it is already running"""
+    global _watcher
+    if MODEL_POLL_SECONDS <= 0:
+        return
+    with _model_lock:
+        # A watcher inherited across fork() is not alive in the child
+        if _watcher is not None and _watcher.is_alive():
+            return
+        _watcher = ModelWatcher(model_source_key, swap_serving_model,
+                                MODEL_POLL_SECONDS, initial_key)
+        _watcher.start()
+
+
+def stop_model_watcher():
+    """Stop this process's model watcher, e.g. when a worker shuts down"""
+    if _watcher is not None:
+        _watcher.stop()
+
+
+def warm_model(start_watcher=True):
+    """
+    Load the model to serve, once; returns the ServingModel or None.
+    A pre-fork server's master passes start_watcher=False so no thread is
+    running at fork time; each worker starts its own watcher on first use.
+    """
+    global serving
+    with _model_lock:
+        if serving is None:
+            model_status['state'] = 'loading'
+            start = time.perf_counter()
+            try:
+                serving = load_serving_model(model_source_key())
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                model_status.update(state='error', error=str(e))
+                return None
+            model_status.update(state='warm', error=None,
+                                load_seconds=round(time.perf_counter() - start, 3))
+            if request_metrics is not None:
+                request_metrics.set_model_version(serving.version)
+            print(f"Model loaded successfully! Version: {serving.version}")
+    if start_watcher:
+        start_model_watcher(serving.source_key)
+    return serving
+
+
+def get_serving_model():
+    """Return the current ServingModel, loading it on first use; None if it cannot be loaded"""
+    current = serving
+    if current is None:
+        return warm_model()
+    if MODEL_POLL_SECONDS > 0 and (_watcher is None or not _watcher.is_alive()):
+        start_model_watcher(current.source_key)
+    return current
+
+
+def log_prediction(current, features, body, elapsed):
+    """Queue an audit record of a /submit result; the write happens in the background"""
+    prediction_log.log({
+        'time': datetime.now(timezone.utc).isoformat(),
+        'model_version': current.version,
+        'inputs': dict(zip(FORM_FIELDS, features)),
+        'encoded': current.encoder.encode_record(features),
+        'prediction': body['prediction'],
+        'confidence': body['confidence'],
+        'probabilities': body['probabilities'],
+        'latency_ms': round(elapsed * 1000, 3),
+    })
+
+
+# Labels of the form fields on the result page
+FIELD_LABELS = dict(zip(FORM_FIELDS, ['Animal', 'Blood/Brain Disease', 'Appearance Disease',
+                                      'General Disease', 'Lung Disease', 'Abdominal Disease']))
+
+
+def explain_encoded(current, encoded_rows):
+    """(class probabilities, contributions) for each encoded row, from the table or cache where possible"""
+    results = [None] * len(encoded_rows)
+    misses = []
+    for index, encoded in enumerate(encoded_rows):
+        if current.explanation_table is not None:
+            position = current.prediction_table.index_of(encoded)
+            if position is not None:
+                results[index] = (current.prediction_table.probabilities[position],
+                                  current.explanation_table[position])
+                continue
+        key = (current.version, tuple(int(code) for code in encoded))
+        cached = explanation_cache.get(key) if explanation_cache is not None else None
+        if cached is None:
+            misses.append((index, key))
+        else:
+            results[index] = cached
+
+    if len(misses) == 1 and current.explain_batcher is not None:
+        # Explained together with concurrent requests
+        computed = [current.explain_batcher.predict(encoded_rows[misses[0][0]])]
+    elif misses:
+        probabilities, contributions = current.explainer.explain(
+            np.asarray([encoded_rows[index] for index, _ in misses]))
+        computed = list(zip(probabilities, contributions))
+    for (index, key), result in zip(misses, computed if misses else []):
+        results[index] = result
+        if explanation_cache is not None:
+            explanation_cache.put(key, result)
+    return results
+
+
+def describe_explanation(current, features, contributions, class_index):
+    """JSON-ready contribution of each field to the predicted class's probability, largest first"""
+    items = [
+        {'field': field, 'label': FIELD_LABELS.get(field, field), 'value': value,
+         'contribution': round(float(contribution), 4)}
+        for field, value, contribution in zip(FORM_FIELDS, features, contributions[:, class_index])
+    ]
+    items.sort(key=lambda item: abs(item['contribution']), reverse=True)
+    return {
+        'class': str(current.model.classes_[class_index]),
+        'base': round(float(current.explainer.bias[class_index]), 4),
+        'contributions': items,
+    }
+
+
+def get_client_bundle(current):
+    """The browser bundle of a serving model's prediction table, built once"""
+    if current.client_bundle is None:
+        outcomes = []
+        for label in current.prediction_table.classes:
+            health_status, status_class, _ = describe_result(int(label))
+            outcomes.append({'status_class': status_class, 'health_status': health_status})
+        current.client_bundle = ClientBundle(encode_bundle(
+            current.prediction_table, current.version, FORM_FIELDS,
+            [FIELD_LABELS[field] for field in FORM_FIELDS], outcomes))
+    return current.client_bundle
+
+
+def get_prediction_stats():
+    """The shared prediction statistics, opened on first use; None if disabled or unavailable"""
+    global prediction_stats, _prediction_stats_failed
+    if prediction_stats is None and PREDICTION_STATS and not _prediction_stats_failed:
+        with _prediction_stats_lock:
+            if prediction_stats is None and not _prediction_stats_failed:
+                try:
+                    prediction_stats = PredictionStats(PREDICTION_STATS_DIR)
+                except OSError as e:
+                    # e.g. a read-only filesystem; predictions are served without statistics
+                    print(f"Error opening prediction statistics, disabling them: {e}")
+                    _prediction_stats_failed = True
+    return prediction_stats
+
+
+def describe_result(result):
+    """Return (health status, status class, recommendation) for a predicted class"""
+    if result == 0:
+        return ("Critical - Immediate veterinary attention required!",
+                "critical",
+                "Please consult a veterinarian immediately. The animal shows signs that require urgent medical attention.")
+    return ("Normal - Animal appears healthy",
+            "normal",
+            "The animal appears to be in good health. Continue regular care and monitoring.")
+
+
+if PRELOAD_MODEL:
+    warm_model()
+
+# Minified, fingerprinted assets built by static_assets.py; without a build
+# the source files are served as before
+STATIC_MANIFEST = load_manifest(app.static_folder)
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    """Make url_for('static', filename=...) point at the built asset when there is one"""
+    if endpoint == 'static' and STATIC_MANIFEST:
+        filename = values.get('filename')
+        values['filename'] = STATIC_MANIFEST.get(filename, filename)
+
+def serve_static(filename):
+    """Static files, precompressed when the client accepts it"""
+    return send_static_asset(app.static_folder, filename, request.headers.get('Accept-Encoding', ''))
+
+app.view_functions['static'] = serve_static
+
+# Endpoint -> (template, context) of pages whose output never changes at runtime
+STATIC_PAGES = {
+    'home': ('index.html', {}),
+    'predict_page': ('inner-page.html', {'animal_options': ANIMAL_OPTIONS,
+                                         'disease_options': DISEASE_OPTIONS}),
+    'about': ('about.html', {}),
+    'contact': ('contact.html', {}),
 }
 
+page_cache = PageCache()
+
+def render_static_page(endpoint):
+    template, context = STATIC_PAGES[endpoint]
+    return render_template(template, **context)
+
+def serve_static_page(endpoint):
+    """Serve a constant page from its prerendered bytes, answering If-None-Match with 304"""
+    # Pending flash messages are shown on the page, so those requests render fresh
+    if not PRERENDER_PAGES or '_flashes' in session:
+        return render_static_page(endpoint)
+
+    page = page_cache.get(endpoint, lambda: render_static_page(endpoint))
+    response = Response(page.body, mimetype='text/html')
+    response.set_etag(page.etag)
+    # Revalidate on every visit so a new deploy is picked up at once
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def prerender_pages(output_dir=None):
+    """Render every constant page now, e.g. before forking; optionally write them out for nginx"""
+    pages = {}
+    with app.test_request_context('/'):
+        for endpoint in STATIC_PAGES:
+            page = page_cache.get(endpoint, lambda endpoint=endpoint: render_static_page(endpoint))
+            # '/' -> index.html, '/about' -> about.html
+            pages[(url_for(endpoint).strip('/') or 'index') + '.html'] = page
+    if output_dir:
+        write_pages(pages, output_dir)
+    return pages
+
 @app.route('/')
 def home():
     """Render the home page"""
-    return render_template('index.html')
+    return serve_static_page('home')
 
 @app.route('/predict')
 def predict_page():
     """Render the prediction form page"""
-    return render_template('inner-page.html', 
-                         animal_options=ANIMAL_OPTIONS,
-                         disease_options=DISEASE_OPTIONS)
+    return serve_static_page('predict_page')
 
 @app.route('/about')
 def about():
     """Render the about page"""
-    return render_template('about.html')
+    return serve_static_page('about')
 
 @app.route('/contact')
 def contact():
     """Render the contact page"""
-    return render_template('contact.html')
+    return serve_static_page('contact')
 
 @app.route('/submit', methods=['POST', 'GET'])
 def submit():
     """Handle form submission and make predictions"""
     if request.method == 'POST':
+        timer = g.timer
         try:
             # Get form data
             animal_name = request.form.get('animal_name')
@@ -76,6 +516,7 @@ def submit():
             # Validate input
             if not all([animal_name, blood_brain_disease, appearance_disease, 
                        general_disease, lung_disease, abdominal_disease]):
+                g.outcome = 'validation_error'
                 flash('Please fill in all fields', 'error')
                 return redirect(url_for('predict_page'))
             
@@ -89,81 +530,433 @@ def submit():
                 lung_disease,
                 abdominal_disease
             ]
+            timer.lap('parse')
             
-            # Create label encoders (you may need to adjust this based on your training data)
-            encoders = {}
-            feature_names = ['AnimalName', 'BloodBrainDisease', 'AppearanceDisease', 
-                           'GeneralDisease', 'LungDisease', 'AbdominalDisease']
-            
-            # Convert categorical features to numerical
-            encoded_features = []
-            
-            # Simple encoding for demonstration (you should use the same encoding as in training)
-            animal_encoding = {'Birds': 0, 'Cats': 1, 'Dogs': 2, 'Horses': 3, 
-                             'Cows': 4, 'Sheep': 5, 'Goats': 6, 'Pigs': 7}
-            
-            disease_encoding = {'normal': 0, 'anemia': 1, 'leukemia': 2, 'brain_tumor': 3,
-                              'encephalitis': 4, 'skin_lesions': 5, 'hair_loss': 6,
-                              'emaciation': 7, 'swelling': 8, 'fever': 9, 'lethargy': 10,
-                              'coughing': 11, 'vomiting': 12, 'pneumonia': 13, 'asthma': 14,
-                              'difficulty_breathing': 15, 'lung_infection': 16, 'bloating': 17,
-                              'diarrhea': 18, 'abdominal_pain': 19, 'constipation': 20}
-            
-            # Encode features
-            encoded_features.append(animal_encoding.get(animal_name, 0))
-            encoded_features.append(disease_encoding.get(blood_brain_disease, 0))
-            encoded_features.append(disease_encoding.get(appearance_disease, 0))
-            encoded_features.append(disease_encoding.get(general_disease, 0))
-            encoded_features.append(disease_encoding.get(lung_disease, 0))
-            encoded_features.append(disease_encoding.get(abdominal_disease, 0))
-            
-            # Create DataFrame for prediction
-            input_data = pd.DataFrame([encoded_features], columns=feature_names)
+            current = get_serving_model()
+            timer.lap('model')
             
             # Make prediction if model is loaded
-            if model:
-                prediction = model.predict(input_data)
-                prediction_proba = model.predict_proba(input_data)
+            if current is not None:
+                g.model_version = current.version
+                wants_json = request.accept_mimetypes.best_match(
+                    ['text/html', 'application/json']) == 'application/json'
+
+                # Pages also show pending flash messages, so those are rendered fresh
+                cache_key = (current.version, tuple(features))
+                use_cache = response_cache is not None and '_flashes' not in session
+                cached_response = response_cache.get(cache_key) if use_cache else None
+                if cached_response is not None:
+                    page, body = cached_response
+                    timer.lap('cache')
+                    g.outcome = 'success'
+                    stats = get_prediction_stats()
+                    if stats is not None:
+                        stats.record(animal_name, features[1:], body['status_class'])
+                    if prediction_log is not None:
+                        log_prediction(current, features, body, timer.elapsed())
+                    return jsonify(body) if wants_json else page
+                
+                # Encode features; values the form does not offer are rejected
+                # rather than scored as category 0, as the JSON APIs do
+                encoded, valid = current.encoder.encode_columns([[value] for value in features])
+                if not valid[0]:
+                    g.outcome = 'validation_error'
+                    unknown = [f"{FIELD_LABELS[field]} '{value}'"
+                               for field, value, code in zip(FORM_FIELDS, features, encoded[0]) if code < 0]
+                    flash(f"Unknown value for {', '.join(unknown)}", 'error')
+                    return redirect(url_for('predict_page'))
+                encoded_features = encoded[0].tolist()
+                timer.lap('encode')
+                cached = current.prediction_table.lookup(encoded_features)
+                if cached is not None:
+                    prediction, prediction_proba = cached
+                    timer.lap('lookup')
+                elif current.batcher is not None:
+                    # Scored together with concurrent requests; includes the wait for the batch
+                    prediction, prediction_proba = current.batcher.predict(encoded_features)
+                    timer.lap('predict')
+                else:
+                    # Fall back to live inference outside the precomputed domain
+                    row = input_row(len(encoded_features))
+                    row[0] = encoded_features
+                    prediction, prediction_proba = predict_one(current.scorer, row)
+                    timer.lap('predict')
                 
                 # Get the prediction result
-                result = int(prediction[0])
-                confidence = max(prediction_proba[0]) * 100
+                result = int(prediction)
+                confidence = max(prediction_proba) * 100
                 
                 # Determine health status
-                if result == 0:
-                    health_status = "Critical - Immediate veterinary attention required!"
-                    status_class = "critical"
-                    recommendation = "Please consult a veterinarian immediately. The animal shows signs that require urgent medical attention."
-                else:
-                    health_status = "Normal - Animal appears healthy"
-                    status_class = "normal"
-                    recommendation = "The animal appears to be in good health. Continue regular care and monitoring."
+                health_status, status_class, recommendation = describe_result(result)
+
+                # Which inputs pushed the probability of this result up or down
+                explanation = None
+                if current.explainer is not None:
+                    _, contributions = explain_encoded(current, [encoded_features])[0]
+                    explanation = describe_explanation(current, features, contributions,
+                                                       int(np.argmax(prediction_proba)))
+                    timer.lap('explain')
                 
-                return render_template('output.html',
+                g.outcome = 'success'
+                page = render_template('output.html',
                                      animal_name=animal_name,
                                      health_status=health_status,
                                      status_class=status_class,
                                      confidence=round(confidence, 2),
                                      recommendation=recommendation,
-                                     features={
-                                         'Animal': animal_name,
-                                         'Blood/Brain Disease': blood_brain_disease,
-                                         'Appearance Disease': appearance_disease,
-                                         'General Disease': general_disease,
-                                         'Lung Disease': lung_disease,
-                                         'Abdominal Disease': abdominal_disease
-                                     })
+                                     features={FIELD_LABELS[field]: value
+                                               for field, value in zip(FORM_FIELDS, features)},
+                                     explanation=explanation)
+                body = {
+                    'prediction': result,
+                    'health_status': health_status,
+                    'status_class': status_class,
+                    'confidence': round(float(confidence), 2),
+                    'recommendation': recommendation,
+                    'probabilities': dict(zip((str(label) for label in current.model.classes_),
+                                              np.asarray(prediction_proba).tolist())),
+                    'features': dict(zip(FORM_FIELDS, features)),
+                    'explanation': explanation,
+                }
+                timer.lap('render')
+
+                # Only inputs the form offers are cached, so arbitrary values cannot flood it
+                if use_cache and all(value in current.encoder.categories(field_index)
+                                     for field_index, value in enumerate(features)):
+                    response_cache.put(cache_key, (page, body))
+                stats = get_prediction_stats()
+                if stats is not None:
+                    stats.record(animal_name, features[1:], status_class)
+                if prediction_log is not None:
+                    log_prediction(current, features, body, timer.elapsed())
+                return jsonify(body) if wants_json else page
             else:
+                g.outcome = 'model_unavailable'
                 flash('Model not loaded. Please check the model file.', 'error')
                 return redirect(url_for('predict_page'))
                 
         except Exception as e:
             print(f"Error during prediction: {e}")
+            g.outcome = 'error'
             flash('An error occurred during prediction. Please try again.', 'error')
             return redirect(url_for('predict_page'))
     
     return redirect(url_for('predict_page'))
 
+def parse_batch_records():
+    """Read batch records from a JSON array/object or an NDJSON request body"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+
+    # silent: malformed JSON gets this API's JSON 400, not werkzeug's HTML one
+    payload = request.get_json(force=True, silent=True)
+    if payload is None:
+        raise ValueError("Malformed JSON")
+    if isinstance(payload, dict):
+        payload = payload.get('records')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of records or an object with a 'records' array")
+    return payload
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch_api():
+    """Score many records in one model call and stream the results as NDJSON"""
+    timer = g.timer
+    try:
+        records = parse_batch_records()
+    except ValueError as e:
+        g.outcome = 'bad_request'
+        return jsonify({'error': f'Invalid request body: {e}'}), 400
+
+    if len(records) > BATCH_MAX_RECORDS:
+        g.outcome = 'too_large'
+        return jsonify({'error': f'At most {BATCH_MAX_RECORDS} records per request'}), 413
+    timer.lap('parse')
+
+    current = get_serving_model()
+    timer.lap('model')
+    if current is None:
+        g.outcome = 'model_unavailable'
+        return jsonify({'error': 'Model not loaded'}), 503
+    g.model_version = current.version
+
+    # Encode column by column so each field is mapped in one vectorized pass
+    encoded, valid = current.encoder.encode_records(records)
+    timer.lap('encode')
+
+    predictions = probabilities = None
+    if valid.any():
+        predictions, probabilities = predict_batch(current.scorer, encoded[valid])
+    timer.lap('predict')
+    g.outcome = 'success'
+    class_labels = [str(label) for label in current.model.classes_]
+
+    def generate():
+        scored = 0
+        for index, is_valid in enumerate(valid):
+            if not is_valid:
+                missing = [field for field, code in zip(FORM_FIELDS, encoded[index]) if code < 0]
+                item = {'index': index, 'error': f"Missing or unknown values for: {', '.join(missing)}"}
+            else:
+                result = int(predictions[scored])
+                row_proba = probabilities[scored]
+                health_status, status_class, _ = describe_result(result)
+                item = {
+                    'index': index,
+                    'prediction': result,
+                    'health_status': health_status,
+                    'status_class': status_class,
+                    'confidence': round(float(row_proba.max()) * 100, 2),
+                    'probabilities': dict(zip(class_labels, row_proba.tolist()))
+                }
+                scored += 1
+            yield json.dumps(item) + '\n'
+        timer.lap('serialize')
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/explain', methods=['POST'])
+def explain_api():
+    """Prediction and per-field contributions for one JSON record, or for each record of a batch"""
+    timer = g.timer
+    try:
+        payload = None
+        if request.mimetype not in ('application/x-ndjson', 'application/jsonl'):
+            payload = request.get_json(force=True, silent=True)
+        single = isinstance(payload, dict) and 'records' not in payload
+        records = [payload] if single else parse_batch_records()
+    except ValueError as e:
+        g.outcome = 'bad_request'
+        return jsonify({'error': f'Invalid request body: {e}'}), 400
+
+    if len(records) > BATCH_MAX_RECORDS:
+        g.outcome = 'too_large'
+        return jsonify({'error': f'At most {BATCH_MAX_RECORDS} records per request'}), 413
+    timer.lap('parse')
+
+    current = get_serving_model()
+    timer.lap('model')
+    if current is None:
+        g.outcome = 'model_unavailable'
+        return jsonify({'error': 'Model not loaded'}), 503
+    if current.explainer is None:
+        g.outcome = 'unavailable'
+        return jsonify({'error': 'Explanations are not available for this model'}), 404
+    g.model_version = current.version
+
+    encoded, valid = current.encoder.encode_records(records)
+    timer.lap('encode')
+    explained = iter(explain_encoded(current, encoded[valid]))
+    timer.lap('explain')
+
+    class_labels = [str(label) for label in current.model.classes_]
+    items = []
+    for index, is_valid in enumerate(valid):
+        if not is_valid:
+            missing = [field for field, code in zip(FORM_FIELDS, encoded[index]) if code < 0]
+            items.append({'index': index, 'error': f"Missing or unknown values for: {', '.join(missing)}"})
+            continue
+        row_proba, contributions = next(explained)
+        class_index = int(row_proba.argmax())
+        health_status, status_class, _ = describe_result(int(current.model.classes_[class_index]))
+        features = [records[index].get(field) for field in FORM_FIELDS]
+        items.append({
+            'index': index,
+            'prediction': int(current.model.classes_[class_index]),
+            'health_status': health_status,
+            'status_class': status_class,
+            'confidence': round(float(row_proba[class_index]) * 100, 2),
+            'probabilities': dict(zip(class_labels, row_proba.tolist())),
+            'explanation': describe_explanation(current, features, contributions, class_index),
+        })
+    timer.lap('serialize')
+    g.outcome = 'success'
+
+    if single:
+        item = items[0]
+        item.pop('index')
+        return jsonify(item), 400 if 'error' in item else 200
+    return jsonify({'results': items})
+
+@app.route('/api/whatif', methods=['POST'])
+def whatif_api():
+    """Predictions for a base input and every input that differs from it in one field"""
+    timer = g.timer
+    record = request.get_json(silent=True)
+    if record is None and request.is_json:
+        g.outcome = 'bad_request'
+        return jsonify({'error': 'Invalid request body: Malformed JSON'}), 400
+    if not isinstance(record, dict):
+        record = request.form.to_dict()
+    timer.lap('parse')
+
+    current = get_serving_model()
+    timer.lap('model')
+    if current is None:
+        g.outcome = 'model_unavailable'
+        return jsonify({'error': 'Model not loaded'}), 503
+    g.model_version = current.version
+
+    encoded, valid = current.encoder.encode_records([record])
+    if not valid[0]:
+        g.outcome = 'bad_request'
+        missing = [field for field, code in zip(FORM_FIELDS, encoded[0]) if code < 0]
+        return jsonify({'error': f"Missing or unknown values for: {', '.join(missing)}"}), 400
+    base = [record[field] for field in FORM_FIELDS]
+
+    # Row 0 is the base input; each variation copies it and changes one field
+    variations = []
+    for field_index, options in enumerate(FIELD_OPTIONS):
+        categories = current.encoder.categories(field_index)
+        variations.extend((field_index, option) for option in options
+                          if option != base[field_index] and option in categories)
+    rows = np.repeat(encoded[:1], len(variations) + 1, axis=0)
+    for row, (field_index, option) in enumerate(variations, start=1):
+        rows[row, field_index] = current.encoder.categories(field_index)[option]
+    timer.lap('encode')
+
+    # One table gather or one model call for every row
+    scored = current.prediction_table.lookup_batch(rows)
+    predictions, probabilities = scored if scored is not None else predict_batch(current.scorer, rows)
+    timer.lap('predict')
+
+    class_labels = [str(label) for label in current.model.classes_]
+
+    def describe_row(row):
+        health_status, status_class, _ = describe_result(int(predictions[row]))
+        return {
+            'prediction': int(predictions[row]),
+            'health_status': health_status,
+            'status_class': status_class,
+            'confidence': round(float(probabilities[row].max()) * 100, 2),
+            'probabilities': dict(zip(class_labels, probabilities[row].tolist())),
+        }
+
+    base_result = describe_row(0)
+    fields = [{'field': field, 'label': FIELD_LABELS.get(field, field), 'options': []} for field in FORM_FIELDS]
+    rows_by_option = {variation: row for row, variation in enumerate(variations, start=1)}
+    for field_index, options in enumerate(FIELD_OPTIONS):
+        for option in options:
+            selected = option == base[field_index]
+            row = 0 if selected else rows_by_option.get((field_index, option))
+            if row is None:
+                continue
+            item = describe_row(row)
+            item.update(value=option, selected=selected,
+                        changes_verdict=item['prediction'] != base_result['prediction'])
+            fields[field_index]['options'].append(item)
+    timer.lap('serialize')
+    g.outcome = 'success'
+    return jsonify({'base': dict(base_result, features=dict(zip(FORM_FIELDS, base))), 'fields': fields})
+
+@app.route('/api/model/bundle')
+def client_bundle_api():
+    """The served model's answers for every form input, for predictions in the browser"""
+    if not CLIENT_BUNDLE:
+        return jsonify({'error': 'The client bundle is disabled'}), 404
+    current = get_serving_model()
+    if current is None:
+        g.outcome = 'model_unavailable'
+        return jsonify({'error': 'Model not loaded'}), 503
+    if not current.prediction_table.is_built:
+        return jsonify({'error': 'The client bundle needs the prediction table'}), 404
+    g.model_version = current.version
+
+    bundle = get_client_bundle(current)
+    gzipped = 'gzip' in accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    response = Response(bundle.gzipped if gzipped else bundle.data, mimetype='application/octet-stream')
+    if gzipped:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    # Each encoding is a different representation, so it gets its own strong ETag
+    response.set_etag(f"{bundle.etag}-gzip" if gzipped else bundle.etag)
+    # Revalidate on every visit so a newly served model is picked up at once
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/stats')
+def api_stats():
+    """
+    Critical vs normal counts and rates per animal and symptom, for all time or
+    the last ?window=<n>h (up to 168) / <n>d (up to 90), with per-bucket totals.
+    ?detail=1 adds every animal x symptom cell.
+    """
+    stats = get_prediction_stats()
+    if stats is None:
+        return jsonify({'error': 'Prediction statistics are disabled'}), 404
+
+    window = request.args.get('window', 'all')
+    hours = days = None
+    try:
+        if window.endswith('h'):
+            hours = int(window[:-1])
+            valid = 1 <= hours <= HOURLY_BUCKETS
+        elif window.endswith('d'):
+            days = int(window[:-1])
+            valid = 1 <= days <= DAILY_BUCKETS
+        else:
+            valid = window == 'all'
+    except ValueError:
+        valid = False
+    if not valid:
+        return jsonify({'error': f"window must be 'all', 1h-{HOURLY_BUCKETS}h or 1d-{DAILY_BUCKETS}d"}), 400
+
+    body = stats.summary(hours, days, by_animal_symptom=request.args.get('detail') == '1')
+    body['window'] = window
+    return jsonify(body)
+
+@app.route('/ready')
+def ready():
+    """Readiness probe: 200 once the model is warm, 503 while it loads"""
+    current = serving
+    if current is None and model_status['state'] in ('cold', 'error'):
+        # Warm up in the background so the probe itself never blocks
+        model_status['state'] = 'loading'
+        threading.Thread(target=warm_model, daemon=True).start()
+
+    body = {
+        'ready': current is not None,
+        'state': model_status['state'],
+        'load_mode': MODEL_LOAD_MODE,
+        'load_seconds': model_status['load_seconds'],
+        'model_version': current.version if current else None,
+        'prediction_table': current.prediction_table.is_built if current else False,
+        'response_cache': response_cache.stats() if response_cache is not None else None,
+    }
+    if model_status['error']:
+        body['error'] = model_status['error']
+    return jsonify(body), 200 if current is not None else 503
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    if request_metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.before_request
+def start_request_timer():
+    """Time every request; handlers mark stage boundaries with g.timer.lap()"""
+    g.timer = StageTimer()
+
+@app.after_request
+def add_model_version_header(response):
+    """Report which model version produced a prediction"""
+    version = g.get('model_version')
+    if version:
+        response.headers['X-Model-Version'] = version
+
+    if request_metrics is not None:
+        # Recorded once the body has been sent, so streamed responses count in full
+        timer = g.timer
+        endpoint = request.endpoint or 'unknown'
+        outcome = g.get('outcome') or ('success' if response.status_code < 400 else
+                                       'client_error' if response.status_code < 500 else 'error')
+        status, method, path = response.status_code, request.method, request.path
+        response.call_on_close(lambda: request_metrics.record(
+            timer, endpoint, outcome, version, status, method, path))
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Benchmark Suite
+Description: Measure latency and throughput of the serving path.
+
+Three suites are available:
+
+- micro:  encoding, model inference (table lookup, single row, batch) and
+          rendering output.html, each timed on its own
+- client: POST /submit through Flask's test client at each concurrency level
+- server: POST /submit over HTTP against a real local WSGI server started
+          in a subprocess (or any running server given with --url)
+
+Every result reports p50/p95/p99/mean latency and operations per second.
+The run is saved as JSON together with the git commit and model version,
+and --compare prints the change against an earlier run.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --suites server --concurrency 1,8,32 --requests 5000
+    python benchmark.py --url http://127.0.0.1:8000 --suites server
+    python benchmark.py --compare benchmarks/results/previous.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+from encoding import FIELD_OPTIONS, FORM_FIELDS
+
+DEFAULT_RESULTS_DIR = 'benchmarks/results'
+DEFAULT_REQUESTS = 2000
+DEFAULT_CONCURRENCY = '1,4,16'
+DEFAULT_BATCH_SIZE = 100
+SUITES = ('micro', 'client', 'server')
+
+
+def sample_records(count, seed=0):
+    """Random form submissions drawn from the options the form offers"""
+    rng = np.random.default_rng(seed)
+    columns = [np.asarray(options)[rng.integers(0, len(options), count)] for options in FIELD_OPTIONS]
+    return [dict(zip(FORM_FIELDS, values)) for values in zip(*(column.tolist() for column in columns))]
+
+
+def summarize(latencies, wall_seconds=None):
+    """Latency percentiles in ms and throughput; wall_seconds defaults to the summed latencies"""
+    latencies = np.asarray(latencies, dtype=np.float64)
+    wall_seconds = wall_seconds if wall_seconds is not None else latencies.sum()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'count': int(len(latencies)),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(latencies.mean() * 1000), 4),
+        'ops_per_second': round(len(latencies) / max(wall_seconds, 1e-9), 1),
+    }
+
+
+def time_calls(function, arguments):
+    """Call function once per argument, returning each call's duration"""
+    latencies = np.empty(len(arguments))
+    for index, argument in enumerate(arguments):
+        start = time.perf_counter()
+        function(argument)
+        latencies[index] = time.perf_counter() - start
+    return latencies
+
+
+def run_micro(app_module, n_requests, batch_size):
+    """Time encoding, inference and rendering separately"""
+    from flask import render_template
+
+    from inference import input_row, predict_batch, predict_one
+
+    current = app_module.get_serving_model()
+    if current is None:
+        raise RuntimeError("Model could not be loaded")
+    encoder = current.encoder
+    records = sample_records(n_requests)
+    rows = [[record[field] for field in FORM_FIELDS] for record in records]
+    encoded_rows = [encoder.encode_record(row) for row in rows]
+
+    def predict_single(encoded):
+        row = input_row(len(encoded))
+        row[0] = encoded
+        return predict_one(current.model, row)
+
+    batches = [records[start:start + batch_size] for start in range(0, len(records), batch_size)]
+    encoded_batches = [encoder.encode_records(batch)[0] for batch in batches]
+
+    results = {
+        'encode_record': summarize(time_calls(encoder.encode_record, rows)),
+        f'encode_records[{batch_size}]': summarize(time_calls(encoder.encode_records, batches)),
+        'table_lookup': summarize(time_calls(current.prediction_table.lookup, encoded_rows)),
+        'predict_one': summarize(time_calls(predict_single, encoded_rows)),
+        f'predict_batch[{batch_size}]': summarize(
+            time_calls(lambda encoded: predict_batch(current.model, encoded), encoded_batches)),
+    }
+
+    health_status, status_class, recommendation = app_module.describe_result(0)
+
+    def render(record):
+        return render_template('output.html', animal_name=record['animal_name'],
+                               health_status=health_status, status_class=status_class,
+                               confidence=96.0, recommendation=recommendation, features=record)
+
+    with app_module.app.test_request_context('/submit', method='POST'):
+        results['render_output'] = summarize(time_calls(render, records))
+    return results
+
+
+def run_concurrent(send, records, concurrency):
+    """Send every record using concurrency threads; send(state, record) does one request"""
+    latencies = np.empty(len(records))
+    errors = []
+    next_index = iter(range(len(records)))
+    lock = threading.Lock()
+
+    def worker():
+        state = {}
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                break
+            start = time.perf_counter()
+            try:
+                send(state, records[index])
+            except Exception as e:
+                errors.append(str(e))
+            latencies[index] = time.perf_counter() - start
+        if state.get('connection') is not None:
+            state['connection'].close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result = summarize(latencies, time.perf_counter() - start)
+    result['errors'] = len(errors)
+    return result
+
+
+def run_client(app_module, n_requests, concurrency_levels):
+    """POST /submit through the Flask test client"""
+    records = sample_records(n_requests, seed=1)
+
+    def send(state, record):
+        client = state.get('client')
+        if client is None:
+            client = state['client'] = app_module.app.test_client()
+        response = client.post('/submit', data=record)
+        response.close()
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    app_module.get_serving_model()
+    send({}, records[0])  # warm-up
+    return {f'submit@{level}': run_concurrent(send, records, level) for level in concurrency_levels}
+
+
+def run_server(base_url, n_requests, concurrency_levels):
+    """POST /submit over HTTP, reusing each thread's connection when the server keeps it open"""
+    parts = urlsplit(base_url)
+    records = sample_records(n_requests, seed=2)
+    bodies = [urlencode(record) for record in records]
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+    def send(state, body):
+        connection = state.get('connection')
+        if connection is None:
+            connection = state['connection'] = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        try:
+            connection.request('POST', '/submit', body, headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            state['connection'] = None
+            raise
+        if response.will_close:
+            connection.close()
+            state['connection'] = None
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+
+    send({}, bodies[0])  # warm-up
+    return {f'http_submit@{level}': run_concurrent(send, bodies, level) for level in concurrency_levels}
+
+
+def serve(port):
+    """Run the app on a threaded werkzeug WSGI server (used by the server suite)"""
+    from werkzeug.serving import make_server
+
+    from app import app, warm_model
+    warm_model()
+    make_server('127.0.0.1', port, app, threaded=True).serve_forever()
+
+
+def start_local_server(port, timeout=120):
+    """Start serve() in a subprocess and wait until /ready answers 200"""
+    process = subprocess.Popen([sys.executable, __file__, '--serve', str(port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/ready')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return process
+            connection.close()
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Benchmark server did not become ready")
+
+
+def server_model_version(base_url):
+    """Model version reported by a running server's /ready probe"""
+    parts = urlsplit(base_url)
+    try:
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=10)
+        connection.request('GET', '/ready')
+        body = json.loads(connection.getresponse().read())
+        connection.close()
+        return body.get('model_version')
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Print p50/p95/p99 and throughput changes against an earlier run"""
+    print(f"\nCompared with {previous.get('git_commit')} ({previous.get('model_version')}):")
+    print(f"{'benchmark':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'ops/s':>9}")
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if before is None:
+            continue
+        changes = [(result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                   for key in ('p50_ms', 'p95_ms', 'p99_ms', 'ops_per_second')]
+        print(f"{name:<28} " + ' '.join(f"{change:>+8.1f}%" for change in changes))
+
+
+def print_results(results):
+    print(f"\n{'benchmark':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>11}")
+    for name, result in results.items():
+        errors = f"  ({result['errors']} errors)" if result.get('errors') else ''
+        print(f"{name:<28} {result['count']:>7} {result['p50_ms']:>9.3f} {result['p95_ms']:>9.3f} "
+              f"{result['p99_ms']:>9.3f} {result['ops_per_second']:>11,.1f}{errors}")
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Benchmark the serving path')
+    parser.add_argument('--suites', default=','.join(SUITES), help=f"Comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='Requests (or calls) per benchmark')
+    parser.add_argument('--concurrency', default=DEFAULT_CONCURRENCY, help='Comma-separated concurrency levels')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Rows per batch microbenchmark')
+    parser.add_argument('--url', help='Benchmark this running server instead of starting one')
+    parser.add_argument('--port', type=int, default=5099, help='Port for the local benchmark server')
+    parser.add_argument('--output', help=f'Results file (default: {DEFAULT_RESULTS_DIR}/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Synthetic traffic must not end up in the prediction audit log or the
+    # live statistics; the server subprocess inherits these
+    os.environ.setdefault('PREDICTION_LOG', '0')
+    os.environ.setdefault('PREDICTION_STATS', '0')
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    suites = [suite.strip() for suite in args.suites.split(',') if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    concurrency_levels = [int(level) for level in args.concurrency.split(',')]
+
+    app_module = None
+    if 'micro' in suites or 'client' in suites or not args.url:
+        import app as app_module
+        current = app_module.get_serving_model()
+        model_version = current.version if current is not None else None
+    else:
+        model_version = None
+
+    results = {}
+    if 'micro' in suites:
+        print("⏱️  Microbenchmarks...")
+        results.update(run_micro(app_module, args.requests, args.batch_size))
+    if 'client' in suites:
+        print("⏱️  Test client...")
+        results.update(run_client(app_module, args.requests, concurrency_levels))
+    if 'server' in suites:
+        process = None
+        base_url = args.url
+        if base_url is None:
+            print(f"🚀 Starting local WSGI server on port {args.port}...")
+            process = start_local_server(args.port)
+            base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            print(f"⏱️  HTTP server at {base_url}...")
+            model_version = model_version or server_model_version(base_url)
+            results.update(run_server(base_url, args.requests, concurrency_levels))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print_results(results)
+
+    run = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'model_version': model_version,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'suites': suites,
+            'requests': args.requests,
+            'concurrency': concurrency_levels,
+            'batch_size': args.batch_size,
+            'url': args.url,
+            'model_load_mode': os.environ.get('MODEL_LOAD_MODE', 'pickle'),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{run['git_commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(run, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
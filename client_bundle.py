@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Client Bundle
+Description: Export the served model's full-domain prediction table as a
+compact binary asset that the prediction form evaluates in the browser.
+
+The form only offers 8 animals and 5 options in each of five disease groups,
+so the model's answer for all 25,000 inputs fits in a small file:
+
+    'AHB1' | header length (uint32 LE) | header (UTF-8 JSON)
+    | predicted class index per input (uint8)
+    | class probabilities per input x class (uint16 LE, scaled by 10,000)
+
+Inputs are stored in row-major order over the header's option axes, so the
+browser finds an input's entry by index arithmetic alone. Probabilities keep
+four decimals, which reproduces the confidence shown by /submit exactly.
+
+The web app serves the bundle of the model it is currently serving at
+/api/model/bundle; this script writes it to a directory for static hosting.
+
+Usage:
+    python client_bundle.py                         # write static/model/model-bundle.bin
+    python client_bundle.py --output-dir public/model
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+BUNDLE_MAGIC = b'AHB1'
+BUNDLE_FILE = 'model-bundle.bin'
+DEFAULT_OUTPUT_DIR = 'static/model'
+PROBABILITY_SCALE = 10000
+
+
+def encode_bundle(table, version, fields, labels, outcomes):
+    """
+    Bundle bytes for a built PredictionTable; outcomes holds the
+    {'status_class', 'health_status'} shown for each of the table's classes.
+    """
+    if not table.is_built:
+        raise ValueError("The prediction table has not been built")
+    header = {
+        'format': 1,
+        'version': version,
+        'fields': list(fields),
+        'labels': list(labels),
+        'axes': table.axes,
+        'classes': [str(label) for label in table.classes],
+        'outcomes': list(outcomes),
+        'rows': table.size,
+        'scale': PROBABILITY_SCALE,
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    probabilities = np.rint(table.probabilities * PROBABILITY_SCALE).astype('<u2')
+    return b''.join([
+        BUNDLE_MAGIC,
+        struct.pack('<I', len(header_bytes)),
+        header_bytes,
+        table.predictions.astype(np.uint8).tobytes(),
+        probabilities.tobytes(),
+    ])
+
+
+def decode_bundle(data):
+    """(header, predicted class indices, probabilities) from bundle bytes"""
+    if data[:4] != BUNDLE_MAGIC:
+        raise ValueError("Not a model bundle")
+    header_length, = struct.unpack_from('<I', data, 4)
+    offset = 8 + header_length
+    header = json.loads(data[8:offset].decode('utf-8'))
+    rows, n_classes = header['rows'], len(header['classes'])
+    predictions = np.frombuffer(data, dtype=np.uint8, count=rows, offset=offset)
+    probabilities = np.frombuffer(data, dtype='<u2', count=rows * n_classes, offset=offset + rows)
+    return header, predictions, probabilities.reshape(rows, n_classes) / header['scale']
+
+
+class ClientBundle:
+    """Bundle bytes with their gzipped form and a strong ETag"""
+
+    __slots__ = ('data', 'gzipped', 'etag')
+
+    def __init__(self, data):
+        self.data = data
+        # mtime=0 keeps the bytes, and so any cached copy, identical across workers
+        self.gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(data).hexdigest()[:32]
+
+
+def write_bundle(bundle, output_dir=DEFAULT_OUTPUT_DIR):
+    """Write the bundle and its .gz variant into output_dir atomically; returns the path"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, BUNDLE_FILE)
+    for target, data in ((path, bundle.data), (path + '.gz', bundle.gzipped)):
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, target)
+    return path
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Export the served model as a browser bundle')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    args = parser.parse_args()
+
+    # The bundle must match what the web app serves, so load the model the same way
+    os.environ.setdefault('PREDICTION_LOG', '0')
+    os.environ.setdefault('PREDICTION_STATS', '0')
+    import app as app_module
+
+    current = app_module.warm_model(start_watcher=False)
+    if current is None:
+        print(f"❌ Error: {app_module.model_status['error']}")
+        sys.exit(1)
+    try:
+        bundle = app_module.get_client_bundle(current)
+        path = write_bundle(bundle, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    print(f"✅ Model {current.version}: {current.prediction_table.size:,} inputs -> {path} "
+          f"({len(bundle.data):,} B, {len(bundle.gzipped):,} B .gz)")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,8 @@ class DeploymentHelper:
         
     def create_procfile(self):
         """Create Procfile for Heroku deployment"""
-        procfile_content = "web: python app.py"
+        # Pre-fork multi-worker server; WEB_CONCURRENCY sets the worker count
+        procfile_content = "web: python run.py --production --bind 0.0.0.0:$PORT"
         with open('Procfile', 'w') as f:
             f.write(procfile_content)
         print("✅ Procfile created")
@@ -85,17 +86,10 @@ class DeploymentHelper:
         print("4. Deploy: git push heroku main")
     
     def update_app_for_production(self):
-        """Update app.py for production deployment"""
-        production_code = '''
-# Add this to the end of app.py for production
-if __name__ == '__main__':
-    import os
-    port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
-'''
-        
+        """Explain how the production server is configured"""
         print("📝 Production configuration ready")
-        print("Note: Update the final lines in app.py with the production code above")
+        print("Note: The Procfile runs 'python run.py --production' (gunicorn, model preloaded before fork)")
+        print("      Tune it with WEB_CONCURRENCY (workers) and WEB_THREADS (threads per worker)")
     
     def create_docker_compose(self):
         """Create docker-compose.yml for container deployment"""
@@ -104,13 +98,20 @@ if __name__ == '__main__':
 services:
   web:
     build: .
+    command: python run.py --production --bind 0.0.0.0:5000
     ports:
       - "5000:5000"
     environment:
       - FLASK_ENV=production
       - SECRET_KEY=your-secret-key-here
+      - WEB_CONCURRENCY=4
+      - WEB_THREADS=2
+      # Share one copy of the model's node arrays across workers
+      - MODEL_LOAD_MODE=mmap
     volumes:
       - ./models:/app/models
+    # Give workers time to finish in-flight requests after SIGTERM
+    stop_grace_period: 35s
     restart: unless-stopped
     
   nginx:
@@ -119,6 +120,7 @@ services:
       - "80:80"
     volumes:
       - ./nginx.conf:/etc/nginx/nginx.conf
+      - ./static:/app/static:ro
     depends_on:
       - web
     restart: unless-stopped
@@ -149,11 +151,20 @@ http {
             proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
         }
         
-        location /static {
-            alias /app/static;
+        # Fingerprinted builds from static_assets.py never change
+        location /static/dist/ {
+            alias /app/static/dist/;
+            gzip_static on;
+            # brotli_static on;   # with the ngx_brotli module and .br files
             expires 1y;
             add_header Cache-Control "public, immutable";
         }
+        
+        location /static {
+            alias /app/static;
+            gzip_static on;
+            expires 1h;
+        }
     }
 }
 """
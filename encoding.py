@@ -0,0 +1,203 @@
+"""
+Form options and the schema-driven feature encoder shared by training and
+serving.
+
+A FeatureEncoder is built from a schema: one entry per model feature,
+naming the input column it comes from and, for categorical features, the
+{label: code} map. Training fits one and persists it next to the model;
+serving loads it (or uses FORM_ENCODER for the prediction form's model),
+validates it against the model's feature columns and encodes whole batches
+with precomputed NumPy lookup arrays.
+"""
+
+import joblib
+import numpy as np
+
+# Define animal categories and disease options
+ANIMAL_OPTIONS = ['Birds', 'Cats', 'Dogs', 'Horses', 'Cows', 'Sheep', 'Goats', 'Pigs']
+DISEASE_OPTIONS = {
+    'blood_brain': ['normal', 'anemia', 'leukemia', 'brain_tumor', 'encephalitis'],
+    'appearance': ['normal', 'skin_lesions', 'hair_loss', 'emaciation', 'swelling'],
+    'general': ['normal', 'fever', 'lethargy', 'coughing', 'vomiting'],
+    'lung': ['normal', 'pneumonia', 'asthma', 'difficulty_breathing', 'lung_infection'],
+    'abdominal': ['normal', 'bloating', 'diarrhea', 'abdominal_pain', 'constipation']
+}
+
+# Options offered for each form field, in the model's feature order
+FIELD_OPTIONS = [ANIMAL_OPTIONS] + list(DISEASE_OPTIONS.values())
+
+# Form field names, in the model's feature order
+FORM_FIELDS = ['animal_name', 'blood_brain_disease', 'appearance_disease',
+               'general_disease', 'lung_disease', 'abdominal_disease']
+
+# Column order the model was trained with (see models/feature_columns.pkl)
+FEATURE_NAMES = ['AnimalName', 'BloodBrainDisease', 'AppearenceDisease',
+                 'GeneralDisease', 'LungDisease', 'AbdominalDisease']
+
+# Encoding used when the model was trained
+ANIMAL_ENCODING = {'Birds': 0, 'Cats': 1, 'Dogs': 2, 'Horses': 3,
+                   'Cows': 4, 'Sheep': 5, 'Goats': 6, 'Pigs': 7}
+
+DISEASE_ENCODING = {'normal': 0, 'anemia': 1, 'leukemia': 2, 'brain_tumor': 3,
+                    'encephalitis': 4, 'skin_lesions': 5, 'hair_loss': 6,
+                    'emaciation': 7, 'swelling': 8, 'fever': 9, 'lethargy': 10,
+                    'coughing': 11, 'vomiting': 12, 'pneumonia': 13, 'asthma': 14,
+                    'difficulty_breathing': 15, 'lung_infection': 16, 'bloating': 17,
+                    'diarrhea': 18, 'abdominal_pain': 19, 'constipation': 20}
+
+SCHEMA_VERSION = 1
+
+
+def _to_float(value):
+    """A raw numeric value as float, or NaN if it is blank or not a number"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class FeatureEncoder:
+    """Encode raw input columns into model features according to a schema"""
+
+    def __init__(self, fields):
+        self.fields = [dict(field) for field in fields]
+
+        # Sorted label arrays with aligned codes, for vectorized searchsorted lookups
+        self._vocabularies = []
+        for field in self.fields:
+            categories = field.get('categories')
+            if categories is None:
+                self._vocabularies.append(None)
+                continue
+            labels = sorted(categories)
+            self._vocabularies.append((np.array(labels, dtype=str),
+                                       np.array([categories[label] for label in labels])))
+
+    @property
+    def feature_names(self):
+        return [field['name'] for field in self.fields]
+
+    @property
+    def input_fields(self):
+        return [field['source'] for field in self.fields]
+
+    @property
+    def is_categorical(self):
+        return all(vocabulary is not None for vocabulary in self._vocabularies)
+
+    def categories(self, field_index):
+        """{label: code} map of a categorical field"""
+        return self.fields[field_index]['categories']
+
+    @classmethod
+    def fit(cls, df, categorical_columns, feature_columns=None):
+        """Build an encoder from training data; categories get codes in sorted order like LabelEncoder"""
+        feature_columns = list(feature_columns if feature_columns is not None else df.columns)
+        return cls.fit_chunks([df], categorical_columns, feature_columns)
+
+    @classmethod
+    def fit_chunks(cls, chunks, categorical_columns, feature_columns):
+        """Like fit, but over an iterable of DataFrames that is consumed once"""
+        labels = {column: set() for column in categorical_columns if column in feature_columns}
+        for chunk in chunks:
+            for column, seen in labels.items():
+                seen.update(str(label) for label in chunk[column].astype(str).unique())
+
+        fields = []
+        for column in feature_columns:
+            field = {'name': column, 'source': column}
+            if column in labels:
+                field['categories'] = {label: code for code, label in enumerate(sorted(labels[column]))}
+            fields.append(field)
+        return cls(fields)
+
+    def to_dict(self):
+        return {'schema_version': SCHEMA_VERSION, 'fields': self.fields}
+
+    @classmethod
+    def from_dict(cls, schema):
+        if schema.get('schema_version') != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported encoder schema version {schema.get('schema_version')}")
+        return cls(schema['fields'])
+
+    def save(self, path):
+        """Persist the schema (plain Python types) with joblib"""
+        joblib.dump(self.to_dict(), path)
+
+    @classmethod
+    def load(cls, path):
+        return cls.from_dict(joblib.load(path))
+
+    def validate(self, feature_columns):
+        """Raise ValueError unless the encoder produces exactly feature_columns"""
+        if list(feature_columns) != self.feature_names:
+            raise ValueError(
+                f"Encoder produces features {self.feature_names}, "
+                f"but the model was trained on {list(feature_columns)}"
+            )
+
+    def encode_column(self, values, field_index):
+        """Vectorized encoding of one field; unknown or missing categories become -1"""
+        vocabulary = self._vocabularies[field_index]
+        if vocabulary is None:
+            try:
+                return np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                # Blank or non-numeric cells (e.g. from a CSV read as text) are missing
+                return np.array([_to_float(value) for value in values], dtype=np.float64)
+        labels, codes = vocabulary
+        values = np.asarray(values, dtype=str)
+        positions = np.searchsorted(labels, values).clip(0, len(labels) - 1)
+        return np.where(labels[positions] == values, codes[positions], -1)
+
+    def encode_columns(self, columns):
+        """
+        Encode a batch given as one sequence of raw values per field.
+
+        Returns the (n_rows, n_features) encoded matrix and a boolean mask of
+        the rows where every categorical value was known and every numeric
+        value present.
+        """
+        encoded = np.column_stack([
+            self.encode_column(values, field_index) for field_index, values in enumerate(columns)
+        ])
+        if self.is_categorical:
+            return encoded, (encoded >= 0).all(axis=1)
+
+        valid = np.ones(len(encoded), dtype=bool)
+        for field_index, vocabulary in enumerate(self._vocabularies):
+            column = encoded[:, field_index]
+            valid &= column >= 0 if vocabulary is not None else ~np.isnan(column)
+        return encoded, valid
+
+    def encode_records(self, records):
+        """Encode a list of dicts keyed by input field name"""
+        columns = [
+            [record.get(source) if isinstance(record, dict) else None for record in records]
+            for source in self.input_fields
+        ]
+        return self.encode_columns(columns)
+
+    def encode_record(self, values, default=0):
+        """Encode one row of raw values in field order; unknown categories get default"""
+        encoded = []
+        for field, value in zip(self.fields, values):
+            categories = field.get('categories')
+            encoded.append(categories.get(value, default) if categories is not None else float(value))
+        return encoded
+
+    def encode_frame(self, df):
+        """Encode a DataFrame's input columns into a DataFrame of model features"""
+        import pandas as pd
+
+        encoded, _ = self.encode_columns([df[source].to_numpy() for source in self.input_fields])
+        return pd.DataFrame(encoded, columns=self.feature_names, index=df.index)
+
+
+# Encoder for the prediction form's six categorical fields
+FORM_ENCODER = FeatureEncoder([
+    {'name': name, 'source': source, 'categories': categories}
+    for name, source, categories in zip(
+        FEATURE_NAMES, FORM_FIELDS,
+        [ANIMAL_ENCODING] + [DISEASE_ENCODING] * len(DISEASE_OPTIONS))
+])
@@ -0,0 +1,98 @@
+"""
+Per-feature explanations of tree ensemble predictions.
+
+Every split on a decision path moves the class distribution from that of
+the parent node to that of the child; the change is credited to the feature
+the parent split on. Summed over the path and averaged over the trees, each
+input feature gets a contribution per class, and
+
+    predicted probabilities = bias + contributions summed over features
+
+where bias is the class distribution of the training data at the roots.
+The walk reuses the compiled forest's flat node arrays: all (tree, row)
+pairs of a batch advance one level at a time with vectorized indexing, and
+contributions are accumulated with one bincount per class and level. The
+leaves reached on the way give the probabilities themselves, summed the way
+CompiledForest does so they are bit-identical to the model's predict_proba.
+"""
+
+import numpy as np
+
+from forest_compiler import EVAL_CHUNK_ROWS, CompiledForest, compile_forest
+from inference import INPUT_DTYPE
+
+
+class ForestExplainer:
+    """Feature contributions to the class probabilities of a tree classifier or forest"""
+
+    def __init__(self, model):
+        self.arrays = model.arrays if isinstance(model, CompiledForest) else compile_forest(model)
+        self.classes_ = self.arrays['classes']
+        self.n_features_in_ = self.arrays['n_features']
+
+        # Node class distributions, normalized in case the tree stores weighted counts
+        value = self.arrays['value']
+        totals = value.sum(axis=1, keepdims=True)
+        self.node_proba = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+        self.bias = self.node_proba[self.arrays['roots']].mean(axis=0)
+
+    def _explain_chunk(self, X):
+        arrays = self.arrays
+        feature, threshold = arrays['feature'], arrays['threshold']
+        children, is_leaf = arrays['children'], arrays['is_leaf']
+        node_proba = self.node_proba
+        n_rows, n_features = X.shape
+        n_trees, n_classes = len(arrays['roots']), node_proba.shape[1]
+
+        # One entry per (tree, row) pair, tree-major; walking pairs are dropped
+        # from active/current/rows once they reach a leaf
+        nodes = np.repeat(arrays['roots'], n_rows)
+        active = np.arange(len(nodes), dtype=np.intp)
+        current = nodes.copy()
+        rows = np.tile(np.arange(n_rows, dtype=np.intp), n_trees)
+        X_flat = X.ravel()
+
+        contributions = np.zeros((n_classes, n_rows * n_features))
+        for _ in range(arrays['max_depth']):
+            internal = ~np.take(is_leaf, current)
+            active, current, rows = active[internal], current[internal], rows[internal]
+            if not len(current):
+                break
+            # (row, feature split on) cell credited with this step's change
+            cells = rows * n_features
+            cells += np.take(feature, current)
+            go_left = np.take(X_flat, cells) <= np.take(threshold, current)
+            child = np.take(children, 2 * current + go_left)
+            change = np.take(node_proba, child, axis=0) - np.take(node_proba, current, axis=0)
+            for class_index in range(n_classes):
+                contributions[class_index] += np.bincount(
+                    cells, weights=change[:, class_index], minlength=n_rows * n_features)
+            current = child
+            nodes[active] = child
+
+        proba = np.add.reduce(np.take(arrays['value'], nodes, axis=0).reshape(n_trees, n_rows, -1), axis=0)
+        if arrays['is_forest']:
+            proba /= arrays['n_estimators']
+        contributions /= n_trees
+        return proba, contributions.reshape(n_classes, n_rows, n_features).transpose(1, 2, 0)
+
+    def explain(self, X):
+        """
+        (class probabilities, contributions) for a batch of encoded rows;
+        contributions has shape (rows, features, classes) and adds up, with
+        bias, to the probabilities (up to floating point rounding).
+        """
+        X = np.ascontiguousarray(X, dtype=INPUT_DTYPE)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features_in_})")
+        if not len(X):
+            return np.zeros((0, len(self.classes_))), np.zeros((0, self.n_features_in_, len(self.classes_)))
+        chunks = [self._explain_chunk(X[start:start + EVAL_CHUNK_ROWS])
+                  for start in range(0, len(X), EVAL_CHUNK_ROWS)]
+        return (np.concatenate([proba for proba, _ in chunks]),
+                np.concatenate([contributions for _, contributions in chunks]))
+
+
+def explain_batch(explainer, X):
+    """Score function for MicroBatcher: (class probabilities, contributions) per row"""
+    return explainer.explain(X)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Forest Compiler
+Description: Flatten a trained DecisionTree/RandomForest classifier into
+contiguous NumPy node arrays and evaluate it without sklearn dispatch.
+
+All trees are stored back to back in shared arrays (feature, threshold,
+child pointers, leaf class probabilities), and a batch is scored by walking
+every (tree, row) pair at once with vectorized indexing, dropping pairs as
+they reach a leaf. Results are bit-identical to the estimator's
+predict_proba: the walk uses the same float32 input and <= comparison as
+sklearn, and per-tree probabilities are summed in estimator order before
+dividing by the number of trees.
+
+Usage:
+    python forest_compiler.py                       # compile models/rfc.pkl
+    python forest_compiler.py --benchmark           # also time against sklearn
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from inference import predict_proba
+
+DEFAULT_MODEL_PATH = 'models/rfc.pkl'
+DEFAULT_OUTPUT_PATH = 'models/rfc_compiled.pkl'
+
+# Rows walked together; bounds the (trees x rows) working arrays
+EVAL_CHUNK_ROWS = 1024
+
+
+def compile_forest(model):
+    """Flatten a fitted tree classifier or forest into a dict of NumPy arrays"""
+    is_forest = hasattr(model, 'estimators_')
+    estimators = model.estimators_ if is_forest else [model]
+    n_classes = len(model.classes_)
+
+    roots, features, thresholds, children, leaves, values = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+
+        # Child pointers are interleaved as (right, left) so the next node is
+        # children[2 * node + (x <= threshold)]
+        node_children = np.empty(2 * tree.node_count, dtype=np.intp)
+        node_children[0::2] = tree.children_right + offset
+        node_children[1::2] = tree.children_left + offset
+
+        roots.append(offset)
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        children.append(node_children)
+        leaves.append(is_leaf)
+        values.append(tree.value[:, 0, :n_classes])
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return {
+        'classes': np.asarray(model.classes_),
+        'feature_names': np.asarray(getattr(model, 'feature_names_in_', []), dtype=object),
+        'n_features': int(model.n_features_in_),
+        'n_estimators': len(estimators),
+        'is_forest': is_forest,
+        'max_depth': int(max_depth),
+        'roots': np.asarray(roots, dtype=np.intp),
+        'feature': np.concatenate(features).astype(np.intp),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'children': np.concatenate(children),
+        'is_leaf': np.concatenate(leaves),
+        'value': np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+    }
+
+
+class CompiledForest:
+    """Array-based evaluator with the predict/predict_proba interface of the source model"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.classes_ = arrays['classes']
+        self.n_features_in_ = arrays['n_features']
+        if len(arrays['feature_names']):
+            self.feature_names_in_ = arrays['feature_names']
+        self.n_estimators = arrays['n_estimators']
+
+    @property
+    def node_count(self):
+        return len(self.arrays['feature'])
+
+    def _predict_chunk(self, X):
+        arrays = self.arrays
+        feature, threshold = arrays['feature'], arrays['threshold']
+        children, is_leaf, value = arrays['children'], arrays['is_leaf'], arrays['value']
+        n_rows, n_features = X.shape
+        n_trees = len(arrays['roots'])
+
+        # One entry per (tree, row) pair, tree-major so each tree's nodes stay hot
+        nodes = np.repeat(arrays['roots'], n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        X_flat = X.ravel()
+
+        active = np.arange(len(nodes), dtype=np.intp)
+        current = nodes.copy()
+        for _ in range(arrays['max_depth']):
+            internal = ~np.take(is_leaf, current)
+            active, current = active[internal], current[internal]
+            if not len(active):
+                break
+            feature_index = np.take(feature, current)
+            feature_index += np.take(row_offsets, active)
+            go_left = np.take(X_flat, feature_index) <= np.take(threshold, current)
+            current *= 2
+            current += go_left
+            current = np.take(children, current)
+            nodes[active] = current
+
+        # Reducing over the leading tree axis adds trees one at a time, in
+        # estimator order, exactly like the forest's own accumulation
+        proba = np.add.reduce(np.take(value, nodes, axis=0).reshape(n_trees, n_rows, -1), axis=0)
+        if arrays['is_forest']:
+            proba /= arrays['n_estimators']
+        return proba
+
+    def predict_proba(self, X):
+        """Class probabilities, bit-identical to the source model's predict_proba"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input of shape (n_samples, {self.n_features_in_})")
+        if len(X) <= EVAL_CHUNK_ROWS:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + EVAL_CHUNK_ROWS])
+            for start in range(0, len(X), EVAL_CHUNK_ROWS)
+        ])
+
+    def predict(self, X):
+        """Predicted class labels"""
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+
+def export_compiled_forest(model, output_path=DEFAULT_OUTPUT_PATH):
+    """Compile a model and save its arrays uncompressed with joblib"""
+    arrays = compile_forest(model)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    joblib.dump(arrays, output_path)
+    return CompiledForest(arrays)
+
+
+def load_compiled_forest(path=DEFAULT_OUTPUT_PATH, mmap_mode=None):
+    """Load a compiled forest saved by export_compiled_forest"""
+    return CompiledForest(joblib.load(path, mmap_mode=mmap_mode))
+
+
+def verify_compiled_forest(model, compiled, X):
+    """Raise AssertionError unless compiled probabilities match the model bit for bit"""
+    expected = predict_proba(model, np.asarray(X, dtype=np.float32))
+    actual = compiled.predict_proba(X)
+    if not np.array_equal(expected, actual):
+        mismatched = int((expected != actual).any(axis=1).sum())
+        raise AssertionError(f"Compiled forest differs from the model on {mismatched} rows")
+
+
+def full_domain():
+    """Every input the web form can produce, encoded"""
+    from encoding import FIELD_OPTIONS, FORM_ENCODER
+    from prediction_table import PredictionTable
+    return PredictionTable(FORM_ENCODER, FIELD_OPTIONS).domain
+
+
+def _time_call(function, X, min_seconds=0.5):
+    """Median seconds per call, repeating until min_seconds have elapsed"""
+    timings = []
+    deadline = time.perf_counter() + min_seconds
+    while len(timings) < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        function(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def benchmark(model, compiled, batch_sizes=(1, 100, 100000), seed=0):
+    """Compare sklearn predict_proba with the compiled evaluator; returns result rows"""
+    domain = full_domain().astype(np.float32)
+    rng = np.random.default_rng(seed)
+    results = []
+    for batch_size in batch_sizes:
+        X = domain[rng.integers(0, len(domain), batch_size)]
+        sklearn_seconds = _time_call(model.predict_proba, X)
+        compiled_seconds = _time_call(compiled.predict_proba, X)
+        results.append({
+            'batch_size': batch_size,
+            'sklearn_ms': sklearn_seconds * 1000,
+            'compiled_ms': compiled_seconds * 1000,
+            'speedup': sklearn_seconds / compiled_seconds,
+        })
+    return results
+
+
+def main():
+    """Compile, verify and optionally benchmark a trained model"""
+    parser = argparse.ArgumentParser(description='Compile a trained forest to flat arrays')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Trained model to compile')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='Where to save the compiled arrays')
+    parser.add_argument('--benchmark', action='store_true', help='Time against sklearn predict_proba')
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    compiled = export_compiled_forest(model, args.output)
+    print(f"✅ Compiled {compiled.n_estimators} tree(s), {compiled.node_count} nodes -> {args.output}")
+
+    verify_compiled_forest(model, compiled, full_domain())
+    print("✅ Probabilities are bit-identical to sklearn on the full input domain")
+
+    if args.benchmark:
+        print(f"\n{'batch':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+        for row in benchmark(model, compiled):
+            print(f"{row['batch_size']:>8} {row['sklearn_ms']:>12.3f} "
+                  f"{row['compiled_ms']:>12.3f} {row['speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
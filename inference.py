@@ -0,0 +1,66 @@
+"""
+DataFrame-free inference helpers for the serving path.
+
+Predictions are made from plain NumPy arrays with a single predict_proba
+call; the predicted class is taken from the argmax over model.classes_,
+which is exactly what predict() does for tree models.
+"""
+
+import threading
+import warnings
+
+import numpy as np
+
+# Trees evaluate on float32 input, so rows are built in that dtype up front
+INPUT_DTYPE = np.float32
+
+_row_buffers = threading.local()
+
+
+def check_feature_names(model, feature_names):
+    """Raise ValueError if the model was trained on different features"""
+    expected = getattr(model, 'feature_names_in_', None)
+    if expected is not None:
+        if list(expected) != list(feature_names):
+            raise ValueError(
+                f"Model was trained on features {list(expected)}, "
+                f"but serving provides {list(feature_names)}"
+            )
+    elif getattr(model, 'n_features_in_', len(feature_names)) != len(feature_names):
+        raise ValueError(
+            f"Model expects {model.n_features_in_} features, "
+            f"but serving provides {len(feature_names)}"
+        )
+
+
+def input_row(n_features):
+    """Return this thread's preallocated (1, n_features) input row"""
+    row = getattr(_row_buffers, 'row', None)
+    if row is None or row.shape[1] != n_features:
+        row = np.zeros((1, n_features), dtype=INPUT_DTYPE)
+        _row_buffers.row = row
+    return row
+
+
+def predict_proba(model, X):
+    """
+    model.predict_proba on a NumPy array. Feature names are verified once by
+    check_feature_names() when the model is loaded, so sklearn's warning
+    about unnamed input is silenced for this call only.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names',
+                                category=UserWarning)
+        return model.predict_proba(X)
+
+
+def predict_one(model, row):
+    """Return (predicted class, class probabilities) for a single input row"""
+    probabilities = predict_proba(model, row)[0]
+    return model.classes_[probabilities.argmax()], probabilities
+
+
+def predict_batch(model, X):
+    """Return (predicted classes, class probabilities) for a batch of rows"""
+    probabilities = predict_proba(model, np.asarray(X, dtype=INPUT_DTYPE))
+    return model.classes_.take(probabilities.argmax(axis=1)), probabilities
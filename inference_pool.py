@@ -0,0 +1,322 @@
+"""
+Process-pool inference backend.
+
+Tree traversal in sklearn holds the GIL for small batches, so threads of one
+web worker cannot score in parallel. An InferencePool hands scoring to
+long-lived worker processes instead:
+
+- the model is written once as flat NumPy arrays (see forest_compiler.py)
+  and every worker maps that file read-only, so all of them share one copy
+  through the OS page cache;
+- each worker owns a fixed-size shared memory slot holding an input block
+  (max_rows x n_features, float32) and an output block (max_rows x
+  n_classes, float64); a request copies its rows in, sends the row count
+  over a pipe and reads the probabilities back, so nothing but an integer
+  is pickled per call.
+
+The pool has the predict_proba/classes_ interface of the model, so it can
+be passed wherever the model is scored. Workers are spawned on first use in
+the process that scores, which keeps the pool safe to create before a
+pre-fork server forks. Once closed, the pool scores with the model in the
+calling process, including requests that were waiting for a worker.
+
+Every process whose pool uses an exported file holds a shared lock on it;
+the last one to close removes the file (where fcntl is available).
+"""
+
+import os
+import queue
+import threading
+import weakref
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import joblib
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: exported models are left in place
+    fcntl = None
+
+from inference import INPUT_DTYPE, predict_proba
+
+DEFAULT_MAX_ROWS = 1024
+
+
+def export_for_workers(model, path):
+    """Write the model where workers can map it; tree models are compiled to flat arrays"""
+    if os.path.exists(path):
+        return path
+
+    from forest_compiler import CompiledForest, compile_forest
+
+    if isinstance(model, CompiledForest):
+        payload = model.arrays
+    else:
+        try:
+            payload = compile_forest(model)
+        except (AttributeError, TypeError):
+            # Not a tree model; workers unpickle it instead
+            payload = model
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(payload, temp_path)
+    os.replace(temp_path, path)
+    return path
+
+
+def _open_export(model, path):
+    """
+    Export the model if needed and take a shared lock on the file, held while
+    this process's pool uses it; returns the locked file, or None without fcntl
+    """
+    for _ in range(3):
+        export_for_workers(model, path)
+        if fcntl is None:
+            return None
+        try:
+            export_file = open(path, 'rb')
+        except FileNotFoundError:
+            # Removed by its last user in between; export it again
+            continue
+        fcntl.flock(export_file.fileno(), fcntl.LOCK_SH)
+        try:
+            if os.path.samestat(os.fstat(export_file.fileno()), os.stat(path)):
+                return export_file
+        except FileNotFoundError:
+            pass
+        export_file.close()
+    raise RuntimeError(f"Could not export the model to {path}")
+
+
+def _slot_arrays(buffer, max_rows, n_features, n_classes):
+    """Input and output views over a worker's shared memory slot"""
+    inputs = np.ndarray((max_rows, n_features), dtype=INPUT_DTYPE, buffer=buffer)
+    outputs = np.ndarray((max_rows, n_classes), dtype=np.float64, buffer=buffer,
+                         offset=inputs.nbytes)
+    return inputs, outputs
+
+
+def _worker_main(model_path, shm_name, max_rows, n_features, n_classes, conn):
+    """Worker loop: score the first n rows of the slot for every n received"""
+    from forest_compiler import CompiledForest
+
+    loaded = joblib.load(model_path, mmap_mode='r')
+    model = CompiledForest(loaded) if isinstance(loaded, dict) else loaded
+
+    # Spawned workers share the parent's resource tracker, which unlinks the
+    # segment if the parent dies without closing the pool
+    shm = SharedMemory(name=shm_name)
+    inputs, outputs = _slot_arrays(shm.buf, max_rows, n_features, n_classes)
+
+    try:
+        while True:
+            n_rows = conn.recv()
+            if n_rows is None:
+                break
+            try:
+                outputs[:n_rows] = predict_proba(model, inputs[:n_rows])
+                conn.send(None)
+            except Exception as e:
+                conn.send(f"{type(e).__name__}: {e}")
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del inputs, outputs
+        shm.close()
+
+
+class _Worker:
+    """One worker process with its pipe and shared memory slot"""
+
+    def __init__(self, context, model_path, max_rows, n_features, n_classes):
+        slot_bytes = max_rows * (n_features * np.dtype(INPUT_DTYPE).itemsize
+                                 + n_classes * np.dtype(np.float64).itemsize)
+        self.shm = SharedMemory(create=True, size=slot_bytes)
+        self.inputs, self.outputs = _slot_arrays(self.shm.buf, max_rows, n_features, n_classes)
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, name='inference-worker', daemon=True,
+            args=(model_path, self.shm.name, max_rows, n_features, n_classes, child_conn))
+        self.process.start()
+        child_conn.close()
+
+    def send(self, rows):
+        self.inputs[:len(rows)] = rows
+        self.conn.send(len(rows))
+
+    def receive(self, n_rows):
+        error = self.conn.recv()
+        if error is not None:
+            raise RuntimeError(f"Inference worker failed: {error}")
+        return self.outputs[:n_rows].copy()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        del self.inputs, self.outputs
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _stop_workers(workers):
+    for worker in workers:
+        worker.stop()
+
+
+class InferencePool:
+    """Score with a pool of worker processes through the model's predict_proba interface"""
+
+    def __init__(self, model, model_path, n_workers=None, max_rows=DEFAULT_MAX_ROWS):
+        self.model = model
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.model_path = model_path
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.max_rows = max_rows
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._workers = []
+        self._free = None
+        self._closed = False
+        self._finalizer = None
+        self._export_file = None
+
+    def _start(self):
+        """Spawn this process's workers unless they are already running or the pool is closed"""
+        with self._lock:
+            # Workers inherited across fork() belong to the parent
+            if self._pid == os.getpid() or self._closed:
+                return
+            self._export_file = _open_export(self.model, self.model_path)
+            # spawn: forking a threaded web worker is not safe
+            context = get_context('spawn')
+            n_classes = len(self.classes_)
+            self._workers = [_Worker(context, self.model_path, self.max_rows, self.n_features_in_, n_classes)
+                             for _ in range(self.n_workers)]
+            self._free = queue.SimpleQueue()
+            for worker in self._workers:
+                self._free.put(worker)
+            self._finalizer = weakref.finalize(self, _stop_workers, self._workers)
+            self._pid = os.getpid()
+
+    def _finish(self, worker, n_rows):
+        try:
+            return worker.receive(n_rows)
+        except (EOFError, OSError):
+            # The process died; replace it so the pool keeps its size
+            worker = self._replace(worker)
+            raise RuntimeError("Inference worker exited unexpectedly")
+        finally:
+            self._free.put(worker)
+
+    def _replace(self, worker):
+        with self._lock:
+            if self._closed:
+                # close() stops every worker, this one included
+                return worker
+            worker.stop()
+            replacement = _Worker(get_context('spawn'), self.model_path, self.max_rows,
+                                  self.n_features_in_, len(self.classes_))
+            self._workers[self._workers.index(worker)] = replacement
+            return replacement
+
+    def predict_proba(self, X):
+        """Class probabilities; batches over max_rows are split across idle workers"""
+        X = np.asarray(X, dtype=INPUT_DTYPE)
+        if self._closed:
+            # A swapped-out model may still be finishing requests
+            return predict_proba(self.model, X)
+        if self._pid != os.getpid():
+            self._start()
+            if self._closed:
+                return predict_proba(self.model, X)
+
+        results = []
+        in_flight = []
+        try:
+            for start in range(0, len(X), self.max_rows):
+                rows = X[start:start + self.max_rows]
+                while True:
+                    try:
+                        # Block for a worker only while holding none, so a
+                        # request never waits on workers it is itself holding
+                        worker = self._free.get_nowait() if in_flight else self._free.get()
+                        break
+                    except queue.Empty:
+                        results.append(self._finish(*in_flight.pop(0)))
+                if worker is None or self._pid != os.getpid():
+                    # The pool closed while this request waited: pass the
+                    # wake-up on and score the remaining rows here, in order
+                    self._free.put(None)
+                    while in_flight:
+                        results.append(self._finish(*in_flight.pop(0)))
+                    results.append(predict_proba(self.model, rows))
+                    continue
+                in_flight.append((worker, len(rows)))
+                try:
+                    worker.send(rows)
+                except OSError:
+                    # Collected (and replaced) below
+                    raise RuntimeError("Inference worker exited unexpectedly")
+            while in_flight:
+                results.append(self._finish(*in_flight.pop(0)))
+        finally:
+            # On failure, still collect every worker this request holds
+            for worker, n_rows in in_flight:
+                try:
+                    self._finish(worker, n_rows)
+                except RuntimeError:
+                    pass
+
+        if not results:
+            return np.empty((0, len(self.classes_)))
+        return results[0] if len(results) == 1 else np.concatenate(results)
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def close(self, timeout=30):
+        """
+        Stop the workers once in-flight calls return them, and delete the
+        exported model if no other process uses it; later calls score in
+        this process
+        """
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            started = self._pid == os.getpid()
+        if started:
+            # Drain without holding _lock, which a request needs to replace a dead worker
+            for _ in range(self.n_workers):
+                try:
+                    self._free.get(timeout=timeout)
+                except queue.Empty:
+                    break
+            # Wakes requests blocked waiting for a worker; each one puts it back
+            self._free.put(None)
+            with self._lock:
+                self._finalizer()
+                self._workers = []
+                self._pid = None
+                export_file, self._export_file = self._export_file, None
+            if export_file is not None:
+                try:
+                    # Only granted once no other process holds its shared lock,
+                    # so pools still serving this version can respawn workers
+                    fcntl.flock(export_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(self.model_path)
+                except OSError:
+                    pass
+                finally:
+                    export_file.close()
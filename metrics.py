@@ -0,0 +1,242 @@
+"""
+Request metrics in the Prometheus text exposition format.
+
+Counters, gauges and fixed-bucket histograms are kept in plain dicts keyed
+by label values, guarded by one lock per metric, so recording a request
+costs a few microseconds and needs no extra dependency. Metrics are per
+process; with several workers each one reports its own.
+
+RequestMetrics ties them to the web app: handlers mark the end of each
+stage on a StageTimer, and the request's stage timings, total duration and
+outcome are recorded once the response has been sent. Requests slower than
+a threshold can be sampled to a structured (JSON lines) log.
+"""
+
+import bisect
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+# Seconds; spans sub-millisecond table lookups up to slow renders
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+                for labels, value in items]
+
+
+class Gauge(Counter):
+    """Value per label combination that can go up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Observation counts in fixed cumulative buckets, plus sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(upper)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition of every registered metric"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Split a request into named stages; lap(stage) closes the stage that just ran"""
+
+    __slots__ = ('start', 'last', 'stages')
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+class SlowRequestLog:
+    """Write a sample of requests slower than threshold_ms to a JSON lines log"""
+
+    def __init__(self, threshold_ms, sample_rate=1.0, path=None):
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = sample_rate
+        self.logger = logging.getLogger('slow_requests')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = logging.FileHandler(path) if path else logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger.addHandler(handler)
+
+    def maybe_log(self, duration, record):
+        if duration < self.threshold:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        record = dict(record, duration_ms=round(duration * 1000, 3),
+                      time=datetime.now(timezone.utc).isoformat())
+        self.logger.info(json.dumps(record))
+
+
+class RequestMetrics:
+    """Per-stage timings, request outcomes and model version of the web app"""
+
+    def __init__(self, slow_log=None):
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.register(Counter(
+            'animal_health_requests_total', 'Requests by endpoint, outcome and model version',
+            ('endpoint', 'outcome', 'model_version')))
+        self.duration = self.registry.register(Histogram(
+            'animal_health_request_duration_seconds', 'Time from request start until the response was sent',
+            ('endpoint', 'model_version')))
+        self.stages = self.registry.register(Histogram(
+            'animal_health_request_stage_seconds', 'Time spent in each stage of a request',
+            ('endpoint', 'stage')))
+        self.model_info = self.registry.register(Gauge(
+            'animal_health_model_info', 'Model version currently being served (value is always 1)',
+            ('model_version',)))
+        self.micro_batch_size = self.registry.register(Histogram(
+            'animal_health_micro_batch_size', 'Rows scored together by the micro-batcher',
+            buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)))
+        self.micro_batch_seconds = self.registry.register(Histogram(
+            'animal_health_micro_batch_seconds', 'Time spent scoring one micro-batch'))
+        self.slow_log = slow_log
+
+    def set_model_version(self, version):
+        self.model_info.clear()
+        self.model_info.set(1, version)
+
+    def record(self, timer, endpoint, outcome, model_version, status, method, path):
+        """Record a finished request"""
+        duration = timer.elapsed()
+        model_version = model_version or ''
+        self.requests.inc(endpoint, outcome, model_version)
+        self.duration.observe(duration, endpoint, model_version)
+        for stage, seconds in timer.stages:
+            self.stages.observe(seconds, endpoint, stage)
+
+        if self.slow_log is not None:
+            self.slow_log.maybe_log(duration, {
+                'endpoint': endpoint,
+                'method': method,
+                'path': path,
+                'status': status,
+                'outcome': outcome,
+                'model_version': model_version,
+                'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in timer.stages},
+            })
+
+    def record_micro_batch(self, size, seconds):
+        self.micro_batch_size.observe(size)
+        self.micro_batch_seconds.observe(seconds)
+
+    def render(self):
+        return self.registry.render()
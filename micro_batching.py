@@ -0,0 +1,116 @@
+"""
+Micro-batching of live single-row predictions.
+
+A forest's predict_proba costs about the same for one row as for a few
+dozen, so under concurrent load it is cheaper to score requests together.
+Request threads hand their encoded row to a MicroBatcher and wait on a
+future; one scheduler thread collects rows for up to a short window (or
+until the batch is full), scores them with a single predict_proba call and
+resolves each future with its own row's result.
+
+The scheduler thread starts on first use and exits after being idle for a
+while, so a batcher is safe to create before a pre-fork server forks and
+batchers of models that have been swapped out do not keep threads alive.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference import INPUT_DTYPE, predict_batch
+
+DEFAULT_WINDOW_SECONDS = 0.002
+DEFAULT_MAX_BATCH_SIZE = 64
+IDLE_SECONDS = 30
+
+
+class MicroBatcher:
+    """Score rows submitted from many threads in shared predict_proba calls"""
+
+    def __init__(self, model, n_features, window_seconds=DEFAULT_WINDOW_SECONDS,
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, on_batch=None, score=predict_batch):
+        self.model = model
+        # score(model, rows) returns two arrays with one entry per row
+        self.score = score
+        self.n_features = n_features
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        # Called with (batch size, seconds spent scoring) after every batch
+        self.on_batch = on_batch
+
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._buffer = np.zeros((max_batch_size, n_features), dtype=INPUT_DTYPE)
+
+    def submit(self, encoded_features):
+        """Queue one encoded row; returns a Future of (predicted class, class probabilities)"""
+        future = Future()
+        with self._lock:
+            self._queue.put((encoded_features, future))
+            # A thread inherited across fork() is not alive in the child
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+        return future
+
+    def predict(self, encoded_features, timeout=None):
+        """Block until the row's batch has been scored"""
+        return self.submit(encoded_features).result(timeout)
+
+    async def predict_async(self, encoded_features):
+        """Await the row's result from a coroutine without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(encoded_features))
+
+    def _collect(self, first):
+        """The first row plus whatever arrives within the window, up to max_batch_size"""
+        batch = [first]
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take rows that queued up meanwhile
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _score(self, batch):
+        futures = []
+        for encoded_features, future in batch:
+            if future.set_running_or_notify_cancel():
+                self._buffer[len(futures)] = encoded_features
+                futures.append(future)
+        if not futures:
+            return
+
+        start = time.perf_counter()
+        try:
+            predictions, probabilities = self.score(self.model, self._buffer[:len(futures)])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for position, future in enumerate(futures):
+            future.set_result((predictions[position], probabilities[position]))
+
+        if self.on_batch is not None:
+            self.on_batch(len(futures), time.perf_counter() - start)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=IDLE_SECONDS)
+            except queue.Empty:
+                with self._lock:
+                    # submit() starts a new thread for rows queued after this
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            self._score(self._collect(first))
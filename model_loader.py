@@ -0,0 +1,83 @@
+"""
+Model loading for the serving path.
+
+Two load modes are supported:
+
+- ``pickle``: the trained estimator is unpickled with joblib, as before.
+- ``mmap``: the estimator is compiled once to flat NumPy node arrays
+  (see forest_compiler.py) saved next to it, and every worker maps that
+  file read-only with ``joblib.load(mmap_mode='r')``. The pages are shared
+  between processes through the OS page cache instead of each worker
+  holding a private copy, and sklearn is never imported by the workers.
+"""
+
+import os
+
+import joblib
+
+from encoding import FeatureEncoder
+from inference import check_feature_names
+
+LOAD_MODES = ('pickle', 'mmap')
+
+
+def compiled_path_for(model_path):
+    """Path of the compiled, mmap-able arrays kept next to a model file"""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}_compiled.pkl"
+
+
+def encoder_path_for(model_path):
+    """Path of the feature encoder persisted next to a model file"""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}_encoder.pkl"
+
+
+def load_feature_encoder(model_path, feature_columns_path=None, default=None):
+    """
+    Load the encoder saved next to model_path, or default if there is none,
+    and validate it against the feature columns file when one exists.
+    """
+    encoder_path = encoder_path_for(model_path)
+    if os.path.exists(encoder_path):
+        encoder = FeatureEncoder.load(encoder_path)
+    elif default is not None:
+        encoder = default
+    else:
+        raise ValueError(f"No feature encoder found at {encoder_path}")
+
+    if feature_columns_path and os.path.exists(feature_columns_path):
+        encoder.validate(joblib.load(feature_columns_path))
+    return encoder
+
+
+def ensure_compiled(model_path):
+    """Compile model_path unless an up-to-date compiled file already exists"""
+    compiled_path = compiled_path_for(model_path)
+    if (os.path.exists(compiled_path)
+            and os.path.getmtime(compiled_path) >= os.path.getmtime(model_path)):
+        return compiled_path
+
+    from forest_compiler import export_compiled_forest
+
+    # Write to a private temp file and rename, so workers starting at the
+    # same time never map a half-written file
+    temp_path = f"{compiled_path}.{os.getpid()}.tmp"
+    export_compiled_forest(joblib.load(model_path), temp_path)
+    os.replace(temp_path, compiled_path)
+    return compiled_path
+
+
+def load_model(model_path, feature_names=None, mode='pickle'):
+    """Load a model in the given mode and check it expects feature_names (if given)"""
+    if mode == 'mmap':
+        from forest_compiler import load_compiled_forest
+        model = load_compiled_forest(ensure_compiled(model_path), mmap_mode='r')
+    elif mode == 'pickle':
+        model = joblib.load(model_path)
+    else:
+        raise ValueError(f"Unknown model load mode '{mode}', expected one of {LOAD_MODES}")
+
+    if feature_names is not None:
+        check_feature_names(model, feature_names)
+    return model
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Model Registry
+Description: Versioned store of trained models for zero-downtime deploys.
+
+Each version bundles the model, its label encoders, feature columns and
+metadata together with a content hash:
+
+    models/registry/
+        ACTIVE                          # name of the version being served
+        v20260101-120000-1a2b3c4d/
+            model.pkl
+            feature_encoder.pkl         # optional, FeatureEncoder schema
+            label_encoders.pkl          # optional
+            feature_columns.pkl         # optional
+            model_info.pkl              # optional
+            manifest.json               # version, created_at, content_hash, files
+
+Versions are written to a temporary directory and renamed into place, and
+ACTIVE is replaced atomically, so a running server never sees a partial
+version. ModelWatcher polls for changes and lets the server swap models
+without a restart.
+
+Usage:
+    python model_registry.py publish models/rfc.pkl --feature-columns models/feature_columns.pkl
+    python model_registry.py list
+    python model_registry.py activate v20260101-120000-1a2b3c4d
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = 'models/registry'
+ACTIVE_FILE = 'ACTIVE'
+MANIFEST_FILE = 'manifest.json'
+
+# Bundle member -> file name inside a version directory
+BUNDLE_FILES = {
+    'model': 'model.pkl',
+    'feature_encoder': 'feature_encoder.pkl',
+    'label_encoders': 'label_encoders.pkl',
+    'feature_columns': 'feature_columns.pkl',
+    'model_info': 'model_info.pkl',
+}
+
+
+def content_hash(directory, file_names):
+    """SHA-256 over the bundle files, in a fixed order"""
+    digest = hashlib.sha256()
+    for file_name in sorted(file_names):
+        digest.update(file_name.encode())
+        with open(os.path.join(directory, file_name), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def active_version(registry_dir=DEFAULT_REGISTRY_DIR):
+    """Name of the active version, or None if nothing was published"""
+    try:
+        with open(os.path.join(registry_dir, ACTIVE_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_active(version, registry_dir=DEFAULT_REGISTRY_DIR):
+    """Make an existing version the one being served"""
+    if not os.path.isfile(os.path.join(registry_dir, version, MANIFEST_FILE)):
+        raise ValueError(f"Unknown model version '{version}'")
+    _write_atomic(os.path.join(registry_dir, ACTIVE_FILE), version + '\n')
+
+
+def read_manifest(version, registry_dir=DEFAULT_REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def list_versions(registry_dir=DEFAULT_REGISTRY_DIR):
+    """Manifests of all published versions, oldest first"""
+    if not os.path.isdir(registry_dir):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(registry_dir)):
+        if os.path.isfile(os.path.join(registry_dir, name, MANIFEST_FILE)):
+            manifests.append(read_manifest(name, registry_dir))
+    return manifests
+
+
+def _publish_directory(staging_dir, registry_dir, activate, metadata):
+    """Hash a filled staging directory, move it into the registry and optionally activate it"""
+    file_names = [name for name in BUNDLE_FILES.values()
+                  if os.path.exists(os.path.join(staging_dir, name))]
+    if BUNDLE_FILES['model'] not in file_names:
+        raise ValueError("A model version needs a model file")
+
+    digest = content_hash(staging_dir, file_names)
+    created_at = datetime.now(timezone.utc)
+    version = f"v{created_at:%Y%m%d-%H%M%S}-{digest[:8]}"
+    manifest = {
+        'version': version,
+        'created_at': created_at.isoformat(),
+        'content_hash': digest,
+        'files': file_names,
+    }
+    manifest.update(metadata or {})
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    os.rename(staging_dir, os.path.join(registry_dir, version))
+    if activate:
+        set_active(version, registry_dir)
+    return version
+
+
+def publish_files(model_file, registry_dir=DEFAULT_REGISTRY_DIR, feature_encoder_file=None,
+                  label_encoders_file=None, feature_columns_file=None, model_info_file=None,
+                  activate=True, metadata=None):
+    """Copy existing model files into a new version; returns the version name"""
+    os.makedirs(registry_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=registry_dir)
+    os.chmod(staging_dir, 0o755)
+    try:
+        sources = {
+            'model': model_file,
+            'feature_encoder': feature_encoder_file,
+            'label_encoders': label_encoders_file,
+            'feature_columns': feature_columns_file,
+            'model_info': model_info_file,
+        }
+        for member, source in sources.items():
+            if source:
+                shutil.copyfile(source, os.path.join(staging_dir, BUNDLE_FILES[member]))
+        return _publish_directory(staging_dir, registry_dir, activate, metadata)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+
+def publish_objects(model, registry_dir=DEFAULT_REGISTRY_DIR, feature_encoder=None,
+                    label_encoders=None, feature_columns=None, model_info=None,
+                    activate=True, metadata=None):
+    """Dump in-memory training results into a new version; returns the version name"""
+    os.makedirs(registry_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix='.staging-', dir=registry_dir)
+    os.chmod(staging_dir, 0o755)
+    try:
+        objects = {
+            'model': model,
+            # Persist the encoder's plain schema rather than the object
+            'feature_encoder': feature_encoder.to_dict() if feature_encoder is not None else None,
+            'label_encoders': label_encoders,
+            'feature_columns': feature_columns,
+            'model_info': model_info,
+        }
+        for member, value in objects.items():
+            if value is not None:
+                joblib.dump(value, os.path.join(staging_dir, BUNDLE_FILES[member]))
+        return _publish_directory(staging_dir, registry_dir, activate, metadata)
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+
+
+class ModelBundle:
+    """A published version loaded into memory"""
+
+    def __init__(self, version, content_hash, model, feature_encoder=None, label_encoders=None,
+                 feature_columns=None, model_info=None):
+        self.version = version
+        self.content_hash = content_hash
+        self.model = model
+        self.feature_encoder = feature_encoder
+        self.label_encoders = label_encoders
+        self.feature_columns = feature_columns
+        self.model_info = model_info
+
+
+def load_bundle(version, model_loader, registry_dir=DEFAULT_REGISTRY_DIR, verify=True,
+                members=('feature_encoder', 'label_encoders', 'feature_columns', 'model_info')):
+    """
+    Load a version. model_loader(path) loads the model file, so callers can
+    choose the load mode and validation; the listed other members are
+    loaded with joblib when the version has them.
+    """
+    version_dir = os.path.join(registry_dir, version)
+    manifest = read_manifest(version, registry_dir)
+    if verify and content_hash(version_dir, manifest['files']) != manifest['content_hash']:
+        raise ValueError(f"Content hash mismatch for model version '{version}'")
+
+    loaded_members = {}
+    for member in members:
+        file_name = BUNDLE_FILES[member]
+        if file_name in manifest['files']:
+            loaded_members[member] = joblib.load(os.path.join(version_dir, file_name))
+
+    model = model_loader(os.path.join(version_dir, BUNDLE_FILES['model']))
+    return ModelBundle(version, manifest['content_hash'], model, **loaded_members)
+
+
+class ModelWatcher(threading.Thread):
+    """
+    Background thread that polls current_key() and calls on_change(key)
+    whenever the returned key differs from the last one it saw.
+    """
+
+    def __init__(self, current_key, on_change, interval=2.0, initial_key=None):
+        super().__init__(name='model-watcher', daemon=True)
+        self.current_key = current_key
+        self.on_change = on_change
+        self.interval = interval
+        self.last_key = initial_key
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                key = self.current_key()
+            except OSError:
+                continue
+            if key != self.last_key:
+                # Remember the key even if loading fails, so a broken version
+                # is reported once rather than retried on every poll
+                self.last_key = key
+                try:
+                    self.on_change(key)
+                except Exception as e:
+                    print(f"Error switching model to {key}: {e}")
+
+    def stop(self):
+        self._stopped.set()
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Manage versioned models')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_DIR, help='Registry directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    publish_parser = commands.add_parser('publish', help='Publish model files as a new version')
+    publish_parser.add_argument('model', help='Trained model file')
+    publish_parser.add_argument('--feature-encoder')
+    publish_parser.add_argument('--label-encoders')
+    publish_parser.add_argument('--feature-columns')
+    publish_parser.add_argument('--model-info')
+    publish_parser.add_argument('--no-activate', action='store_true',
+                                help='Publish without switching the served version')
+
+    commands.add_parser('list', help='List published versions')
+
+    activate_parser = commands.add_parser('activate', help='Serve an existing version (e.g. roll back)')
+    activate_parser.add_argument('version')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'publish':
+            version = publish_files(args.model, args.registry,
+                                    feature_encoder_file=args.feature_encoder,
+                                    label_encoders_file=args.label_encoders,
+                                    feature_columns_file=args.feature_columns,
+                                    model_info_file=args.model_info,
+                                    activate=not args.no_activate)
+            print(f"✅ Published {version}")
+        elif args.command == 'list':
+            active = active_version(args.registry)
+            for manifest in list_versions(args.registry):
+                marker = '*' if manifest['version'] == active else ' '
+                print(f"{marker} {manifest['version']}  {manifest['created_at']}  "
+                      f"{manifest['content_hash'][:12]}")
+        elif args.command == 'activate':
+            set_active(args.version, args.registry)
+            print(f"✅ Activated {args.version}")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
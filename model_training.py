@@ -1,93 +1,97 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+import argparse
+import copy
+import io
+import numbers
+import sklearn
+import time
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold, train_test_split
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
+from sklearn.utils import check_random_state
 from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import os
 
-def create_sample_data():
-    """Create sample animal health data for training"""
-    np.random.seed(42)
-    
-    # Sample data - you should replace this with your actual dataset
-    data = {
-        'temperature': np.random.normal(101, 2, 1000),  # Normal temp around 101°F for animals
-        'heart_rate': np.random.normal(80, 15, 1000),   # Heart rate
-        'respiratory_rate': np.random.normal(20, 5, 1000),  # Breathing rate
-        'appetite': np.random.choice(['poor', 'fair', 'good'], 1000, p=[0.2, 0.3, 0.5]),
-        'activity_level': np.random.choice(['low', 'medium', 'high'], 1000, p=[0.3, 0.4, 0.3]),
-        'age_years': np.random.randint(1, 15, 1000),
-        'weight_kg': np.random.normal(25, 10, 1000),
-    }
-    
-    # Create target variable (health status)
-    health_status = []
-    for i in range(1000):
-        score = 0
-        # Temperature check
-        if 99 <= data['temperature'][i] <= 102.5:
-            score += 1
-        # Heart rate check
-        if 60 <= data['heart_rate'][i] <= 100:
-            score += 1
-        # Respiratory rate check
-        if 15 <= data['respiratory_rate'][i] <= 25:
-            score += 1
-        # Appetite check
-        if data['appetite'][i] == 'good':
-            score += 1
-        elif data['appetite'][i] == 'fair':
-            score += 0.5
-        # Activity level check
-        if data['activity_level'][i] == 'high':
-            score += 1
-        elif data['activity_level'][i] == 'medium':
-            score += 0.5
-        
-        # Determine health status
-        if score >= 4:
-            health_status.append('healthy')
-        elif score >= 2.5:
-            health_status.append('monitor')
-        else:
-            health_status.append('concern')
-    
-    data['health_status'] = health_status
-    
-    return pd.DataFrame(data)
+from encoding import FeatureEncoder
+from synthetic_data import create_sample_data, iter_dataset_chunks, load_dataset
+
+# Candidate models and the hyperparameter space searched for each
+SEARCH_SPACE = {
+    'DecisionTree': (DecisionTreeClassifier, {
+        'max_depth': [5, 10, 15, None],
+        'min_samples_leaf': [1, 5, 10],
+    }),
+    'RandomForest': (RandomForestClassifier, {
+        'n_estimators': [50, 100, 200],
+        'max_depth': [10, 15, None],
+        'min_samples_leaf': [1, 5],
+    }),
+}
+
+SEARCH_CACHE_DIR = 'models/search_cache'
+
+# A cheaper model is preferred when its accuracy is within this of the best
+DEFAULT_ACCURACY_TOLERANCE = 0.01
+
+# Out-of-core training defaults
+CATEGORICAL_COLUMNS = ['appetite', 'activity_level']
+TARGET_COLUMN = 'health_status'
+INCREMENTAL_CHUNK_SIZE = 200000
+TREES_PER_CHUNK = 10
+CHECKPOINT_PATH = 'models/training_checkpoint.pkl'
+
+# Smaller ensembles tried by the serving-cost stage
+SUBSET_TREE_COUNTS = [10, 25, 50]
+SHALLOW_DEPTHS = [4, 6, 8]
+
+# Share of the training data held out to choose the model to serve, so the
+# test set is only used for the final accuracy
+VALIDATION_SIZE = 0.25
 
 def preprocess_data(df):
     """Preprocess the data for training"""
-    # Create a copy to avoid modifying original data
-    df_processed = df.copy()
-    
-    # Encode categorical variables
-    label_encoders = {}
-    categorical_columns = ['appetite', 'activity_level']
-    
-    for col in categorical_columns:
-        le = LabelEncoder()
-        df_processed[col] = le.fit_transform(df_processed[col])
-        label_encoders[col] = le
+    # Fit the feature encoder that serving will load alongside the model
+    feature_columns = [col for col in df.columns if col != TARGET_COLUMN]
+    feature_encoder = FeatureEncoder.fit(df, CATEGORICAL_COLUMNS, feature_columns)
     
-    # Separate features and target
-    X = df_processed.drop('health_status', axis=1)
-    y = df_processed['health_status']
+    # Encode features and separate the target
+    X = feature_encoder.encode_frame(df)
+    y = df[TARGET_COLUMN]
     
-    return X, y, label_encoders
+    return X, y, feature_encoder
 
-def train_model(X, y):
-    """Train the machine learning model"""
-    # Split the data
+def label_encoders_from(feature_encoder):
+    """Build sklearn LabelEncoders equivalent to the encoder's categorical fields"""
+    label_encoders = {}
+    for field in feature_encoder.fields:
+        categories = field.get('categories')
+        if categories is not None:
+            le = LabelEncoder()
+            le.classes_ = np.array(sorted(categories, key=categories.get))
+            label_encoders[field['source']] = le
+    return label_encoders
+
+def validation_split(X_train, y_train, random_state=42):
+    """Split training data into (X_fit, X_val, y_fit, y_val) for model selection"""
+    return train_test_split(X_train, y_train, test_size=VALIDATION_SIZE,
+                            random_state=random_state, stratify=y_train)
+
+def train_model(X, y, accuracy_tolerance=DEFAULT_ACCURACY_TOLERANCE):
+    """Train the machine learning model; returns (model, test accuracy, serving profile)"""
+    # Split the data; the test set is only scored once a model has been chosen
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
     )
+    X_fit, X_val, y_fit, y_val = validation_split(X_train, y_train)
     
     print("Training model...")
-    print(f"Training samples: {len(X_train)}")
+    print(f"Training samples: {len(X_fit)}")
+    print(f"Validation samples: {len(X_val)}")
     print(f"Testing samples: {len(X_test)}")
     
     # Try both models and choose the best one
@@ -96,33 +100,389 @@ def train_model(X, y):
         'RandomForest': RandomForestClassifier(random_state=42, n_estimators=100, max_depth=10)
     }
     
-    best_model = None
-    best_accuracy = 0
-    best_name = ""
-    
     for name, model in models.items():
         # Train the model
-        model.fit(X_train, y_train)
+        model.fit(X_fit, y_fit)
         
         # Make predictions
-        y_pred = model.predict(X_test)
+        y_pred = model.predict(X_val)
         
         # Calculate accuracy
-        accuracy = accuracy_score(y_test, y_pred)
-        print(f"\n{name} Accuracy: {accuracy:.4f}")
+        accuracy = accuracy_score(y_val, y_pred)
+        print(f"\n{name} Validation Accuracy: {accuracy:.4f}")
         print(f"{name} Classification Report:")
-        print(classification_report(y_test, y_pred))
+        print(classification_report(y_val, y_pred))
+    
+    return select_for_serving(models, X_fit, y_fit, X_val, y_val, X_test, y_test, accuracy_tolerance)
+
+def serialized_size(model):
+    """Bytes taken by the model when saved with joblib"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.tell()
+
+def out_of_bag_indices(forest, tree, n_samples):
+    """Rows of the forest's (unweighted) training data left out of the tree's bootstrap sample"""
+    max_samples = forest.max_samples
+    if max_samples is None:
+        n_bootstrap = n_samples
+    elif isinstance(max_samples, numbers.Integral):
+        n_bootstrap = max_samples
+    else:
+        n_bootstrap = max(int(max_samples * n_samples), 1)
+    # The draw sklearn makes for each tree when fitting without sample weights
+    drawn = check_random_state(tree.random_state).randint(0, n_samples, n_bootstrap)
+    return np.flatnonzero(np.bincount(drawn, minlength=n_samples) == 0)
+
+def tree_subset(forest, X_fit, y_fit, n_trees):
+    """
+    Copy of a forest fitted on (X_fit, y_fit) keeping only its n_trees
+    individually most accurate trees, each scored on its out-of-bag rows
+    """
+    X_values = X_fit.to_numpy()
+    y_values = np.asarray(y_fit)
+    scores = []
+    for tree in forest.estimators_:
+        rows = out_of_bag_indices(forest, tree, len(X_values))
+        predicted = forest.classes_.take(tree.predict(X_values[rows]).astype(int))
+        scores.append(accuracy_score(y_values[rows], predicted) if len(rows) else 0.0)
+    keep = sorted(np.argsort(scores, kind='stable')[::-1][:n_trees])
+    subset = copy.copy(forest)
+    subset.estimators_ = [forest.estimators_[i] for i in keep]
+    subset.n_estimators = n_trees
+    return subset
+
+def build_candidate(estimator, n_trees, X, y):
+    """Fit a candidate configuration (an estimator and an optional tree subset size) on X, y"""
+    model = clone(estimator).fit(X, y)
+    return tree_subset(model, X, y, n_trees) if n_trees else model
+
+def smaller_variants(name, model, X_fit, y_fit):
+    """
+    Cheaper versions of a model fitted on X_fit: tree subsets and shallower
+    refits, as {name: (fitted variant, (estimator, n_trees))}
+    """
+    variants = {}
+    # Subsets are ranked out-of-bag, which needs bootstrapped trees
+    if hasattr(model, 'estimators_') and getattr(model, 'bootstrap', False):
+        for n_trees in SUBSET_TREE_COUNTS:
+            if n_trees < len(model.estimators_):
+                variants[f"{name}[top {n_trees} trees]"] = (tree_subset(model, X_fit, y_fit, n_trees),
+                                                            (model, n_trees))
+    
+    max_depth = model.get_params().get('max_depth')
+    for depth in SHALLOW_DEPTHS:
+        if max_depth is None or depth < max_depth:
+            estimator = clone(model).set_params(max_depth=depth)
+            variants[f"{name}(max_depth={depth})"] = (build_candidate(estimator, None, X_fit, y_fit),
+                                                      (estimator, None))
+    return variants
+
+def select_for_serving(models, X_fit, y_fit, X_val, y_val, X_test, y_test,
+                       accuracy_tolerance=DEFAULT_ACCURACY_TOLERANCE):
+    """
+    Profile each model (fitted on X_fit) and its smaller variants (accuracy,
+    latency, size) and pick the cheapest one whose validation accuracy is
+    within accuracy_tolerance of the best. Tree subsets are ranked on
+    out-of-bag rows of X_fit, so the validation split only compares
+    candidates. The chosen configuration is refitted on X_fit and X_val
+    together and scored once on the test set.
+    Returns (model, test accuracy, serving profile).
+    """
+    candidates = {}
+    for name, model in models.items():
+        candidates[name] = (model, (model, None))
+        candidates.update(smaller_variants(name, model, X_fit, y_fit))
+    
+    profiles = []
+    for name, (model, _) in candidates.items():
+        profile = {
+            'name': name,
+            'accuracy': float(accuracy_score(y_val, model.predict(X_val))),
+            'size_bytes': serialized_size(model),
+            'node_count': int(sum(tree.tree_.node_count for tree in getattr(model, 'estimators_', [model]))),
+        }
+        profile.update(measure_latency(model, X_val))
+        profiles.append(profile)
+    
+    best_accuracy = max(profile['accuracy'] for profile in profiles)
+    eligible = [profile for profile in profiles if profile['accuracy'] >= best_accuracy - accuracy_tolerance]
+    selected = min(eligible, key=lambda profile: (profile['latency_p50_ms'], profile['size_bytes']))
+    
+    print(f"\n{'candidate':<34} {'val acc':>8} {'p50 ms':>7} {'rows/s':>10} {'size KB':>8}")
+    for profile in profiles:
+        marker = '*' if profile is selected else ' '
+        print(f"{marker}{profile['name']:<33} {profile['accuracy']:>8.4f} {profile['latency_p50_ms']:>7.3f} "
+              f"{profile['batch_rows_per_second']:>10,.0f} {profile['size_bytes'] / 1024:>8.1f}")
+    
+    # The served model learns from all training rows, validation included
+    estimator, n_trees = candidates[selected['name']][1]
+    X_train, y_train = pd.concat([X_fit, X_val]), pd.concat([y_fit, y_val])
+    model = build_candidate(estimator, n_trees, X_train, y_train)
+    test_accuracy = float(accuracy_score(y_test, model.predict(X_test)))
+    print(f"\nSelected for serving: {selected['name']} with validation accuracy: {selected['accuracy']:.4f} "
+          f"(best {best_accuracy:.4f}, tolerance {accuracy_tolerance}); refitted on {len(y_train)} rows, "
+          f"test accuracy: {test_accuracy:.4f}")
+    
+    # Candidate accuracies are on the validation split; only test_accuracy is unbiased
+    serving_profile = {
+        'selected': selected['name'],
+        'accuracy_tolerance': accuracy_tolerance,
+        'best_accuracy': best_accuracy,
+        'test_accuracy': test_accuracy,
+        'candidates': profiles,
+    }
+    return model, test_accuracy, serving_profile
+
+def search_candidates(search='grid', n_iter=10, random_state=42):
+    """List (name, params) pairs to evaluate, from the full grid or a random sample of it"""
+    candidates = []
+    for name, (_, space) in SEARCH_SPACE.items():
+        if search == 'grid':
+            params_list = ParameterGrid(space)
+        else:
+            params_list = ParameterSampler(space, n_iter=min(n_iter, len(ParameterGrid(space))),
+                                           random_state=random_state)
+        candidates.extend((name, dict(params)) for params in params_list)
+    return candidates
+
+def fit_fold(name, params, X, y, train_index, test_index, cache_file, random_state=42):
+    """Fit one candidate on one fold, reusing the cached result if this exact fold was fitted before"""
+    if cache_file and os.path.exists(cache_file):
+        return joblib.load(cache_file)
+    
+    model_class, _ = SEARCH_SPACE[name]
+    model = model_class(random_state=random_state, **params)
+    start = time.perf_counter()
+    model.fit(X.iloc[train_index], y.iloc[train_index])
+    result = {
+        'model': model,
+        'fit_seconds': time.perf_counter() - start,
+        'accuracy': accuracy_score(y.iloc[test_index], model.predict(X.iloc[test_index])),
+    }
+    
+    if cache_file:
+        # Write under a private name and rename, so parallel runs never read a partial file
+        temp_file = f"{cache_file}.{os.getpid()}.tmp"
+        joblib.dump(result, temp_file)
+        os.replace(temp_file, cache_file)
+    return result
+
+def measure_latency(model, X, repeats=50, batch_size=1000):
+    """Single-row p50/p95 latency (ms) and batch throughput (rows/s) of predict_proba"""
+    rows = X.to_numpy(dtype=np.float32)
+    single_row = X.iloc[:1]
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(single_row)
+        timings.append(time.perf_counter() - start)
+    
+    batch = X.iloc[np.resize(np.arange(len(rows)), batch_size)]
+    start = time.perf_counter()
+    model.predict_proba(batch)
+    batch_seconds = time.perf_counter() - start
+    
+    return {
+        'latency_p50_ms': float(np.percentile(timings, 50) * 1000),
+        'latency_p95_ms': float(np.percentile(timings, 95) * 1000),
+        'batch_rows_per_second': batch_size / max(batch_seconds, 1e-9),
+    }
+
+def search_models(X, y, search='grid', n_iter=10, cv=5, n_jobs=-1,
+                  cache_dir=SEARCH_CACHE_DIR, random_state=42,
+                  accuracy_tolerance=DEFAULT_ACCURACY_TOLERANCE):
+    """
+    Cross-validate every candidate in SEARCH_SPACE across n_jobs worker
+    processes, caching each fitted fold on disk, then refit the most
+    accurate candidate and pick the cheapest variant of it to serve.
+    Returns (model, test accuracy, serving profile).
+    """
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=random_state, stratify=y
+    )
+    candidates = search_candidates(search, n_iter, random_state)
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state).split(X_train, y_train))
+    
+    # Fold results are keyed by the training data, the candidate and the fold,
+    # so re-runs only fit configurations that have not been seen before
+    data_hash = joblib.hash((X_train, y_train, sklearn.__version__))
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def cache_file_for(name, params, fold):
+        if not cache_dir:
+            return None
+        key = joblib.hash((data_hash, name, sorted(params.items()), cv, fold, random_state))
+        return os.path.join(cache_dir, f"{key}.pkl")
+    
+    jobs = [(name, params, fold_index, train_index, test_index)
+            for name, params in candidates
+            for fold_index, (train_index, test_index) in enumerate(folds)]
+    cached = sum(1 for name, params, fold_index, _, _ in jobs
+                 if cache_dir and os.path.exists(cache_file_for(name, params, fold_index)))
+    print(f"Evaluating {len(candidates)} candidates x {cv} folds "
+          f"({cached} of {len(jobs)} fits cached) with n_jobs={n_jobs}...")
+    
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(fit_fold)(name, params, X_train, y_train, train_index, test_index,
+                          cache_file_for(name, params, fold_index), random_state)
+        for name, params, fold_index, train_index, test_index in jobs
+    )
+    
+    # Latency is measured serially after the pool is done, so candidates are
+    # timed on an otherwise idle machine
+    report = []
+    for candidate_index, (name, params) in enumerate(candidates):
+        fold_results = results[candidate_index * cv:(candidate_index + 1) * cv]
+        accuracies = [result['accuracy'] for result in fold_results]
+        row = {
+            'name': name,
+            'params': params,
+            'cv_accuracy': float(np.mean(accuracies)),
+            'cv_std': float(np.std(accuracies)),
+            'fit_seconds': float(np.mean([result['fit_seconds'] for result in fold_results])),
+        }
+        row.update(measure_latency(fold_results[0]['model'], X_test))
+        report.append(row)
+    report.sort(key=lambda row: (-row['cv_accuracy'], row['latency_p50_ms']))
+    print_search_report(report)
+    
+    # Fit on all training data but the validation split used to choose the
+    # variant to serve, which is then refitted on both; the test set is only
+    # scored for the final model
+    best = report[0]
+    X_fit, X_val, y_fit, y_val = validation_split(X_train, y_train, random_state)
+    model_class, _ = SEARCH_SPACE[best['name']]
+    model = model_class(random_state=random_state, **best['params'])
+    model.fit(X_fit, y_fit)
+    print(f"\nBest model: {best['name']} {best['params']} with validation accuracy: "
+          f"{accuracy_score(y_val, model.predict(X_val)):.4f}")
+    
+    model, accuracy, serving_profile = select_for_serving({best['name']: model}, X_fit, y_fit, X_val, y_val,
+                                                          X_test, y_test, accuracy_tolerance)
+    serving_profile['search'] = report
+    return model, accuracy, serving_profile
+
+def print_search_report(report):
+    """Print candidates with their accuracy and serving cost"""
+    print(f"\n{'model':<13} {'cv acc':>7} {'std':>6} {'fit s':>6} {'p50 ms':>7} {'p95 ms':>7} {'rows/s':>10}  params")
+    for row in report:
+        print(f"{row['name']:<13} {row['cv_accuracy']:>7.4f} {row['cv_std']:>6.4f} "
+              f"{row['fit_seconds']:>6.2f} {row['latency_p50_ms']:>7.3f} {row['latency_p95_ms']:>7.3f} "
+              f"{row['batch_rows_per_second']:>10,.0f}  {row['params']}")
+
+def save_checkpoint(checkpoint, checkpoint_path):
+    """Write a training checkpoint atomically, so an interruption never leaves a partial file"""
+    temp_path = f"{checkpoint_path}.{os.getpid()}.tmp"
+    joblib.dump(checkpoint, temp_path)
+    os.replace(temp_path, checkpoint_path)
+
+def pad_missing_classes(X, y, classes):
+    """
+    Add a zero-weight row for every class absent from y; returns (X, y,
+    sample_weight). The rows add nothing to the fit but give every
+    warm-started tree the same class indices.
+    """
+    sample_weight = np.ones(len(y))
+    missing = [label for label in classes if label not in set(y)]
+    if not missing:
+        return X, y, sample_weight
+    X = pd.concat([X, X.iloc[[0] * len(missing)]], ignore_index=True)
+    y = np.concatenate([y, np.array(missing, dtype=y.dtype)])
+    return X, y, np.concatenate([sample_weight, np.zeros(len(missing))])
+
+def train_incremental(data_path, chunk_size=INCREMENTAL_CHUNK_SIZE, trees_per_chunk=TREES_PER_CHUNK,
+                      checkpoint_path=CHECKPOINT_PATH, max_depth=10, random_state=42):
+    """
+    Train a forest out of core: stream data_path in chunks and grow the
+    forest with warm_start, fitting trees_per_chunk new trees on each chunk.
+    Only one chunk (and the holdout set) is in memory at a time. The forest is
+    checkpointed after every chunk and an interrupted run with the same
+    settings resumes after the last completed chunk.
+    Returns (model, holdout accuracy, feature encoder).
+    """
+    settings = {
+        'data_path': os.path.abspath(data_path),
+        'data_mtime': os.path.getmtime(data_path),
+        'chunk_size': chunk_size,
+        'trees_per_chunk': trees_per_chunk,
+        'max_depth': max_depth,
+        'random_state': random_state,
+    }
+    
+    checkpoint = None
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        checkpoint = joblib.load(checkpoint_path)
+        if checkpoint['settings'] != settings:
+            print(f"Ignoring checkpoint {checkpoint_path}: it was made with different data or settings")
+            checkpoint = None
+    
+    if checkpoint is not None:
+        print(f"Resuming after chunk {checkpoint['chunks_done']} from {checkpoint_path}")
+        model = checkpoint['model']
+        feature_encoder = FeatureEncoder.from_dict(checkpoint['feature_encoder'])
+        classes = checkpoint['classes']
+    else:
+        # One pass over the categorical columns fixes the encoding and the
+        # class set before any tree is fitted
+        print("Scanning categories...")
+        feature_columns = [column for column in next(iter_dataset_chunks(data_path, 1)).columns
+                           if column != TARGET_COLUMN]
+        seen_classes = set()
+        
+        def scanned_chunks():
+            for chunk in iter_dataset_chunks(data_path, chunk_size, columns=CATEGORICAL_COLUMNS + [TARGET_COLUMN]):
+                seen_classes.update(chunk[TARGET_COLUMN].astype(str).unique())
+                yield chunk
         
-        if accuracy > best_accuracy:
-            best_accuracy = accuracy
-            best_model = model
-            best_name = name
+        feature_encoder = FeatureEncoder.fit_chunks(scanned_chunks(), CATEGORICAL_COLUMNS, feature_columns)
+        classes = sorted(seen_classes)
+        model = RandomForestClassifier(n_estimators=0, max_depth=max_depth, warm_start=True,
+                                       random_state=random_state, n_jobs=-1)
+        checkpoint = {'settings': settings, 'chunks_done': 0, 'model': model,
+                      'feature_encoder': feature_encoder.to_dict(), 'classes': classes}
     
-    print(f"\nBest model: {best_name} with accuracy: {best_accuracy:.4f}")
-    return best_model, best_accuracy
+    holdout_X = holdout_y = None
+    for chunk_index, chunk in enumerate(iter_dataset_chunks(data_path, chunk_size)):
+        X_chunk = feature_encoder.encode_frame(chunk)
+        y_chunk = chunk[TARGET_COLUMN].astype(str).to_numpy()
+        
+        # The first chunk gives up 20% of its rows as a fixed holdout set
+        if chunk_index == 0:
+            X_chunk, holdout_X, y_chunk, holdout_y = train_test_split(
+                X_chunk, y_chunk, test_size=0.2, random_state=random_state
+            )
+        if chunk_index < checkpoint['chunks_done']:
+            continue
+        
+        # Every warm-started fit must see all classes, or the new trees'
+        # class indices would not line up with the earlier ones; classes a
+        # chunk lacks are filled in with zero-weight rows
+        X_fit, y_fit, sample_weight = pad_missing_classes(X_chunk, y_chunk, classes)
+        model.n_estimators += trees_per_chunk
+        model.fit(X_fit, y_fit, sample_weight=sample_weight)
+        
+        checkpoint['chunks_done'] = chunk_index + 1
+        if checkpoint_path:
+            save_checkpoint(checkpoint, checkpoint_path)
+        print(f"Chunk {chunk_index + 1}: {len(y_chunk)} rows, {model.n_estimators} trees")
+    
+    if model.n_estimators == 0:
+        raise ValueError(f"No training rows in {data_path}")
+    
+    accuracy = accuracy_score(holdout_y, model.predict(holdout_X))
+    print(f"\nIncremental RandomForest: {model.n_estimators} trees, holdout accuracy: {accuracy:.4f}")
+    
+    # Parallel prediction is not useful for single-request serving
+    model.set_params(n_jobs=None, warm_start=False)
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return model, accuracy, feature_encoder
 
-def save_model_and_encoders(model, label_encoders, model_path='models/'):
-    """Save the trained model and encoders"""
+def save_model_and_encoders(model, feature_encoder, model_path='models/', registry_dir=None,
+                            serving_profile=None):
+    """Save the trained model and encoders, optionally publishing them as a new registry version"""
     # Create models directory if it doesn't exist
     os.makedirs(model_path, exist_ok=True)
     
@@ -131,32 +491,87 @@ def save_model_and_encoders(model, label_encoders, model_path='models/'):
     joblib.dump(model, model_file)
     print(f"Model saved to: {model_file}")
     
-    # Save the label encoders
+    # Save the feature encoder next to the model; serving loads it from here
+    encoder_file = os.path.join(model_path, 'animal_health_model_encoder.pkl')
+    feature_encoder.save(encoder_file)
+    print(f"Feature encoder saved to: {encoder_file}")
+    
+    # Save the label encoders (kept for older consumers of label_encoders.pkl)
+    label_encoders = label_encoders_from(feature_encoder)
     encoders_file = os.path.join(model_path, 'label_encoders.pkl')
     joblib.dump(label_encoders, encoders_file)
     print(f"Label encoders saved to: {encoders_file}")
     
     # Save feature names for reference
     feature_info = {
-        'feature_names': ['temperature', 'heart_rate', 'respiratory_rate', 'appetite', 'activity_level', 'age_years', 'weight_kg'],
-        'categorical_features': ['appetite', 'activity_level'],
+        'feature_names': feature_encoder.feature_names,
+        'categorical_features': list(label_encoders),
         'target_classes': ['healthy', 'monitor', 'concern']
     }
+    if serving_profile is not None:
+        # Latency/size of every candidate considered, and which one was chosen
+        feature_info['serving_profile'] = serving_profile
     
     info_file = os.path.join(model_path, 'model_info.pkl')
     joblib.dump(feature_info, info_file)
     print(f"Model info saved to: {info_file}")
+    
+    # Publish to the versioned registry; running servers pick it up without a restart
+    if registry_dir:
+        from model_registry import publish_objects
+        version = publish_objects(model, registry_dir,
+                                  feature_encoder=feature_encoder,
+                                  label_encoders=label_encoders,
+                                  feature_columns=feature_info['feature_names'],
+                                  model_info=feature_info)
+        print(f"Published model version: {version}")
 
 def main():
     """Main training function"""
+    parser = argparse.ArgumentParser(description='Train the animal health model')
+    parser.add_argument('--rows', type=int, default=1000, help='Rows of sample data to generate')
+    parser.add_argument('--data', help='Train on a CSV/Parquet/NPY dataset (e.g. from synthetic_data.py)')
+    parser.add_argument('--search', choices=['grid', 'random'],
+                        help='Cross-validated hyperparameter search instead of the two default models')
+    parser.add_argument('--n-iter', type=int, default=10, help='Candidates per model for --search random')
+    parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Worker processes (-1 = all cores)')
+    parser.add_argument('--cache-dir', default=SEARCH_CACHE_DIR,
+                        help="Fitted fold cache ('' disables caching)")
+    parser.add_argument('--accuracy-tolerance', type=float, default=DEFAULT_ACCURACY_TOLERANCE,
+                        help='Accuracy a cheaper model may give up against the most accurate one')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Stream --data in chunks and grow a forest out of core (resumable)')
+    parser.add_argument('--chunk-size', type=int, default=INCREMENTAL_CHUNK_SIZE,
+                        help='Rows per chunk for --incremental')
+    parser.add_argument('--trees-per-chunk', type=int, default=TREES_PER_CHUNK,
+                        help='Trees added per chunk for --incremental')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_PATH,
+                        help="Checkpoint file for --incremental ('' disables checkpointing)")
+    args = parser.parse_args()
+    
     print("=== Animal Health Model Training ===")
     
-    # Create or load your dataset
-    print("Creating sample dataset...")
-    df = create_sample_data()
+    if args.incremental:
+        if not args.data:
+            parser.error('--incremental needs --data')
+        print(f"Training incrementally from {args.data}...")
+        model, accuracy, feature_encoder = train_incremental(args.data, chunk_size=args.chunk_size,
+                                                             trees_per_chunk=args.trees_per_chunk,
+                                                             checkpoint_path=args.checkpoint)
+        print("\nSaving model and encoders...")
+        save_model_and_encoders(model, feature_encoder)
+        print(f"\n=== Training Complete ===")
+        print(f"Final model accuracy: {accuracy:.4f}")
+        return
     
-    # If you have your own dataset, load it instead:
-    # df = pd.read_csv('your_animal_health_data.csv')
+    # Create or load your dataset
+    if args.data:
+        print(f"Loading dataset from {args.data}...")
+        df = load_dataset(args.data)
+    else:
+        print("Creating sample dataset...")
+        df = create_sample_data(args.rows)
     
     print(f"Dataset shape: {df.shape}")
     print(f"Health status distribution:")
@@ -164,20 +579,27 @@ def main():
     
     # Preprocess the data
     print("\nPreprocessing data...")
-    X, y, label_encoders = preprocess_data(df)
+    X, y, feature_encoder = preprocess_data(df)
     
     # Train the model
     print("\nTraining model...")
-    model, accuracy = train_model(X, y)
+    if args.search:
+        model, accuracy, serving_profile = search_models(X, y, search=args.search, n_iter=args.n_iter,
+                                                         cv=args.cv, n_jobs=args.n_jobs,
+                                                         cache_dir=args.cache_dir,
+                                                         accuracy_tolerance=args.accuracy_tolerance)
+    else:
+        model, accuracy, serving_profile = train_model(X, y, accuracy_tolerance=args.accuracy_tolerance)
     
     # Save everything
     print("\nSaving model and encoders...")
-    save_model_and_encoders(model, label_encoders)
+    save_model_and_encoders(model, feature_encoder, serving_profile=serving_profile)
     
     print(f"\n=== Training Complete ===")
     print(f"Final model accuracy: {accuracy:.4f}")
     print("Files created:")
     print("- models/animal_health_model.pkl")
+    print("- models/animal_health_model_encoder.pkl")
     print("- models/label_encoders.pkl")
     print("- models/model_info.pkl")
     
@@ -190,7 +612,7 @@ def test_saved_model():
     try:
         # Load the saved model
         model = joblib.load('models/animal_health_model.pkl')
-        label_encoders = joblib.load('models/label_encoders.pkl')
+        feature_encoder = FeatureEncoder.load('models/animal_health_model_encoder.pkl')
         
         # Create a test sample
         test_data = {
@@ -203,11 +625,8 @@ def test_saved_model():
             'weight_kg': [30.0]
         }
         
-        test_df = pd.DataFrame(test_data)
-        
-        # Encode categorical variables
-        for col in ['appetite', 'activity_level']:
-            test_df[col] = label_encoders[col].transform(test_df[col])
+        # Encode with the same encoder used in training
+        test_df = feature_encoder.encode_frame(pd.DataFrame(test_data))
         
         # Make prediction
         prediction = model.predict(test_df)
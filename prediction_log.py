@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Prediction Log
+Description: Append-only audit log of every assessment made by the web app,
+for regulatory follow-up and retraining.
+
+Request threads hand each record (inputs, encoded features, probabilities,
+model version, latency) to a bounded in-memory queue and return at once; a
+background thread serializes records to NDJSON and appends them in batches,
+one write and one fsync per batch. If the queue is full the request waits
+up to block_seconds (default: not at all) for room; a record that still
+does not fit is dropped, counted and reported rather than slowing the
+request down further.
+
+Every server process writes its own segment:
+
+    logs/predictions/
+        predictions-20240101T120000Z-4242-000001.ndjson.part   # being written
+        predictions-20240101T110000Z-4242-000000.ndjson.gz     # rotated, compressed
+        predictions-20231231.ndjson.gz                         # compacted day
+
+Segments rotate by size or age (also while no records arrive) and are
+gzipped when closed; `compact` merges a day's closed segments into one file,
+first closing segments left open by processes that are no longer running.
+A writer holds an exclusive flock on its open segment, so a segment whose
+lock can be taken is known to be abandoned. Compaction records what it
+merges in a manifest, so a crash can neither lose nor duplicate records.
+
+Usage:
+    python prediction_log.py compact
+    python prediction_log.py export predictions.csv
+"""
+
+import argparse
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: open segments are never treated as abandoned
+    fcntl = None
+
+from metrics import Counter
+
+DEFAULT_LOG_DIR = 'logs/predictions'
+DEFAULT_MAX_QUEUE = 10000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 1.0
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_SECONDS = 3600
+EXPORT_CHUNK_ROWS = 100000
+DROP_WARNING_SECONDS = 60
+
+ACTIVE_SUFFIX = '.ndjson.part'
+CLOSED_SUFFIX = '.ndjson.gz'
+_SEGMENT_PATTERN = re.compile(r'^predictions-(\d{8})T\d{6}Z-\d+-\d+\.ndjson\.gz$')
+_MANIFEST_PATTERN = re.compile(r'^compact-\d{8}\.json$')
+NEW_SUFFIX = '.new'
+
+_STOP = object()
+
+
+def close_segment(path):
+    """Gzip a finished .part segment into its .ndjson.gz form"""
+    closed_path = path[:-len(ACTIVE_SUFFIX)] + CLOSED_SUFFIX
+    temp_path = f"{closed_path}.{os.getpid()}.tmp"
+    with open(path, 'rb') as source, gzip.open(temp_path, 'wb') as target:
+        shutil.copyfileobj(source, target)
+    os.replace(temp_path, closed_path)
+    os.remove(path)
+    return closed_path
+
+
+def _write_json_atomic(path, data):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class PredictionLog:
+    """Bounded queue of prediction records drained to NDJSON segments by a background thread"""
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, max_queue=DEFAULT_MAX_QUEUE,
+                 batch_size=DEFAULT_BATCH_SIZE, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 segment_bytes=DEFAULT_SEGMENT_BYTES, segment_seconds=DEFAULT_SEGMENT_SECONDS,
+                 fsync=True, block_seconds=0.0):
+        self.log_dir = log_dir
+        self.block_seconds = block_seconds
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.fsync = fsync
+        self.max_queue = max_queue
+
+        self.records = Counter('animal_health_prediction_log_records_total',
+                               'Prediction log records written, dropped because the queue was full, '
+                               'or lost to a failed write', ('result',))
+        # Exported from the start, so alerts on drops see the series at zero
+        for result in ('written', 'dropped', 'failed'):
+            self.records.inc(result, amount=0)
+        self._lock = threading.Lock()
+        self._dropped_since_warning = 0
+        self._last_drop_warning = None
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._segment_number = 0
+
+    def log(self, record):
+        """Queue a record, waiting at most block_seconds for room; returns False if it had to be dropped"""
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            if self.block_seconds > 0:
+                self._queue.put(record, timeout=self.block_seconds)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            self.records.inc('dropped')
+            self._warn_dropped()
+            return False
+        return True
+
+    def _warn_dropped(self):
+        """Report dropped records at most once every DROP_WARNING_SECONDS"""
+        with self._lock:
+            self._dropped_since_warning += 1
+            now = time.monotonic()
+            if self._last_drop_warning is not None and now - self._last_drop_warning < DROP_WARNING_SECONDS:
+                return
+            dropped, self._dropped_since_warning = self._dropped_since_warning, 0
+            self._last_drop_warning = now
+        print(f"Warning: prediction log queue full, dropped {dropped} record(s) "
+              f"(animal_health_prediction_log_records_total{{result=\"dropped\"}})")
+
+    def _start(self):
+        with self._lock:
+            # A writer inherited across fork() is not running in the child
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.max_queue)
+            self._file = None
+            self._thread = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def close(self, timeout=10):
+        """Write out queued records, close the segment and stop the writer"""
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            thread = self._thread
+        thread.join(timeout)
+
+    def _open_segment(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        # The sequence number keeps segments rotated within one second apart
+        self._path = os.path.join(
+            self.log_dir, f"predictions-{stamp}-{os.getpid()}-{self._segment_number:06d}{ACTIVE_SUFFIX}")
+        self._segment_number += 1
+        # Created and locked under a name compact() ignores, then renamed: a
+        # .part segment it can lock is never one still being opened
+        self._file = open(self._path + NEW_SUFFIX, 'ab')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        os.replace(self._path + NEW_SUFFIX, self._path)
+        self._opened_at = time.monotonic()
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        # Gzipped while the lock is still held, so compact() cannot close it too
+        try:
+            if os.path.getsize(self._path):
+                close_segment(self._path)
+            else:
+                os.remove(self._path)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _segment_age_left(self):
+        """Seconds until the open segment is due to rotate by age (None if none is open)"""
+        if self._file is None:
+            return None
+        return max(0.0, self._opened_at + self.segment_seconds - time.monotonic())
+
+    def _write(self, batch):
+        if self._file is not None and self._file.tell() >= self.segment_bytes:
+            self._close_segment()
+        if self._file is None:
+            self._open_segment()
+
+        data = ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in batch)
+        self._file.write(data.encode('utf-8'))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.records.inc('written', amount=len(batch))
+
+    def _collect(self):
+        """
+        Wait for a record, then gather more for up to flush_seconds or
+        batch_size records; waits no longer than the open segment may live
+        """
+        try:
+            item = self._queue.get(timeout=self._segment_age_left())
+        except queue.Empty:
+            return [], False
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while item is not _STOP:
+            batch.append(item)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or remaining <= 0:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if self._segment_age_left() == 0:
+                try:
+                    self._close_segment()
+                except OSError as e:
+                    print(f"Error rotating prediction log: {e}")
+                    self._file = None
+            if batch:
+                try:
+                    self._write(batch)
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"Error writing prediction log: {e}")
+                    self.records.inc('failed', amount=len(batch))
+        self._close_segment()
+
+
+def close_orphaned_segments(log_dir=DEFAULT_LOG_DIR):
+    """Close .part segments no writer holds locked any more; returns their number"""
+    if fcntl is None:
+        # Without flock a live segment cannot be told from an abandoned one
+        return 0
+    closed = 0
+    for file_name in sorted(os.listdir(log_dir)):
+        if not file_name.endswith((ACTIVE_SUFFIX, ACTIVE_SUFFIX + NEW_SUFFIX)):
+            continue
+        path = os.path.join(log_dir, file_name)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            continue
+        with f:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            # The writer may have closed the segment itself before releasing it
+            try:
+                if not os.path.samestat(os.fstat(f.fileno()), os.stat(path)):
+                    continue
+            except FileNotFoundError:
+                continue
+            # A .new file was never renamed, so nothing was written to it
+            if file_name.endswith(ACTIVE_SUFFIX) and os.path.getsize(path):
+                close_segment(path)
+            else:
+                os.remove(path)
+        closed += 1
+    return closed
+
+
+def _finish_compaction(log_dir, manifest_path):
+    """Complete or roll back the compaction a manifest describes"""
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    temp_path = os.path.join(log_dir, manifest['temp'])
+    if os.path.exists(temp_path):
+        # Never published: the segments are all still in place
+        os.remove(temp_path)
+    else:
+        # Published: the segments are already part of the day file
+        for file_name in manifest['segments']:
+            path = os.path.join(log_dir, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+    os.remove(manifest_path)
+
+
+def compact(log_dir=DEFAULT_LOG_DIR):
+    """Merge each day's closed segments into predictions-<day>.ndjson.gz; returns segments merged"""
+    lock_file = open(os.path.join(log_dir, '.compact.lock'), 'a+b')
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        # Interrupted runs first, so their segments are not merged a second time
+        for file_name in sorted(os.listdir(log_dir)):
+            if _MANIFEST_PATTERN.match(file_name):
+                _finish_compaction(log_dir, os.path.join(log_dir, file_name))
+        # Segments of crashed workers would otherwise never be gzipped
+        close_orphaned_segments(log_dir)
+        by_day = {}
+        for file_name in sorted(os.listdir(log_dir)):
+            match = _SEGMENT_PATTERN.match(file_name)
+            if match:
+                by_day.setdefault(match.group(1), []).append(file_name)
+
+        merged = 0
+        for day, segments in by_day.items():
+            day_path = os.path.join(log_dir, f"predictions-{day}{CLOSED_SUFFIX}")
+            temp_path = f"{day_path}.{os.getpid()}.tmp"
+            manifest_path = os.path.join(log_dir, f"compact-{day}.json")
+            # Concatenated gzip members form a valid gzip file, so no recompression is needed
+            with open(temp_path, 'wb') as target:
+                for path in ([day_path] if os.path.exists(day_path) else []) + \
+                        [os.path.join(log_dir, file_name) for file_name in segments]:
+                    with open(path, 'rb') as source:
+                        shutil.copyfileobj(source, target)
+                target.flush()
+                os.fsync(target.fileno())
+            # Recorded before publishing, so a crash in between is rolled
+            # forward (sources removed) or back (temp file removed) next time
+            _write_json_atomic(manifest_path, {'temp': os.path.basename(temp_path), 'segments': segments})
+            os.replace(temp_path, day_path)
+            _finish_compaction(log_dir, manifest_path)
+            merged += len(segments)
+        return merged
+    finally:
+        lock_file.close()
+
+
+def iter_records(log_dir=DEFAULT_LOG_DIR, include_active=False):
+    """Yield logged records, oldest file first; active segments only if include_active"""
+    for file_name in sorted(os.listdir(log_dir)):
+        path = os.path.join(log_dir, file_name)
+        if file_name.endswith(CLOSED_SUFFIX):
+            f = gzip.open(path, 'rt', encoding='utf-8')
+        elif include_active and file_name.endswith(ACTIVE_SUFFIX):
+            f = open(path, encoding='utf-8')
+        else:
+            continue
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # The last line of an active segment may still be incomplete
+                    continue
+
+
+def _export_row(record):
+    """One flat table row of a logged record"""
+    row = {'time': record.get('time'), 'model_version': record.get('model_version')}
+    row.update(record.get('inputs', {}))
+    row['prediction'] = record.get('prediction')
+    row['confidence'] = record.get('confidence')
+    for label, probability in record.get('probabilities', {}).items():
+        row[f'probability_{label}'] = probability
+    row['latency_ms'] = record.get('latency_ms')
+    return row
+
+
+def export(log_dir, output_path, include_active=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write logged records as a flat CSV/Parquet table, chunk_rows at a time; returns the number of rows"""
+    import pandas as pd
+    from score_bulk import ChunkWriter, detect_format
+
+    # A first pass collects every column, and whether predictions are integer
+    # classes, so all chunks share one header/schema
+    columns = {}
+    integer_predictions = True
+    for record in iter_records(log_dir, include_active):
+        row = _export_row(record)
+        columns.update(dict.fromkeys(row))
+        if row['prediction'] is not None and not isinstance(row['prediction'], int):
+            integer_predictions = False
+    columns = list(columns)
+    dtypes = {column: float if column in ('confidence', 'latency_ms') or column.startswith('probability_')
+              else 'string' for column in columns}
+    if 'prediction' in dtypes:
+        dtypes['prediction'] = 'Int64' if integer_predictions else 'string'
+
+    def frame(rows):
+        return pd.DataFrame(rows, columns=columns).astype(dtypes)
+
+    writer = ChunkWriter(output_path, detect_format(output_path))
+    try:
+        rows = []
+        for record in iter_records(log_dir, include_active):
+            rows.append(_export_row(record))
+            if len(rows) >= chunk_rows:
+                writer.write(frame(rows))
+                rows = []
+        if rows or not writer.rows_written:
+            writer.write(frame(rows))
+    finally:
+        writer.close()
+    return writer.rows_written
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Maintain the prediction audit log')
+    parser.add_argument('--log-dir', default=DEFAULT_LOG_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('compact', help="Merge each day's closed segments into one file")
+    export_parser = commands.add_parser('export', help='Write the log as a CSV or Parquet table')
+    export_parser.add_argument('output', help='Output .csv or .parquet file')
+    export_parser.add_argument('--include-active', action='store_true',
+                               help='Also read segments that are still being written')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'compact':
+            merged = compact(args.log_dir)
+            print(f"✅ Merged {merged} segment(s) in {args.log_dir}")
+        else:
+            rows = export(args.log_dir, args.output, args.include_active)
+            print(f"✅ Exported {rows} record(s) to {args.output}")
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
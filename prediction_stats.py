@@ -0,0 +1,201 @@
+"""
+Incremental population statistics of /submit predictions.
+
+Outcome counts are kept per (animal, symptom) cell in one fixed-size int64
+array: all-time totals, an hourly ring covering the last week and a daily
+ring covering the last 90 days. Recording a prediction increments a few
+cells in place, and reading statistics sums a bounded number of buckets,
+so both cost the same however many predictions have been made.
+
+The array lives in a memory-mapped .npy file shared by every server process
+(and kept across restarts); updates are serialized with an exclusive file
+lock where fcntl is available, otherwise with a per-process lock only.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development server
+    fcntl = None
+
+from encoding import ANIMAL_OPTIONS, DISEASE_OPTIONS
+
+DEFAULT_STATS_DIR = 'logs/prediction_stats'
+OUTCOMES = ('critical', 'normal')
+HOURLY_BUCKETS = 7 * 24
+DAILY_BUCKETS = 90
+
+# Bucket slots: 0 is all-time, then the hourly ring, then the daily ring
+_HOURLY_START = 1
+_DAILY_START = _HOURLY_START + HOURLY_BUCKETS
+_N_SLOTS = _DAILY_START + DAILY_BUCKETS
+
+
+class PredictionStats:
+    """Counts of outcomes per (animal, symptom) cell, bucketed by hour and day"""
+
+    def __init__(self, stats_dir=DEFAULT_STATS_DIR, animals=ANIMAL_OPTIONS, symptom_groups=DISEASE_OPTIONS):
+        self.animals = list(animals)
+        self.symptom_groups = {group: list(options) for group, options in symptom_groups.items()}
+        # One symptom axis over every (group, option) pair, plus a final "any" cell
+        # holding the animal's total
+        self.symptoms = [(group, option) for group, options in self.symptom_groups.items()
+                         for option in options]
+        self._animal_index = {animal: index for index, animal in enumerate(self.animals)}
+        self._symptom_index = [
+            {option: self.symptoms.index((group, option)) for option in options}
+            for group, options in self.symptom_groups.items()
+        ]
+        self._outcome_index = {outcome: index for index, outcome in enumerate(OUTCOMES)}
+        self.shape = (_N_SLOTS, len(self.animals), len(self.symptoms) + 1, len(OUTCOMES))
+
+        os.makedirs(stats_dir, exist_ok=True)
+        self.counts = self._open(os.path.join(stats_dir, 'counts.npy'), self.shape)
+        # Hour or day number each ring slot currently holds (-1: empty)
+        self.stamps = self._open(os.path.join(stats_dir, 'stamps.npy'), (_N_SLOTS,), fill=-1)
+        self._flat = self.counts.reshape(-1)
+        self._strides = np.array(self.shape[1:] + (1,))[::-1].cumprod()[::-1][1:]
+        self._slot_size = int(np.prod(self.shape[1:]))
+
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(stats_dir, 'lock')
+        # Fails here rather than on the first record() if the directory is read-only
+        open(self._lock_path, 'a+b').close()
+        self._lock_file = None
+        self._pid = None
+
+    @staticmethod
+    def _open(path, shape, fill=0):
+        """Map an existing array file, creating it (atomically) if it is missing or has another shape"""
+        if os.path.exists(path):
+            array = np.load(path, mmap_mode='r+')
+            if array.shape == shape:
+                return array
+            # The form's options changed; keep the old statistics aside
+            del array
+            os.replace(path, f"{path}.{int(time.time())}.old")
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        array = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.int64, shape=shape)
+        array[...] = fill
+        array.flush()
+        del array
+        if not os.path.exists(path):
+            os.replace(temp_path, path)
+        else:
+            os.remove(temp_path)
+        return np.load(path, mmap_mode='r+')
+
+    @contextmanager
+    def _locked(self):
+        """Hold the thread lock and, where supported, an exclusive lock shared by all processes"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # flock() locks belong to the open file, so a descriptor inherited
+                # across fork() would not keep parent and child apart
+                self._lock_file = open(self._lock_path, 'a+b')
+                self._pid = os.getpid()
+            if fcntl is None:
+                yield
+                return
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def record(self, animal, symptom_values, outcome, now=None):
+        """Count one prediction; symptom_values are the five disease fields in form order"""
+        animal_index = self._animal_index.get(animal)
+        outcome_index = self._outcome_index.get(outcome)
+        if animal_index is None or outcome_index is None:
+            return False
+
+        cells = [len(self.symptoms)]
+        for lookup, value in zip(self._symptom_index, symptom_values):
+            symptom_index = lookup.get(value)
+            if symptom_index is not None:
+                cells.append(symptom_index)
+        cells = np.array(cells)
+
+        now = time.time() if now is None else now
+        hour, day = int(now // 3600), int(now // 86400)
+        hour_slot = _HOURLY_START + hour % HOURLY_BUCKETS
+        day_slot = _DAILY_START + day % DAILY_BUCKETS
+        # Flat positions of every cell to increment, in the all-time, hour and day buckets
+        offsets = animal_index * self._strides[0] + cells * self._strides[1] + outcome_index
+        positions = (np.array([0, hour_slot, day_slot])[:, None] * self._slot_size + offsets).ravel()
+
+        with self._locked():
+            for slot, stamp in ((hour_slot, hour), (day_slot, day)):
+                if self.stamps[slot] != stamp:
+                    # The ring wrapped around; this bucket held an older hour/day
+                    self.counts[slot] = 0
+                    self.stamps[slot] = stamp
+            self._flat[positions] += 1
+        return True
+
+    def window(self, hours=None, days=None, now=None):
+        """
+        Summed counts (animals x symptoms+1 x outcomes) over the last hours or
+        days, or all time if neither is given, with the per-bucket totals.
+        """
+        if hours is None and days is None:
+            return np.array(self.counts[0]), []
+
+        now = time.time() if now is None else now
+        if hours is not None:
+            current, size, start, seconds = int(now // 3600), HOURLY_BUCKETS, _HOURLY_START, 3600
+            periods = range(current - hours + 1, current + 1)
+        else:
+            current, size, start, seconds = int(now // 86400), DAILY_BUCKETS, _DAILY_START, 86400
+            periods = range(current - days + 1, current + 1)
+
+        periods = np.array(periods)
+        slots = start + periods % size
+        # Buckets still holding an hour/day from a previous turn of the ring count as empty
+        is_current = self.stamps[slots] == periods
+        counts = self.counts[slots[is_current]]
+        total = counts.sum(axis=0)
+        bucket_totals = np.zeros((len(periods), self.shape[-1]), dtype=np.int64)
+        bucket_totals[is_current] = counts[:, :, -1].sum(axis=1)
+        buckets = [(datetime.fromtimestamp(int(period) * seconds, timezone.utc).isoformat(), values)
+                   for period, values in zip(periods, bucket_totals)]
+        return total, buckets
+
+    def summary(self, hours=None, days=None, by_animal_symptom=False, now=None):
+        """JSON-ready outcome counts and critical rates for a time window"""
+        counts, buckets = self.window(hours, days, now)
+
+        def rates(values):
+            item = {outcome: int(count) for outcome, count in zip(OUTCOMES, values)}
+            total = int(values.sum())
+            item['total'] = total
+            item['critical_rate'] = round(item['critical'] / total, 4) if total else None
+            return item
+
+        by_symptom = counts[:, :-1].sum(axis=0)
+        result = {
+            'total': rates(counts[:, -1].sum(axis=0)),
+            'animals': {animal: rates(counts[index, -1]) for index, animal in enumerate(self.animals)},
+            'symptoms': {},
+        }
+        for index, (group, option) in enumerate(self.symptoms):
+            result['symptoms'].setdefault(group, {})[option] = rates(by_symptom[index])
+        if by_animal_symptom:
+            result['animal_symptoms'] = {
+                animal: {group: {option: rates(counts[animal_index, self.symptoms.index((group, option))])
+                                 for option in options}
+                         for group, options in self.symptom_groups.items()}
+                for animal_index, animal in enumerate(self.animals)
+            }
+        if buckets:
+            result['buckets'] = [dict(rates(values), start=start) for start, values in buckets]
+        return result
+
@@ -0,0 +1,108 @@
+"""
+Precomputed prediction table covering every possible form input.
+
+The prediction form only offers a fixed set of choices (8 animals and 5
+options in each of the five disease groups), so the whole input domain can
+be scored once in a single vectorized call and served by array lookup.
+"""
+
+import os
+
+import numpy as np
+
+from inference import predict_batch
+
+
+def model_file_stamp(model_path):
+    """Return a cheap fingerprint of the model file used to detect changes"""
+    stat = os.stat(model_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class PredictionTable:
+    """Array-backed table of class probabilities for the full input domain"""
+
+    def __init__(self, encoder, field_options):
+        # One axis per form field, in feature order
+        self.axes = [list(options) for options in field_options]
+        self.shape = tuple(len(axis) for axis in self.axes)
+
+        # Per-field arrays that map an encoded value to its position on the axis
+        encodings = [encoder.categories(field_index) for field_index in range(len(self.axes))]
+        self.code_to_position = []
+        for axis, encoding in zip(self.axes, encodings):
+            lookup = np.full(max(encoding.values()) + 1, -1, dtype=np.int16)
+            for position, option in enumerate(axis):
+                lookup[encoding[option]] = position
+            self.code_to_position.append(lookup)
+
+        # Encoded feature matrix for every combination, in row-major order
+        positions = np.indices(self.shape).reshape(len(self.shape), -1)
+        self.domain = np.column_stack([
+            np.array([encoding[option] for option in axis])[field_positions]
+            for axis, encoding, field_positions in zip(self.axes, encodings, positions)
+        ])
+
+        self.classes = None
+        self.probabilities = None
+        self.predictions = None
+
+    @property
+    def size(self):
+        """Number of input combinations covered by the table"""
+        return len(self.domain)
+
+    @property
+    def is_built(self):
+        return self.probabilities is not None
+
+    def build(self, model):
+        """Score the whole domain with one predict_proba call"""
+        _, probabilities = predict_batch(model, self.domain)
+
+        self.classes = model.classes_
+        self.probabilities = probabilities
+        self.predictions = probabilities.argmax(axis=1).astype(np.uint8)
+
+    def index_of(self, encoded_features):
+        """Return the flat table index for encoded features, or None if out of domain"""
+        if len(encoded_features) != len(self.shape):
+            return None
+
+        index = 0
+        for code, lookup, size in zip(encoded_features, self.code_to_position, self.shape):
+            if not 0 <= code < len(lookup):
+                return None
+            position = lookup[code]
+            if position < 0:
+                return None
+            index = index * size + int(position)
+        return index
+
+    def lookup(self, encoded_features):
+        """Return (predicted class, class probabilities) or None on a miss"""
+        if not self.is_built:
+            return None
+
+        index = self.index_of(encoded_features)
+        if index is None:
+            return None
+        return self.classes[self.predictions[index]], self.probabilities[index]
+
+    def lookup_batch(self, encoded_rows):
+        """Return (predicted classes, class probabilities) for many rows, or None if any row misses"""
+        encoded_rows = np.asarray(encoded_rows)
+        if (not self.is_built or encoded_rows.ndim != 2 or not len(encoded_rows)
+                or encoded_rows.shape[1] != len(self.shape)):
+            return None
+
+        positions = []
+        for codes, lookup in zip(encoded_rows.T.astype(np.intp), self.code_to_position):
+            if codes.min() < 0 or codes.max() >= len(lookup):
+                return None
+            positions.append(lookup[codes])
+        positions = np.array(positions)
+        if (positions < 0).any():
+            return None
+        index = np.ravel_multi_index(positions, self.shape)
+        return self.classes.take(self.predictions[index]), self.probabilities[index]
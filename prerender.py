@@ -0,0 +1,60 @@
+"""
+Prerendered pages for routes whose output only depends on constants.
+
+The home, about, contact and prediction form pages render the same HTML
+for every visitor, so each is rendered once (at startup or on first hit)
+and kept as bytes with a strong ETag derived from its content. Workers
+rendering the same templates produce the same ETag, so browsers revalidate
+with If-None-Match and get 304 Not Modified from any worker. The pages can
+also be written to a directory for nginx to serve without the app.
+"""
+
+import hashlib
+import os
+import threading
+
+
+class PrerenderedPage:
+    """Rendered HTML with its strong ETag"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, html):
+        self.body = html.encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+class PageCache:
+    """Pages rendered once per process, by name"""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, name, render):
+        """The page for name, rendering it with render() on first use"""
+        page = self._pages.get(name)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(name)
+                if page is None:
+                    page = self._pages[name] = PrerenderedPage(render())
+        return page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+def write_pages(pages, output_dir):
+    """Write {file name: PrerenderedPage} into output_dir, replacing files atomically"""
+    os.makedirs(output_dir, exist_ok=True)
+    for file_name, page in pages.items():
+        path = os.path.join(output_dir, file_name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(page.body)
+        os.replace(temp_path, path)
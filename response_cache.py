@@ -0,0 +1,64 @@
+"""
+Bounded LRU cache of rendered prediction responses.
+
+The result page for a given form input and model version never changes,
+and traffic concentrates on a few common symptom combinations, so the
+rendered HTML (and its JSON equivalent) is kept for the most recently used
+inputs instead of re-rendering the template on every request.
+"""
+
+import threading
+from collections import OrderedDict
+
+from metrics import Counter
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class ResponseCache:
+    """Thread-safe LRU map from (model version, input) to a rendered response or other result"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, name='response',
+                 documentation='Rendered response cache hits, misses and evictions'):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Exported at /metrics when metrics are enabled
+        self.events = Counter(f'animal_health_{name}_cache_events_total', documentation, ('event',))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached response for key and mark it recently used, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.events.inc('hit' if entry is not None else 'miss')
+        return entry
+
+    def put(self, key, entry):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.events.inc('eviction', amount=evicted)
+
+    def clear(self):
+        """Drop every entry, e.g. when a new model starts serving"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.events.value('hit'),
+            'misses': self.events.value('miss'),
+            'evictions': self.events.value('eviction'),
+        }
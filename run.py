@@ -3,13 +3,26 @@
 Beyond the Veil of Wellness - Application Runner
 Author: VIRAL GHATALIYA
 Description: Enhanced runner script for the Animal Health Classification web app
+
+Usage:
+    python run.py                                   # development server
+    python run.py --production --workers 4 --threads 2
 """
 
+import argparse
+import gc
 import os
 import sys
 import subprocess
 from pathlib import Path
 
+# Production server defaults; WEB_CONCURRENCY and PORT follow the Heroku conventions
+DEFAULT_WORKERS = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+DEFAULT_THREADS = int(os.environ.get('WEB_THREADS', '2'))
+DEFAULT_BIND = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+DEFAULT_TIMEOUT = 30
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
 def check_python_version():
     """Check if Python version is compatible"""
     if sys.version_info < (3, 7):
@@ -112,11 +125,98 @@ def run_application():
         print(f"❌ Error running application: {e}")
         sys.exit(1)
 
+def run_production(bind=DEFAULT_BIND, workers=DEFAULT_WORKERS, threads=DEFAULT_THREADS,
+                   timeout=DEFAULT_TIMEOUT, graceful_timeout=DEFAULT_GRACEFUL_TIMEOUT):
+    """Run the app on a pre-fork gunicorn server with the model loaded before forking"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("❌ Production mode requires gunicorn (Linux/macOS): pip install gunicorn")
+        sys.exit(1)
+
+    def worker_exit(server, worker):
+        from app import prediction_log, stop_model_watcher
+        stop_model_watcher()
+        # Write out queued audit records before the worker goes away
+        if prediction_log is not None:
+            prediction_log.close()
+
+    class ProductionServer(BaseApplication):
+        """gunicorn application that preloads the model in the master process"""
+
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Build minified, fingerprinted assets before the app reads their manifest
+            from static_assets import build_assets
+            try:
+                build_assets()
+            except OSError as e:
+                print(f"⚠️  Static assets not built ({e}); serving the source files")
+
+            import app as app_module
+
+            # Load the model and build its prediction table once in the master;
+            # forked workers share these pages copy-on-write
+            if app_module.warm_model(start_watcher=False) is None:
+                print("⚠️  Model could not be loaded; workers will report it via /ready")
+            if app_module.PRERENDER_PAGES:
+                app_module.prerender_pages(app_module.PRERENDER_DIR)
+            # Keep the garbage collector from touching (and so copying) them
+            gc.freeze()
+            return app_module.app
+
+    # With INFERENCE_BACKEND=process every worker starts its own inference
+    # pool, so the cores are split between them unless INFERENCE_WORKERS is set
+    os.environ.setdefault('INFERENCE_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+    print(f"\n🚀 Starting Beyond the Veil of Wellness in production mode on {bind}")
+    print(f"👷 {workers} worker(s) x {threads} thread(s)")
+    ProductionServer({
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'preload_app': True,
+        'timeout': timeout,
+        # On SIGTERM workers finish in-flight requests for up to this long
+        'graceful_timeout': graceful_timeout,
+        'worker_exit': worker_exit,
+        'accesslog': '-',
+    }).run()
+
 def main():
     """Main function to set up and run the application"""
+    parser = argparse.ArgumentParser(description='Run Beyond the Veil of Wellness')
+    parser.add_argument('--production', action='store_true',
+                        help='Serve with a pre-fork multi-worker server instead of the debug server')
+    parser.add_argument('--bind', default=DEFAULT_BIND, help='Address to listen on (production)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Worker processes (production)')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help='Threads per worker (production)')
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help='Seconds before a silent worker is restarted (production)')
+    parser.add_argument('--graceful-timeout', type=int, default=DEFAULT_GRACEFUL_TIMEOUT,
+                        help='Seconds workers get to finish requests on shutdown (production)')
+    args = parser.parse_args()
+    
     print("🌟 Beyond the Veil of Wellness - Animal Health Classification")
     print("=" * 60)
     
+    if args.production:
+        # No installs or prompts: this runs unattended under a process manager
+        check_python_version()
+        if not check_files():
+            sys.exit(1)
+        check_model_file()
+        run_production(args.bind, args.workers, args.threads, args.timeout, args.graceful_timeout)
+        return
+    
     # Pre-flight checks
     check_python_version()
     
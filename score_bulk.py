@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Bulk Scoring
+Description: Score large CSV/Parquet exports of animal observations in
+bounded-size chunks, writing results incrementally.
+
+Input files need the same six columns the web form sends (animal_name,
+blood_brain_disease, appearance_disease, general_disease, lung_disease,
+abdominal_disease), or the input columns of the model's persisted feature
+encoder. Each chunk is encoded with the same FeatureEncoder the web app
+uses and scored with a single predict_proba call, so memory stays flat
+regardless of file size.
+
+Usage:
+    python score_bulk.py observations.csv scored.csv
+    python score_bulk.py observations.parquet scored.parquet --chunk-size 200000 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from encoding import FORM_ENCODER
+from inference import INPUT_DTYPE, check_feature_names, predict_batch
+from model_loader import load_feature_encoder, load_model
+
+DEFAULT_MODEL_PATH = 'models/rfc.pkl'
+DEFAULT_CHUNK_SIZE = 100000
+
+# status_class of the prediction form model's classes, as shown by the web app
+FORM_STATUS_CLASSES = {0: 'critical', 1: 'normal'}
+
+# Model loaded once per worker process by _init_worker
+_worker_model = None
+
+
+def _init_worker(model_path):
+    """Process pool initializer: load the model once per worker"""
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _score_in_worker(encoded):
+    """Score an encoded chunk with the worker's model"""
+    return predict_batch(_worker_model, encoded)
+
+
+def detect_format(path):
+    """Infer csv/parquet from a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.csv', '.txt') or extension.endswith('.gz'):
+        return 'csv'
+    raise ValueError(f"Cannot infer file format from '{path}', use --input-format/--output-format")
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        print("❌ Parquet support requires pyarrow: pip install pyarrow")
+        sys.exit(1)
+    return pyarrow
+
+
+def read_chunks(path, file_format, chunk_size):
+    """Yield DataFrames of at most chunk_size rows"""
+    if file_format == 'parquet':
+        pyarrow = _require_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file as they arrive"""
+
+    def __init__(self, path, file_format):
+        self.path = path
+        self.file_format = file_format
+        self.parquet_writer = None
+        self.rows_written = 0
+
+    def write(self, chunk):
+        if self.file_format == 'parquet':
+            pyarrow = _require_pyarrow()
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self.rows_written == 0 else 'a',
+                         header=self.rows_written == 0, index=False)
+        self.rows_written += len(chunk)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def encode_chunk(chunk, encoder):
+    """Encode a chunk's input columns; returns (encoded valid rows, validity mask)"""
+    missing = [field for field in encoder.input_fields if field not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+    columns = [chunk[field].to_numpy() for field in encoder.input_fields]
+    encoded, valid = encoder.encode_columns(columns)
+    return encoded[valid].astype(INPUT_DTYPE), valid
+
+
+def status_classes(classes):
+    """status_class per model class: critical/normal for the form model, else the label itself"""
+    labels = classes.tolist()
+    if np.issubdtype(classes.dtype, np.number) and set(labels) <= set(FORM_STATUS_CLASSES):
+        return np.array([FORM_STATUS_CLASSES[label] for label in labels], dtype=object)
+    return np.array([str(label) for label in labels], dtype=object)
+
+
+def attach_results(chunk, valid, predictions, probabilities, classes):
+    """
+    Add prediction columns to a chunk; invalid rows get prediction -1 (or
+    an empty value for models with non-numeric classes) and status 'invalid'
+    """
+    chunk = chunk.copy()
+    if np.issubdtype(classes.dtype, np.number):
+        prediction_column = np.full(len(chunk), -1, dtype=classes.dtype)
+    else:
+        prediction_column = np.full(len(chunk), None, dtype=object)
+    confidence_column = np.full(len(chunk), np.nan)
+    status_column = np.full(len(chunk), 'invalid', dtype=object)
+
+    if predictions is not None:
+        prediction_column[valid] = predictions
+        confidence_column[valid] = np.round(probabilities.max(axis=1) * 100, 2)
+        status_column[valid] = status_classes(classes).take(probabilities.argmax(axis=1))
+
+    chunk['prediction'] = prediction_column
+    chunk['status_class'] = status_column
+    chunk['confidence'] = confidence_column
+    for class_index, label in enumerate(classes):
+        column = np.full(len(chunk), np.nan)
+        if probabilities is not None:
+            column[valid] = probabilities[:, class_index]
+        chunk[f'probability_{label}'] = column
+    return chunk
+
+
+def score_file(input_path, output_path, model_path=DEFAULT_MODEL_PATH,
+               chunk_size=DEFAULT_CHUNK_SIZE, workers=0,
+               input_format=None, output_format=None):
+    """Score input_path chunk by chunk into output_path; returns the number of rows"""
+    input_format = input_format or detect_format(input_path)
+    output_format = output_format or detect_format(output_path)
+
+    encoder = load_feature_encoder(model_path, default=FORM_ENCODER)
+    model = load_model(model_path)
+    check_feature_names(model, encoder.feature_names)
+    classes = model.classes_
+    writer = ChunkWriter(output_path, output_format)
+
+    def finish(chunk, valid, result):
+        predictions, probabilities = result if result is not None else (None, None)
+        writer.write(attach_results(chunk, valid, predictions, probabilities, classes))
+
+    try:
+        if workers and workers > 1:
+            # Keep a bounded number of chunks in flight so memory stays flat,
+            # and write them back in input order
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                pending = deque()
+                for chunk in read_chunks(input_path, input_format, chunk_size):
+                    encoded, valid = encode_chunk(chunk, encoder)
+                    future = pool.submit(_score_in_worker, encoded) if len(encoded) else None
+                    pending.append((chunk, valid, future))
+                    if len(pending) >= workers * 2:
+                        chunk, valid, future = pending.popleft()
+                        finish(chunk, valid, future.result() if future else None)
+                while pending:
+                    chunk, valid, future = pending.popleft()
+                    finish(chunk, valid, future.result() if future else None)
+        else:
+            for chunk in read_chunks(input_path, input_format, chunk_size):
+                encoded, valid = encode_chunk(chunk, encoder)
+                finish(chunk, valid, predict_batch(model, encoded) if len(encoded) else None)
+    finally:
+        writer.close()
+
+    return writer.rows_written
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Bulk-score animal health observations')
+    parser.add_argument('input', help='Input CSV or Parquet file')
+    parser.add_argument('output', help='Output CSV or Parquet file')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Path to the trained model')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows read and scored per chunk')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Score chunks across this many worker processes')
+    parser.add_argument('--input-format', choices=['csv', 'parquet'])
+    parser.add_argument('--output-format', choices=['csv', 'parquet'])
+    args = parser.parse_args()
+
+    print(f"📂 Scoring {args.input} -> {args.output}")
+    start = time.perf_counter()
+    try:
+        rows = score_file(args.input, args.output, model_path=args.model,
+                          chunk_size=args.chunk_size, workers=args.workers,
+                          input_format=args.input_format, output_format=args.output_format)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+// =========================================
+// Beyond the Veil of Wellness - In-Browser Model Evaluator
+// =========================================
+//
+// Reads the bundle served at /api/model/bundle (see client_bundle.py): the
+// model's predicted class and class probabilities for every form input, in
+// row-major order over the option axes. A prediction is an index computation
+// and two reads, with results shaped like the /submit and /api/whatif JSON.
+
+(function() {
+    'use strict';
+
+    const MAGIC = 'AHB1';
+
+    function decode(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+        if (magic !== MAGIC) {
+            throw new Error('Not a model bundle');
+        }
+        const headerLength = view.getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+        const predictionsOffset = 8 + headerLength;
+
+        return {
+            version: header.version,
+            fields: header.fields,
+            labels: header.labels,
+            axes: header.axes,
+            classes: header.classes,
+            outcomes: header.outcomes,
+            scale: header.scale,
+            // Position of each option on its field's axis
+            positions: header.axes.map(function(options) {
+                const lookup = {};
+                options.forEach(function(option, position) {
+                    lookup[option] = position;
+                });
+                return lookup;
+            }),
+            predictions: new Uint8Array(buffer, predictionsOffset, header.rows),
+            view: view,
+            probabilitiesOffset: predictionsOffset + header.rows
+        };
+    }
+
+    function load(url) {
+        return fetch(url, { headers: { 'Accept': 'application/octet-stream' } })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Model bundle request failed: ' + response.status);
+                }
+                return response.arrayBuffer();
+            })
+            .then(decode);
+    }
+
+    // Flat index of a {field: value} record, or -1 if a value is not on the form
+    function indexOf(bundle, record) {
+        let index = 0;
+        for (let field = 0; field < bundle.fields.length; field++) {
+            const position = bundle.positions[field][record[bundle.fields[field]]];
+            if (position === undefined) {
+                return -1;
+            }
+            index = index * bundle.axes[field].length + position;
+        }
+        return index;
+    }
+
+    function predict(bundle, record) {
+        const index = indexOf(bundle, record);
+        if (index < 0) {
+            return null;
+        }
+        const classIndex = bundle.predictions[index];
+        const nClasses = bundle.classes.length;
+        const probabilities = {};
+        let best = 0;
+        for (let position = 0; position < nClasses; position++) {
+            const offset = bundle.probabilitiesOffset + 2 * (index * nClasses + position);
+            const value = bundle.view.getUint16(offset, true);
+            probabilities[bundle.classes[position]] = value / bundle.scale;
+            best = Math.max(best, value);
+        }
+        const label = bundle.classes[classIndex];
+        return {
+            prediction: isNaN(Number(label)) ? label : Number(label),
+            health_status: bundle.outcomes[classIndex].health_status,
+            status_class: bundle.outcomes[classIndex].status_class,
+            // The confidence /submit shows: max probability in percent, two decimals
+            confidence: Math.round(best * 10000 / bundle.scale) / 100,
+            probabilities: probabilities
+        };
+    }
+
+    // The base record's result and every single-field variation, like /api/whatif
+    function sweep(bundle, record) {
+        const base = predict(bundle, record);
+        if (base === null) {
+            return null;
+        }
+        const fields = bundle.fields.map(function(field, fieldIndex) {
+            const options = bundle.axes[fieldIndex].map(function(value) {
+                const variation = Object.assign({}, record);
+                variation[field] = value;
+                const result = predict(bundle, variation);
+                result.value = value;
+                result.selected = value === record[field];
+                result.changes_verdict = result.prediction !== base.prediction;
+                return result;
+            });
+            return { field: field, label: bundle.labels[fieldIndex], options: options };
+        });
+        return { base: Object.assign({ features: Object.assign({}, record) }, base), fields: fields };
+    }
+
+    window.ModelBundle = { decode: decode, load: load, predict: predict, sweep: sweep };
+})();
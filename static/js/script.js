@@ -262,6 +262,162 @@ document.addEventListener('DOMContentLoaded', function() {
         field.addEventListener('input', updateFormProgress);
     });
     
+    // =========================================
+    // What-If Sensitivity
+    // =========================================
+    
+    // Once every field is chosen, show the result of changing any single field:
+    // computed from the in-browser model bundle when it has loaded, otherwise
+    // scored by the server in one request instead of one form post per option
+    const whatIfForm = document.querySelector('form[data-whatif-url]');
+    const whatIfPanel = document.querySelector('.whatif-panel');
+    let whatIfController = null;
+    let modelBundle = null;
+    
+    function formatOption(value) {
+        return value.replace(/_/g, ' ').replace(/\b\w/g, function(letter) {
+            return letter.toUpperCase();
+        });
+    }
+    
+    function renderWhatIf(data) {
+        const base = data.base;
+        const summary = whatIfPanel.querySelector('.whatif-summary');
+        summary.textContent = (base.status_class === 'critical' ? 'Critical' : 'Normal') + ' (' + base.confidence + '%)';
+        summary.className = 'whatif-summary fw-semibold ' + (base.status_class === 'critical' ? 'text-danger' : 'text-success');
+        
+        const container = whatIfPanel.querySelector('.whatif-fields');
+        container.replaceChildren();
+        data.fields.forEach(function(field) {
+            const group = document.createElement('div');
+            group.className = 'whatif-field mb-3';
+            const label = document.createElement('div');
+            label.className = 'fw-semibold text-dark small mb-1';
+            label.textContent = field.label;
+            group.appendChild(label);
+            
+            field.options.forEach(function(option) {
+                const button = document.createElement('button');
+                const color = option.status_class === 'critical' ? 'danger' : 'success';
+                button.type = 'button';
+                button.className = 'btn btn-sm whatif-option ' + (option.selected ? 'btn-' + color : 'btn-outline-' + color);
+                button.title = option.health_status;
+                if (option.changes_verdict) {
+                    const icon = document.createElement('i');
+                    icon.className = 'fas fa-exchange-alt me-1';
+                    button.appendChild(icon);
+                }
+                button.appendChild(document.createTextNode(formatOption(option.value) + ' ' + option.confidence + '%'));
+                button.addEventListener('click', function() {
+                    const select = whatIfForm.querySelector('[name="' + field.field + '"]');
+                    select.value = option.value;
+                    select.dispatchEvent(new Event('change', { bubbles: true }));
+                });
+                group.appendChild(button);
+            });
+            container.appendChild(group);
+        });
+        whatIfPanel.classList.remove('d-none');
+    }
+    
+    function updateWhatIf() {
+        const record = {};
+        let complete = true;
+        whatIfForm.querySelectorAll('.form-select').forEach(function(select) {
+            record[select.name] = select.value;
+            complete = complete && Boolean(select.value);
+        });
+        if (!complete) {
+            whatIfPanel.classList.add('d-none');
+            return;
+        }
+        
+        // Only the latest selection matters
+        if (whatIfController) {
+            whatIfController.abort();
+            whatIfController = null;
+        }
+        const localSweep = modelBundle ? window.ModelBundle.sweep(modelBundle, record) : null;
+        if (localSweep) {
+            renderWhatIf(localSweep);
+            return;
+        }
+        whatIfController = new AbortController();
+        fetch(whatIfForm.dataset.whatifUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+            body: JSON.stringify(record),
+            signal: whatIfController.signal
+        })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('What-if request failed: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(renderWhatIf)
+            .catch(function(error) {
+                if (error.name !== 'AbortError') {
+                    whatIfPanel.classList.add('d-none');
+                }
+            });
+    }
+    
+    // =========================================
+    // Live Prediction
+    // =========================================
+    
+    // The model's answer for the current selection, computed in the browser;
+    // the form is still posted to /submit to confirm
+    const livePrediction = document.querySelector('.live-prediction');
+    
+    function updateLivePrediction() {
+        if (!livePrediction) {
+            return;
+        }
+        const record = {};
+        whatIfForm.querySelectorAll('.form-select').forEach(function(select) {
+            record[select.name] = select.value;
+        });
+        const result = modelBundle ? window.ModelBundle.predict(modelBundle, record) : null;
+        if (!result) {
+            livePrediction.classList.add('d-none');
+            return;
+        }
+        const critical = result.status_class === 'critical';
+        livePrediction.querySelector('.live-prediction-status').textContent = result.health_status;
+        livePrediction.querySelector('.live-prediction-confidence').textContent = result.confidence;
+        livePrediction.className = 'live-prediction alert mb-4 ' + (critical ? 'alert-danger' : 'alert-success');
+    }
+    
+    if (whatIfForm && whatIfPanel) {
+        whatIfForm.querySelectorAll('.form-select').forEach(function(select) {
+            select.addEventListener('change', updateWhatIf);
+            select.addEventListener('change', updateLivePrediction);
+        });
+        whatIfForm.addEventListener('reset', function() {
+            whatIfPanel.classList.add('d-none');
+            if (livePrediction) {
+                livePrediction.classList.add('d-none');
+            }
+        });
+        
+        // Without the bundle (older browsers, or disabled on the server) the
+        // server answers the what-if requests and no live prediction is shown
+        if (window.ModelBundle && whatIfForm.dataset.bundleUrl) {
+            window.ModelBundle.load(whatIfForm.dataset.bundleUrl)
+                .then(function(bundle) {
+                    modelBundle = bundle;
+                    updateLivePrediction();
+                    updateWhatIf();
+                })
+                .catch(function(error) {
+                    console.log('Model bundle unavailable: ', error.message);
+                });
+        }
+        updateWhatIf();
+    }
+    
     // =========================================
     // Results Page Enhancements
     // =========================================
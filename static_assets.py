@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Static Assets
+Description: Minify, fingerprint and precompress the site's CSS and
+JavaScript, and serve the results from Flask.
+
+Every .css/.js file under static/ is minified and written to
+static/dist/ with a content hash in its name (css/style.3f2a9c1e.css),
+alongside .gz and (with the brotli package) .br variants. A manifest maps
+each source name to its built name; the web app resolves
+url_for('static', filename='css/style.css') through it, serves the
+precompressed variant a client accepts, and marks fingerprinted files as
+immutable so they can be cached for a year.
+
+rjsmin/rcssmin are used for minification when installed; otherwise a
+conservative built-in minifier strips comments and indentation.
+
+Usage:
+    python static_assets.py              # build into static/dist
+    python static_assets.py --clean      # also remove outdated builds
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+
+STATIC_DIR = 'static'
+BUILD_DIR = 'dist'
+MANIFEST_FILE = 'manifest.json'
+ASSET_EXTENSIONS = ('.css', '.js')
+
+# Fingerprinted files never change, so clients may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Precompressed variants, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# A '/' after one of these (or at the start) begins a regex literal, not a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};')
+_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                   'throw', 'case', 'do', 'else', 'yield', 'await'}
+
+# Comments and quoted strings in CSS, which the fallback minifier keeps intact
+_CSS_TOKENS = re.compile(r'(/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.S)
+
+
+def _strip_js_comments(source):
+    """Drop comments and indentation outside strings, template literals and regexes"""
+    out = []
+    i, n = 0, len(source)
+    last = ''  # last significant character or word written
+    while i < n:
+        char = source[i]
+        if char in '"\'`':
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            last = char
+            i = end + 1
+        elif source.startswith('//', i):
+            i = source.find('\n', i)
+            i = n if i < 0 else i
+        elif source.startswith('/*', i):
+            i = source.find('*/', i + 2)
+            i = n if i < 0 else i + 2
+            out.append(' ')
+        elif char == '/' and (not last or last in _REGEX_PRECEDERS or last in _REGEX_KEYWORDS):
+            end, in_class = i + 1, False
+            while end < n and (in_class or source[end] != '/') and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] == '[':
+                    in_class = True
+                elif source[end] == ']':
+                    in_class = False
+                end += 1
+            out.append(source[i:end + 1])
+            last = '/'
+            i = end + 1
+        elif char in ' \t\r\n':
+            end = i
+            while end < n and source[end] in ' \t\r\n':
+                end += 1
+            # Keep line breaks so automatic semicolon insertion is unaffected
+            out.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+        elif char.isalnum() or char in '_$':
+            # Whole words, so a keyword such as 'return' can be told from a name
+            end = i + 1
+            while end < n and (source[end].isalnum() or source[end] in '_$'):
+                end += 1
+            last = source[i:end]
+            out.append(last)
+            i = end
+        else:
+            out.append(char)
+            last = char
+            i += 1
+    lines = (line.strip() for line in ''.join(out).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_js(source):
+    try:
+        import rjsmin
+    except ImportError:
+        return _strip_js_comments(source)
+    return rjsmin.jsmin(source)
+
+
+def minify_css(source):
+    try:
+        import rcssmin
+    except ImportError:
+        pass
+    else:
+        return rcssmin.cssmin(source)
+
+    # Drop comments and set strings aside, so whitespace inside them survives
+    strings = []
+    parts = []
+    for index, part in enumerate(_CSS_TOKENS.split(source)):
+        if index % 2 == 0:
+            parts.append(part)
+        elif not part.startswith('/*'):
+            parts.append(f"\x00{len(strings)}\x00")
+            strings.append(part)
+    source = ''.join(parts)
+
+    source = re.sub(r'\s+', ' ', source)
+    # Spaces before ':' are kept, since 'a :hover' and 'a:hover' differ
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    source = source.replace(';}', '}').strip()
+    return re.sub(r'\x00(\d+)\x00', lambda match: strings[int(match.group(1))], source)
+
+
+def fingerprinted_name(name, content):
+    """css/style.css -> css/style.<hash>.css"""
+    root, extension = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(content).hexdigest()[:8]}{extension}"
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def find_assets(static_dir=STATIC_DIR):
+    """Names (relative to static_dir, '/'-separated) of the files to build"""
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        if os.path.abspath(root) == os.path.abspath(os.path.join(static_dir, BUILD_DIR)):
+            dirs[:] = []
+            continue
+        for file_name in files:
+            if file_name.endswith(ASSET_EXTENSIONS):
+                names.append(os.path.relpath(os.path.join(root, file_name), static_dir).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def build_assets(static_dir=STATIC_DIR, clean=False):
+    """Build every asset into static_dir/dist and write the manifest; returns the manifest"""
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    manifest = {}
+    for name in find_assets(static_dir):
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            source = f.read()
+        minified = (minify_css(source) if name.endswith('.css') else minify_js(source)).encode('utf-8')
+
+        built_name = f"{BUILD_DIR}/{fingerprinted_name(name, minified)}"
+        built_path = os.path.join(static_dir, built_name)
+        _write_atomic(built_path, minified)
+        # mtime=0 keeps the .gz bytes identical across builds
+        _write_atomic(built_path + '.gz', gzip.compress(minified, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write_atomic(built_path + '.br', brotli.compress(minified))
+        manifest[name] = built_name
+
+    build_dir = os.path.join(static_dir, BUILD_DIR)
+    _write_atomic(os.path.join(build_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode('utf-8'))
+
+    if clean:
+        # Servers still running the previous manifest need its files, so this is opt-in
+        keep = {os.path.normpath(os.path.join(static_dir, built + suffix))
+                for built in manifest.values() for suffix in ('', '.gz', '.br')}
+        keep.add(os.path.normpath(os.path.join(build_dir, MANIFEST_FILE)))
+        for root, _, files in os.walk(build_dir):
+            for file_name in files:
+                path = os.path.normpath(os.path.join(root, file_name))
+                if path not in keep:
+                    os.remove(path)
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """
+    {source name: built name} from the last build, or {} if there is none.
+    Sources edited since the build are left out so they are served as is.
+    """
+    manifest_path = os.path.join(static_dir, BUILD_DIR, MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        built_at = os.path.getmtime(manifest_path)
+    except (OSError, ValueError):
+        return {}
+    return {
+        name: built for name, built in manifest.items()
+        if os.path.exists(os.path.join(static_dir, built))
+        and os.path.exists(os.path.join(static_dir, name))
+        and os.path.getmtime(os.path.join(static_dir, name)) <= built_at
+    }
+
+
+def accepted_encodings(accept_encoding):
+    """Content codings a client accepts, from its Accept-Encoding header"""
+    accepted = set()
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def send_static_asset(static_dir, filename, accept_encoding):
+    """Flask response for a static file, using a precompressed variant the client accepts"""
+    from flask import send_from_directory
+    from werkzeug.security import safe_join
+
+    immutable = filename.startswith(BUILD_DIR + '/')
+    max_age = IMMUTABLE_MAX_AGE if immutable else None
+    accepted = accepted_encodings(accept_encoding)
+
+    response = None
+    for encoding, suffix in ENCODINGS:
+        path = safe_join(static_dir, filename + suffix)
+        if encoding in accepted and path is not None and os.path.isfile(path):
+            # Named after the original file: the encoding is only a transfer detail
+            response = send_from_directory(static_dir, filename + suffix, max_age=max_age,
+                                           mimetype=mimetypes.guess_type(filename)[0],
+                                           download_name=os.path.basename(filename))
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(static_dir, filename, max_age=max_age)
+
+    response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and precompress static assets')
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    parser.add_argument('--clean', action='store_true', help='Remove files of earlier builds')
+    args = parser.parse_args()
+
+    try:
+        manifest = build_assets(args.static_dir, clean=args.clean)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    for name, built in manifest.items():
+        source_size = os.path.getsize(os.path.join(args.static_dir, name))
+        built_path = os.path.join(args.static_dir, built)
+        sizes = [f"{os.path.getsize(built_path):,} B minified"]
+        for _, suffix in reversed(ENCODINGS):
+            if os.path.exists(built_path + suffix):
+                sizes.append(f"{os.path.getsize(built_path + suffix):,} B {suffix}")
+        print(f"✅ {name} ({source_size:,} B) -> {built}: {', '.join(sizes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Beyond the Veil of Wellness - Synthetic Data
+Description: Vectorized generator of synthetic animal vitals for training,
+load tests and model-scaling experiments.
+
+Rows are drawn and scored with whole-array NumPy operations, and large
+datasets are produced in fixed-size chunks written straight to CSV, Parquet
+or a structured .npy file, so memory stays bounded by the chunk size.
+Class balance can be set explicitly; otherwise it follows the natural
+distribution of the scoring rules.
+
+Usage:
+    python synthetic_data.py data/vitals.parquet --rows 10000000
+    python synthetic_data.py data/vitals.npy --rows 2000000 --class-balance healthy=0.4,monitor=0.4,concern=0.2
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNK_SIZE = 1000000
+HEALTH_CLASSES = np.array(['healthy', 'monitor', 'concern'])
+
+APPETITE_LEVELS = np.array(['poor', 'fair', 'good'])
+APPETITE_P = [0.2, 0.3, 0.5]
+ACTIVITY_LEVELS = np.array(['low', 'medium', 'high'])
+ACTIVITY_P = [0.3, 0.4, 0.3]
+
+# Categorical columns are generated as integer codes into these labels
+CATEGORY_LABELS = {
+    'appetite': APPETITE_LEVELS,
+    'activity_level': ACTIVITY_LEVELS,
+    'health_status': HEALTH_CLASSES,
+}
+
+# Points each category level adds to the health score
+LEVEL_POINTS = np.array([0.0, 0.5, 1.0])
+
+# Row layout of .npy output
+RECORD_DTYPE = np.dtype([
+    ('temperature', np.float64),
+    ('heart_rate', np.float64),
+    ('respiratory_rate', np.float64),
+    ('appetite', 'U4'),
+    ('activity_level', 'U6'),
+    ('age_years', np.int64),
+    ('weight_kg', np.float64),
+    ('health_status', 'U7'),
+])
+
+
+def draw_rows(rng, n_rows):
+    """Draw n_rows of vitals and score them; categorical columns are returned as codes"""
+    # Works with both np.random.RandomState and np.random.Generator
+    integers = rng.integers if hasattr(rng, 'integers') else rng.randint
+
+    temperature = rng.normal(101, 2, n_rows)  # Normal temp around 101°F for animals
+    heart_rate = rng.normal(80, 15, n_rows)
+    respiratory_rate = rng.normal(20, 5, n_rows)
+    appetite = rng.choice(len(APPETITE_LEVELS), n_rows, p=APPETITE_P)
+    activity_level = rng.choice(len(ACTIVITY_LEVELS), n_rows, p=ACTIVITY_P)
+    age_years = integers(1, 15, n_rows)
+    weight_kg = rng.normal(25, 10, n_rows)
+
+    score = (
+        ((temperature >= 99) & (temperature <= 102.5)).astype(np.float64)
+        + ((heart_rate >= 60) & (heart_rate <= 100))
+        + ((respiratory_rate >= 15) & (respiratory_rate <= 25))
+        + LEVEL_POINTS[appetite]
+        + LEVEL_POINTS[activity_level]
+    )
+    health_status = np.where(score >= 4, 0, np.where(score >= 2.5, 1, 2)).astype(np.int8)
+
+    return {
+        'temperature': temperature,
+        'heart_rate': heart_rate,
+        'respiratory_rate': respiratory_rate,
+        'appetite': appetite.astype(np.int8),
+        'activity_level': activity_level.astype(np.int8),
+        'age_years': age_years,
+        'weight_kg': weight_kg,
+        'health_status': health_status,
+    }
+
+
+def class_quotas(n_rows, class_balance):
+    """Rows of each class for a {class: share} balance, summing to n_rows"""
+    unknown = set(class_balance) - set(HEALTH_CLASSES.tolist())
+    if unknown:
+        raise ValueError(f"Unknown health classes: {', '.join(sorted(unknown))}")
+    shares = np.array([class_balance.get(name, 0.0) for name in HEALTH_CLASSES], dtype=np.float64)
+    if shares.sum() <= 0 or (shares < 0).any():
+        raise ValueError("Class balance shares must be non-negative and not all zero")
+    quotas = np.floor(shares / shares.sum() * n_rows).astype(np.int64)
+    quotas[np.argmax(shares)] += n_rows - quotas.sum()
+    return quotas
+
+
+def generate_chunk(rng, n_rows, class_balance=None, max_rounds=100):
+    """Generate n_rows, resampling until each class fills its quota when class_balance is given"""
+    if class_balance is None:
+        return draw_rows(rng, n_rows)
+
+    remaining = class_quotas(n_rows, class_balance)
+    parts = []
+    for _ in range(max_rounds):
+        if not remaining.any():
+            break
+        rows = draw_rows(rng, n_rows)
+        for class_code, quota in enumerate(remaining):
+            if quota:
+                index = np.flatnonzero(rows['health_status'] == class_code)[:quota]
+                parts.append({column: values[index] for column, values in rows.items()})
+                remaining[class_code] -= len(index)
+    # Checked after the loop: the quotas may be filled on the last round
+    if remaining.any():
+        raise ValueError(f"Could not reach the requested class balance after {max_rounds} rounds")
+
+    chunk = {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+    order = rng.permutation(n_rows)
+    return {column: values[order] for column, values in chunk.items()}
+
+
+def with_labels(chunk):
+    """Replace category codes with their string labels"""
+    return {column: CATEGORY_LABELS[column][values] if column in CATEGORY_LABELS else values
+            for column, values in chunk.items()}
+
+
+def to_frame(chunk, categorical=False):
+    """DataFrame of a chunk, with string or (cheaper to build) pandas categorical columns"""
+    if not categorical:
+        return pd.DataFrame(with_labels(chunk))
+    return pd.DataFrame({
+        column: pd.Categorical.from_codes(values, CATEGORY_LABELS[column]) if column in CATEGORY_LABELS else values
+        for column, values in chunk.items()
+    })
+
+
+def create_sample_data(n_rows=1000, seed=42, class_balance=None):
+    """Create sample animal health data for training as a DataFrame"""
+    # RandomState keeps the default 1000-row dataset identical to earlier releases
+    return to_frame(generate_chunk(np.random.RandomState(seed), n_rows, class_balance))
+
+
+def iter_chunks(n_rows, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, class_balance=None):
+    """Yield column dicts of at most chunk_size rows, each from an independent seeded stream"""
+    n_chunks = max(1, -(-n_rows // chunk_size))
+    for chunk_index, seed_sequence in enumerate(np.random.SeedSequence(seed).spawn(n_chunks)):
+        size = min(chunk_size, n_rows - chunk_index * chunk_size)
+        yield generate_chunk(np.random.default_rng(seed_sequence), size, class_balance)
+
+
+def detect_format(path):
+    """Infer csv/parquet/npy from a file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        return 'npy'
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.csv', '.txt') or extension.endswith('.gz'):
+        return 'csv'
+    raise ValueError(f"Cannot infer file format from '{path}', use --format")
+
+
+def write_dataset(path, n_rows, chunk_size=DEFAULT_CHUNK_SIZE, seed=42,
+                  class_balance=None, file_format=None):
+    """Generate n_rows chunk by chunk straight into path; returns rows written"""
+    file_format = file_format or detect_format(path)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    if file_format == 'npy':
+        # Header for the final shape, then each chunk's records appended in order
+        rows_written = 0
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.lib.format.write_array_header_1_0(f, {
+                'descr': np.lib.format.dtype_to_descr(RECORD_DTYPE),
+                'fortran_order': False,
+                'shape': (n_rows,),
+            })
+            for chunk in iter_chunks(n_rows, chunk_size, seed, class_balance):
+                records = np.empty(len(chunk['health_status']), dtype=RECORD_DTYPE)
+                for column, values in with_labels(chunk).items():
+                    records[column] = values
+                f.write(records.tobytes())
+                rows_written += len(records)
+        os.replace(temp_path, path)
+        return rows_written
+
+    from score_bulk import ChunkWriter
+    writer = ChunkWriter(path, file_format)
+    try:
+        for chunk in iter_chunks(n_rows, chunk_size, seed, class_balance):
+            # Categorical columns become dictionary-encoded Parquet columns
+            writer.write(to_frame(chunk, categorical=file_format == 'parquet'))
+    finally:
+        writer.close()
+    return writer.rows_written
+
+
+def load_dataset(path, file_format=None):
+    """Load a dataset written by write_dataset (or any CSV/Parquet with the same columns)"""
+    file_format = file_format or detect_format(path)
+    if file_format == 'npy':
+        return pd.DataFrame(np.load(path, mmap_mode='r'))
+    if file_format == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def iter_dataset_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, columns=None, file_format=None):
+    """Yield DataFrames of at most chunk_size rows without loading the whole file"""
+    file_format = file_format or detect_format(path)
+    if file_format == 'npy':
+        # Read each chunk's records straight from the file, so only one chunk
+        # is ever resident (a memory map would keep every page it touched)
+        with open(path, 'rb') as f:
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, _, dtype = read_header(f)
+            for start in range(0, shape[0], chunk_size):
+                records = np.fromfile(f, dtype=dtype, count=min(chunk_size, shape[0] - start))
+                yield pd.DataFrame(records[list(columns)] if columns is not None else records)
+    elif file_format == 'parquet':
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, usecols=columns)
+
+
+def parse_class_balance(text):
+    """Parse 'healthy=0.4,monitor=0.4,concern=0.2' into a dict"""
+    balance = {}
+    for item in text.split(','):
+        name, _, share = item.partition('=')
+        try:
+            balance[name.strip()] = float(share)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid class share '{item}', expected name=share")
+    return balance
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Generate a synthetic animal health dataset')
+    parser.add_argument('output', help='Output .csv, .parquet or .npy file')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of rows to generate')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Rows generated and written per chunk')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--class-balance', type=parse_class_balance,
+                        help='Class shares, e.g. healthy=0.4,monitor=0.4,concern=0.2')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'npy'])
+    args = parser.parse_args()
+
+    print(f"🧪 Generating {args.rows:,} rows -> {args.output}")
+    start = time.perf_counter()
+    try:
+        rows = write_dataset(args.output, args.rows, chunk_size=args.chunk_size, seed=args.seed,
+                             class_balance=args.class_balance, file_format=args.format)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Shared pytest setup: the modules live at the repository root, next to models/"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VALID_RECORD = {'animal_name': 'Dogs', 'blood_brain_disease': 'anemia', 'appearance_disease': 'normal',
+                'general_disease': 'fever', 'lung_disease': 'normal', 'abdominal_disease': 'normal'}
+
+
+@pytest.fixture(scope='session')
+def client():
+    """Test client of the web app, with the audit log and statistics switched off"""
+    os.environ['PREDICTION_LOG'] = '0'
+    os.environ['PREDICTION_STATS'] = '0'
+    # Model paths such as models/rfc.pkl are relative to the repository root
+    previous = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        import app
+        app.app.config['TESTING'] = True
+        yield app.app.test_client()
+    finally:
+        os.chdir(previous)
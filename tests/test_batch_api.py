@@ -0,0 +1,62 @@
+"""/api/predict/batch: JSON and NDJSON bodies, per-record errors, malformed input"""
+
+import json
+
+from conftest import VALID_RECORD
+
+
+def results(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_json_array_is_scored_in_order(client):
+    records = [VALID_RECORD, dict(VALID_RECORD, animal_name='Cats')]
+    response = client.post('/api/predict/batch', json=records)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    items = results(response)
+    assert [item['index'] for item in items] == [0, 1]
+    for item in items:
+        assert item['status_class'] in ('critical', 'normal')
+        assert abs(sum(item['probabilities'].values()) - 1) < 1e-9
+
+
+def test_records_object_matches_array(client):
+    array = results(client.post('/api/predict/batch', json=[VALID_RECORD]))
+    wrapped = results(client.post('/api/predict/batch', json={'records': [VALID_RECORD]}))
+    assert array == wrapped
+
+
+def test_ndjson_body(client):
+    body = '\n'.join(json.dumps(record) for record in [VALID_RECORD, VALID_RECORD]) + '\n'
+    response = client.post('/api/predict/batch', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert len(results(response)) == 2
+
+
+def test_invalid_record_is_reported_without_failing_the_batch(client):
+    records = [dict(VALID_RECORD, animal_name='Zebra'), VALID_RECORD,
+               {key: value for key, value in VALID_RECORD.items() if key != 'lung_disease'}]
+    items = results(client.post('/api/predict/batch', json=records))
+    assert 'animal_name' in items[0]['error']
+    assert 'prediction' in items[1]
+    assert 'lung_disease' in items[2]['error']
+
+
+def test_malformed_json_gets_json_400(client):
+    response = client.post('/api/predict/batch', data='[{"animal_name": ', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid request body: Malformed JSON'}
+
+
+def test_malformed_ndjson_line_gets_json_400(client):
+    response = client.post('/api/predict/batch', data='{"animal_name": "Dogs"}\n{oops\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_wrong_shape_gets_json_400(client):
+    response = client.post('/api/predict/batch', json={'animal_name': 'Dogs'})
+    assert response.status_code == 400
+    assert 'records' in response.get_json()['error']
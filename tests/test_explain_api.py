@@ -0,0 +1,58 @@
+"""/api/explain: single records, batches, and errors"""
+
+import json
+
+import pytest
+
+from conftest import VALID_RECORD
+from encoding import FORM_FIELDS
+
+
+def check_explanation(item):
+    explanation = item['explanation']
+    assert sorted(entry['field'] for entry in explanation['contributions']) == sorted(FORM_FIELDS)
+    magnitudes = [abs(entry['contribution']) for entry in explanation['contributions']]
+    assert magnitudes == sorted(magnitudes, reverse=True)
+    # The base value plus every contribution adds up to the predicted class's probability
+    total = explanation['base'] + sum(entry['contribution'] for entry in explanation['contributions'])
+    assert total == pytest.approx(item['probabilities'][explanation['class']], abs=1e-3)
+
+
+def test_single_record(client):
+    response = client.post('/api/explain', json=VALID_RECORD)
+    assert response.status_code == 200
+    item = response.get_json()
+    assert 'index' not in item
+    assert item['explanation']['class'] == str(item['prediction'])
+    check_explanation(item)
+
+
+def test_single_record_agrees_with_batch_prediction(client):
+    explained = client.post('/api/explain', json=VALID_RECORD).get_json()
+    response = client.post('/api/predict/batch', json=[VALID_RECORD])
+    predicted = json.loads(response.get_data(as_text=True))
+    assert explained['prediction'] == predicted['prediction']
+    assert explained['probabilities'] == pytest.approx(predicted['probabilities'])
+
+
+def test_batch(client):
+    records = [VALID_RECORD, dict(VALID_RECORD, animal_name='Horses'), dict(VALID_RECORD, general_disease='bogus')]
+    response = client.post('/api/explain', json={'records': records})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [item['index'] for item in results] == [0, 1, 2]
+    check_explanation(results[0])
+    check_explanation(results[1])
+    assert 'general_disease' in results[2]['error']
+
+
+def test_unknown_value_in_single_record(client):
+    response = client.post('/api/explain', json=dict(VALID_RECORD, animal_name='Zebra'))
+    assert response.status_code == 400
+    assert 'animal_name' in response.get_json()['error']
+
+
+def test_malformed_json_gets_json_400(client):
+    response = client.post('/api/explain', data='{"animal_name": "Dogs"', content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid request body: Malformed JSON'}
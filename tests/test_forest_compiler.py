@@ -0,0 +1,69 @@
+"""CompiledForest must reproduce the source model's predict_proba bit for bit"""
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from forest_compiler import (CompiledForest, EVAL_CHUNK_ROWS, compile_forest, export_compiled_forest,
+                             load_compiled_forest, verify_compiled_forest)
+
+
+@pytest.fixture(scope='module')
+def data():
+    X, y = make_classification(n_samples=600, n_features=6, n_informative=4, n_classes=3, random_state=0)
+    # Integer-valued columns, like the encoded form fields, hit thresholds exactly
+    X[:, :3] = np.round(X[:, :3] * 3)
+    return X, y
+
+
+@pytest.mark.parametrize('model', [
+    DecisionTreeClassifier(random_state=0),
+    DecisionTreeClassifier(max_depth=3, random_state=0),
+    RandomForestClassifier(n_estimators=25, random_state=0),
+    RandomForestClassifier(n_estimators=10, max_depth=4, bootstrap=False, random_state=0),
+], ids=['tree', 'shallow-tree', 'forest', 'shallow-forest'])
+def test_probabilities_are_bit_identical(model, data):
+    X, y = data
+    model.fit(X, y)
+    compiled = CompiledForest(compile_forest(model))
+    # More rows than one evaluation chunk, plus unseen inputs
+    X_eval = np.vstack([X, np.random.default_rng(1).normal(size=(EVAL_CHUNK_ROWS, X.shape[1]))])
+    verify_compiled_forest(model, compiled, X_eval)
+    np.testing.assert_array_equal(compiled.predict(X_eval), model.predict(X_eval.astype(np.float32)))
+
+
+def test_string_labels_and_round_trip(data, tmp_path):
+    X, y = data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, np.array(['a', 'b', 'c'])[y])
+    path = tmp_path / 'compiled.pkl'
+    export_compiled_forest(model, path)
+    compiled = load_compiled_forest(path, mmap_mode='r')
+    verify_compiled_forest(model, compiled, X)
+    assert list(compiled.classes_) == ['a', 'b', 'c']
+
+
+def test_verify_detects_a_mismatch(data):
+    X, y = data
+    model = DecisionTreeClassifier(random_state=0).fit(X, y)
+    arrays = compile_forest(model)
+    arrays['value'] = arrays['value'][:, ::-1].copy()
+    with pytest.raises(AssertionError):
+        verify_compiled_forest(model, CompiledForest(arrays), X)
+
+
+def test_rejects_wrong_feature_count(data):
+    X, y = data
+    compiled = CompiledForest(compile_forest(DecisionTreeClassifier(random_state=0).fit(X, y)))
+    with pytest.raises(ValueError):
+        compiled.predict_proba(X[:, :-1])
+
+
+def test_shipped_model_over_the_form_domain(monkeypatch):
+    from conftest import ROOT
+    from forest_compiler import DEFAULT_MODEL_PATH, full_domain
+    monkeypatch.chdir(ROOT)
+    model = joblib.load(DEFAULT_MODEL_PATH)
+    verify_compiled_forest(model, CompiledForest(compile_forest(model)), full_domain())
@@ -0,0 +1,159 @@
+"""Prediction audit log: rotation, drops, crash recovery in compact(), export"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import prediction_log
+from conftest import ROOT
+from prediction_log import PredictionLog, compact, export, iter_records
+
+
+def record(number):
+    return {'time': f'2026-10-17T00:00:{number % 60:02d}Z', 'model_version': 'test',
+            'inputs': {'animal_name': 'Dogs'}, 'prediction': number % 2, 'confidence': 90.0,
+            'probabilities': {'0': 0.9, '1': 0.1}, 'latency_ms': 1.5, 'number': number}
+
+
+def numbers(log_dir, include_active=False):
+    return sorted(item['number'] for item in iter_records(log_dir, include_active))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def files(log_dir, suffix):
+    return [name for name in os.listdir(log_dir) if name.endswith(suffix)]
+
+
+def test_records_survive_size_rotation_and_compaction(tmp_path):
+    log = PredictionLog(str(tmp_path), batch_size=5, flush_seconds=0.01, segment_bytes=500, fsync=False)
+    for number in range(50):
+        log.log(record(number))
+    log.close()
+    assert len(files(tmp_path, prediction_log.CLOSED_SUFFIX)) > 1
+    assert not files(tmp_path, prediction_log.ACTIVE_SUFFIX)
+    assert log.records.value('written') == 50
+
+    assert compact(str(tmp_path)) > 1
+    assert len(files(tmp_path, prediction_log.CLOSED_SUFFIX)) == 1
+    assert numbers(tmp_path) == list(range(50))
+
+
+def test_idle_segment_rotates_by_age(tmp_path):
+    log = PredictionLog(str(tmp_path), flush_seconds=0.01, segment_seconds=0.2, fsync=False)
+    log.log(record(1))
+    wait_for(lambda: files(tmp_path, prediction_log.CLOSED_SUFFIX))
+    assert numbers(tmp_path) == [1]
+    log.close()
+
+
+def test_full_queue_drops_and_counts(tmp_path, capsys):
+    log = PredictionLog(str(tmp_path), max_queue=1, batch_size=1, flush_seconds=0.01, fsync=False)
+    gate = threading.Event()
+    write = log._write
+    log._write = lambda batch: (gate.wait(), write(batch))
+    assert log.log(record(0))
+    wait_for(log._queue.empty)  # the writer holds record 0 and waits at the gate
+    assert log.log(record(1))
+    assert not log.log(record(2))
+    assert not log.log(record(3))
+    gate.set()
+    log.close()
+    assert log.records.value('dropped') == 2
+    assert log.records.value('written') == 2
+    # Reported once, not for every dropped record
+    assert capsys.readouterr().out.count('dropped 1 record(s)') == 1
+    assert numbers(tmp_path) == [0, 1]
+
+
+def test_failed_writes_are_counted(tmp_path):
+    log = PredictionLog(str(tmp_path), batch_size=1, flush_seconds=0.01, fsync=False)
+    log.log({'not serializable': object()})
+    log.close()
+    assert log.records.value('failed') == 1
+    assert log.records.value('dropped') == 0
+
+
+@pytest.mark.skipif(prediction_log.fcntl is None, reason='needs flock')
+def test_compact_closes_abandoned_segments_only(tmp_path):
+    crashed = f"""
+import os, sys, time
+sys.path.insert(0, {ROOT!r})
+from prediction_log import PredictionLog
+log = PredictionLog({str(tmp_path)!r}, batch_size=1, flush_seconds=0.01, fsync=False)
+log.log({json.dumps(record(1))})
+while log.records.value('written') < 1:
+    time.sleep(0.01)
+os._exit(1)
+"""
+    subprocess.run([sys.executable, '-c', crashed], timeout=30)
+    assert len(files(tmp_path, prediction_log.ACTIVE_SUFFIX)) == 1
+
+    live = PredictionLog(str(tmp_path), batch_size=1, flush_seconds=0.01, fsync=False)
+    live.log(record(2))
+    wait_for(lambda: live.records.value('written') == 1)
+    compact(str(tmp_path))
+    # The crashed writer's segment was merged; the live one is still open
+    assert numbers(tmp_path) == [1]
+    assert len(files(tmp_path, prediction_log.ACTIVE_SUFFIX)) == 1
+    live.close()
+    compact(str(tmp_path))
+    assert numbers(tmp_path) == [1, 2]
+
+
+def write_segment(log_dir, name, numbers):
+    with gzip.open(os.path.join(log_dir, name), 'wt', encoding='utf-8') as f:
+        for number in numbers:
+            f.write(json.dumps(record(number)) + '\n')
+
+
+SEGMENT = 'predictions-20261017T000000Z-1-000000.ndjson.gz'
+DAY_FILE = 'predictions-20261017.ndjson.gz'
+
+
+def test_compact_rolls_back_an_unpublished_merge(tmp_path):
+    write_segment(tmp_path, SEGMENT, [1])
+    (tmp_path / 'merge.tmp').write_bytes(b'partial')
+    (tmp_path / 'compact-20261017.json').write_text(json.dumps({'temp': 'merge.tmp', 'segments': [SEGMENT]}))
+    assert compact(str(tmp_path)) == 1
+    assert not (tmp_path / 'merge.tmp').exists()
+    assert not (tmp_path / 'compact-20261017.json').exists()
+    assert numbers(tmp_path) == [1]
+
+
+def test_compact_rolls_forward_a_published_merge(tmp_path):
+    # Crashed after publishing the day file but before removing its source
+    write_segment(tmp_path, DAY_FILE, [1])
+    write_segment(tmp_path, SEGMENT, [1])
+    (tmp_path / 'compact-20261017.json').write_text(json.dumps({'temp': 'merge.tmp', 'segments': [SEGMENT]}))
+    assert compact(str(tmp_path)) == 0
+    assert not (tmp_path / SEGMENT).exists()
+    assert numbers(tmp_path) == [1]
+
+
+@pytest.mark.parametrize('file_name', ['predictions.csv', 'predictions.parquet'])
+def test_export(tmp_path, file_name):
+    if file_name.endswith('.parquet'):
+        pytest.importorskip('pyarrow')
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+    write_segment(log_dir, SEGMENT, range(5))
+    write_segment(log_dir, 'predictions-20261017T010000Z-1-000001.ndjson.gz', range(5, 12))
+    output_path = str(tmp_path / file_name)
+    assert export(str(log_dir), output_path, chunk_rows=4) == 12
+    table = pd.read_csv(output_path) if file_name.endswith('.csv') else pd.read_parquet(output_path)
+    assert len(table) == 12
+    assert list(table['prediction']) == [number % 2 for number in range(12)]
+    assert {'animal_name', 'probability_0', 'probability_1', 'latency_ms'} <= set(table.columns)
@@ -0,0 +1,65 @@
+"""Fallback JS/CSS minifiers: comments go, strings, regexes and line breaks stay"""
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+from static_assets import _strip_js_comments, minify_css, minify_js
+
+
+@pytest.fixture
+def fallback_minifiers(monkeypatch):
+    """Force the built-in minifiers even where rjsmin/rcssmin are installed"""
+    monkeypatch.setitem(sys.modules, 'rjsmin', None)
+    monkeypatch.setitem(sys.modules, 'rcssmin', None)
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('var a = 1; // note\nvar b = 2;', 'var a = 1;\nvar b = 2;'),
+    ('var a = /* note */ 1;', 'var a = 1;'),
+    ('    if (a) {\n        b();\n    }', 'if (a) {\nb();\n}'),
+    ("var url = 'http://example.com/*x*/';", "var url = 'http://example.com/*x*/';"),
+    ('var s = "it\\"s // not a comment";', 'var s = "it\\"s // not a comment";'),
+    ('var t = `a ${b} // c`;', 'var t = `a ${b} // c`;'),
+    ('var re = /\\/\\/[^/]*/g;', 'var re = /\\/\\/[^/]*/g;'),
+    ('var re = /[/*]/;', 'var re = /[/*]/;'),
+    ('return /a\\/b/.test(s);', 'return /a\\/b/.test(s);'),
+    ('x = typeof /x/;', 'x = typeof /x/;'),
+    ('var half = total / 2; // half', 'var half = total / 2;'),
+    ('var r = a / b / c;', 'var r = a / b / c;'),
+    ('var r = (a) / 2 /* x */ / 3;', 'var r = (a) / 2 / 3;'),
+])
+def test_strip_js_comments(source, expected):
+    # A block comment becomes a space, so only runs of spaces may differ
+    assert re.sub(' +', ' ', _strip_js_comments(source)) == expected
+
+
+def test_line_breaks_kept_for_semicolon_insertion():
+    assert _strip_js_comments('a = b\n/* c */\n(d)') == 'a = b\n(d)'
+    assert _strip_js_comments('return\n    value') == 'return\nvalue'
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+@pytest.mark.parametrize('name', sorted(os.listdir(os.path.join(ROOT, 'static', 'js'))))
+def test_minified_site_scripts_still_parse(name, tmp_path, fallback_minifiers):
+    with open(os.path.join(ROOT, 'static', 'js', name), encoding='utf-8') as f:
+        minified = minify_js(f.read())
+    path = tmp_path / name
+    path.write_text(minified, encoding='utf-8')
+    result = subprocess.run(['node', '--check', str(path)], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_minify_css(fallback_minifiers):
+    source = '/* theme */\n.card  >  a:hover {\n    color : red;\n    margin: 0 ;\n}\n\n.a :hover { x: 1 }'
+    assert minify_css(source) == '.card>a:hover{color :red;margin:0}.a :hover{x:1}'
+
+
+def test_minify_css_keeps_strings(fallback_minifiers):
+    source = '.q::before { content: "a  /* b */  c"; font-family: \'Open  Sans\', serif; }'
+    assert minify_css(source) == '.q::before{content:"a  /* b */  c";font-family:\'Open  Sans\',serif}'